@@ -0,0 +1,40 @@
+"""
+Script to compare the queue and wavefront BFS engines on large sparse maps.
+"""
+
+import random
+import time
+from src.environment import Grid
+from src.ALGO import BFS_path_finder
+
+def sparse_map(size, density, seed):
+    """Build a size x size grid with a fraction of random obstacles."""
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    for _ in range(int(size * size * density)):
+        grid.add_obstacle(rng.randrange(size), rng.randrange(size))
+    return grid
+
+def main():
+    """Time both engines corner to corner and check they agree."""
+    print(f"{'size':>6} {'density':>8} {'queue (s)':>10} {'wavefront (s)':>14} {'speedup':>8}")
+    for size in [250, 500, 1000]:
+        for density in [0.05, 0.2]:
+            grid = sparse_map(size, density, seed=size)
+            origin, goal = (0, 0), (size - 1, size - 1)
+            grid.grid[:2, :2] = grid.grid[-2:, -2:] = 0  # keep both corners open
+
+            start = time.perf_counter()
+            _, queue_cost, _ = BFS_path_finder(grid, origin, goal)
+            queue_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, wave_cost, _ = BFS_path_finder(grid, origin, goal, engine="wavefront")
+            wave_time = time.perf_counter() - start
+
+            assert queue_cost == wave_cost
+            print(f"{size:>6} {density:>8.2f} {queue_time:>10.3f} {wave_time:>14.3f} "
+                  f"{queue_time / wave_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Script to measure how many A* expansions the terrain-scaled heuristic saves.
+"""
+
+import random
+from src.UTILITY import create_test_map
+from src.ALGO import a_star
+
+def sample_queries(grid, count, rng):
+    """Pick random start/goal pairs on free cells."""
+    free = [(x, y) for y in range(grid.grid_height) for x in range(grid.grid_width)
+            if grid.is_valid(x, y)]
+    return [(rng.choice(free), rng.choice(free)) for _ in range(count)]
+
+def main():
+    """Compare plain Manhattan, terrain-scaled and weighted A* on every test map."""
+    random.seed(0)
+    rng = random.Random(0)
+    map_sizes = ["small", "medium", "large", "dynamic"]
+
+    print(f"{'map':<8} {'manhattan':>10} {'scaled':>10} {'saved':>7} {'w=1.5':>10} {'cost x':>7}")
+    for map_size in map_sizes:
+        grid = create_test_map(map_size)
+        totals = [0, 0, 0]
+        optimal_cost = weighted_cost = 0
+        for origin, goal in sample_queries(grid, 200, rng):
+            # weight = 1 / min_cost reproduces the old unscaled Manhattan heuristic
+            path, _, plain = a_star(grid, origin, goal, weight=1.0 / grid.min_cost())
+            if path is None:
+                continue
+            _, cost, scaled = a_star(grid, origin, goal)
+            _, w_cost, weighted = a_star(grid, origin, goal, weight=1.5)
+            totals[0] += plain
+            totals[1] += scaled
+            totals[2] += weighted
+            optimal_cost += cost
+            weighted_cost += w_cost
+
+        saved = 100.0 * (1 - totals[1] / totals[0])
+        ratio = weighted_cost / optimal_cost if optimal_cost else 1.0
+        print(f"{map_size:<8} {totals[0]:>10} {totals[1]:>10} {saved:>6.1f}% {totals[2]:>10} {ratio:>7.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Script to measure full searches and collisions with and without lookahead repair.
+"""
+
+import contextlib
+import copy
+import io
+import time
+from src.map_generator import generate_map, generate_orders
+from src.agent import Delivery_agent
+from src.lookahead import first_conflict
+from src.path_codec import to_array
+
+class AuditedAgent(Delivery_agent):
+    """Agent that counts the legs it drives into a predicted collision."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collisions = 0
+
+    def fast_forward(self, advance_obstacles: bool = True) -> bool:
+        if first_conflict(self.grid, to_array(self.path[self.current_step:])) is not None:
+            self.collisions += 1
+        return super().fast_forward(advance_obstacles)
+
+def run(grid, orders, lookahead):
+    """Deliver the orders; return (seconds, searches, repairs, collisions, delivered)."""
+    agent = AuditedAgent(grid, 0, 0, fuel=10 ** 9)
+    agent.verbose = False
+    agent.lookahead = lookahead
+    for package, destination in orders:
+        agent.add_package(*package)
+        agent.add_destination(*destination)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent.deliver_packages()
+    return (time.perf_counter() - start, agent.searches, agent.local_repairs,
+            agent.collisions, agent.delivered_packages)
+
+def main():
+    """Compare full replanning of every leg with lookahead repair on busy maps."""
+    print(f"{'obstacles':>9} {'lookahead':>9} {'time (s)':>9} {'searches':>9} {'repairs':>8} "
+          f"{'collisions':>11} {'delivered':>10}")
+    for obstacles in [50, 100]:
+        grid = generate_map(120, 120, "city", moving_obstacles=obstacles, seed=5)
+        orders = generate_orders(grid, 15, depot=(0, 0), seed=6)
+        for lookahead in [0, 8]:
+            elapsed, searches, repairs, collisions, delivered = run(copy.deepcopy(grid), orders, lookahead)
+            print(f"{obstacles:>9} {lookahead:>9} {elapsed:>9.2f} {searches:>9} {repairs:>8} "
+                  f"{collisions:>11} {delivered:>10}")
+
+if __name__ == "__main__":
+    main()
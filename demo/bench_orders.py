@@ -0,0 +1,61 @@
+"""
+Script to measure order insertion latency with many orders already pending.
+"""
+
+import random
+import statistics
+import time
+from src.environment import Grid
+from src.agent import Delivery_agent
+
+def city_map(size, seed):
+    """Build a size x size grid of open streets between random blocks."""
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    for _ in range(size * size // 20):
+        grid.add_obstacle(rng.randrange(size), rng.randrange(size))
+    return grid
+
+def open_cell(grid, rng):
+    """Pick a random passable cell."""
+    while True:
+        x, y = rng.randrange(grid.grid_width), rng.randrange(grid.grid_height)
+        if grid.is_valid(x, y):
+            return x, y
+
+def main():
+    """Fill the route to each size, then time further insertions."""
+    rng = random.Random(0)
+    grid = city_map(200, seed=0)
+    agent = Delivery_agent(grid, 0, 0, fuel=10 ** 9)
+    agent.verbose = False
+    grid.grid[0, 0] = 0
+
+    print(f"{'pending':>8} {'choose p50 (ms)':>16} {'insert p50 (ms)':>16} {'insert p95 (ms)':>16}")
+    for pending in [250, 1000, 2000]:
+        while len(agent.route) < 2 * pending:
+            agent.insert_order(open_cell(grid, rng), open_cell(grid, rng))
+
+        choose, insert = [], []
+        for _ in range(100):
+            package, destination = open_cell(grid, rng), open_cell(grid, rng)
+            snapshot = agent.route.snapshot()
+            start = time.perf_counter()
+            agent.route.best_insertion((agent.x, agent.y), package, destination, grid.min_cost())
+            choose.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            agent.insert_order(package, destination)
+            insert.append(time.perf_counter() - start)
+            # Keep the route size fixed so every sample sees the same load
+            agent.route.restore(snapshot)
+            agent._start_leg()
+            agent.packages.remove(package)
+            agent.destinations.remove(destination)
+
+        insert.sort()
+        print(f"{pending:>8} {statistics.median(choose) * 1e3:>16.3f} "
+              f"{statistics.median(insert) * 1e3:>16.3f} {insert[94] * 1e3:>16.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Script to compare the heapq and bucket open lists of UCS and A*.
+"""
+
+import heapq
+import random
+import time
+import tracemalloc
+from src.map_generator import generate_map
+from src.bucket_queue import BucketQueue
+from src.ALGO import ucs, a_star
+
+def replay(steps, use_buckets):
+    """Pop the cheapest key and push its successors, like UCS; return seconds per step."""
+    start = time.perf_counter()
+    if use_buckets:
+        queue = BucketQueue(13)
+        queue.push(0, (0, 0))
+        for costs in steps:
+            key, item = queue.pop()
+            for cost in costs:
+                queue.push(key + cost, item)
+    else:
+        queue = [(0, (0, 0))]
+        for costs in steps:
+            key, item = heapq.heappop(queue)
+            for cost in costs:
+                heapq.heappush(queue, (key + cost, item))
+    return (time.perf_counter() - start) / len(steps)
+
+def run(planner, grid, queries, queue):
+    """Time a planner over the queries; return (best seconds per expansion, total cost)."""
+    best = float("inf")
+    for _ in range(3):
+        expanded = total = 0
+        start = time.perf_counter()
+        for origin, goal in queries:
+            _, cost, nodes = planner(grid, origin, goal, queue=queue)
+            expanded += nodes
+            total += cost
+        best = min(best, (time.perf_counter() - start) / max(expanded, 1))
+    return best, total
+
+def peak_memory(planner, grid, queries, queue):
+    """Peak KiB allocated by one pass over the queries, traced separately from timing."""
+    tracemalloc.start()
+    for origin, goal in queries:
+        planner(grid, origin, goal, queue=queue)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+def main():
+    """Time both open lists on generated maps and check they find equal costs."""
+    rng = random.Random(0)
+    # Each step pops one key and pushes one or two successors at terrain costs
+    steps = [rng.choices([2, 4, 8, 12], k=1 + i % 2) for i in range(200000)]
+    print(f"raw queue: heapq {replay(steps, False) * 1e9:.0f} ns, "
+          f"bucket {replay(steps, True) * 1e9:.0f} ns per pop and pushes")
+
+    print(f"{'map':<8} {'planner':<7} {'heap (us/node)':>15} {'bucket (us/node)':>17} "
+          f"{'speedup':>8} {'heap KiB':>9} {'bucket KiB':>11}")
+    for layout in ["open", "city", "maze"]:
+        grid = generate_map(300, 300, layout, 0.1 if layout == "open" else 0.0, seed=1)
+        ys, xs = grid.passable_mask().nonzero()
+        cells = list(zip(xs.tolist(), ys.tolist()))
+        queries = [(rng.choice(cells), rng.choice(cells)) for _ in range(10)]
+        for name, planner in [("ucs", ucs), ("a_star", a_star)]:
+            heap_time, heap_cost = run(planner, grid, queries, "heap")
+            bucket_time, bucket_cost = run(planner, grid, queries, "bucket")
+            assert heap_cost == bucket_cost
+            heap_peak = peak_memory(planner, grid, queries[:3], "heap")
+            bucket_peak = peak_memory(planner, grid, queries[:3], "bucket")
+            print(f"{layout:<8} {name:<7} {heap_time * 1e6:>15.2f} {bucket_time * 1e6:>17.2f} "
+                  f"{heap_time / bucket_time:>7.2f}x {heap_peak:>9.0f} {bucket_peak:>11.0f}")
+
+if __name__ == "__main__":
+    main()
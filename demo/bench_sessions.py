@@ -0,0 +1,67 @@
+"""
+Script to measure API session throughput under mixed read/write load.
+"""
+
+import os
+import random
+import time
+from src.map_generator import generate_map
+from src.API import SessionManager
+
+def workload(grid, sessions, operations, write_share, seed):
+    """(session index, method, args) calls: path queries mixed with obstacle edits."""
+    rng = random.Random(seed)
+    ys, xs = grid.passable_mask().nonzero()
+    cells = list(zip(xs.tolist(), ys.tolist()))
+    calls = []
+    for _ in range(operations):
+        session = rng.randrange(sessions)
+        if rng.random() < write_share:
+            calls.append((session, "add_obstacle", rng.choice(cells)))
+        else:
+            calls.append((session, "plan_path", rng.choice(cells) + rng.choice(cells)))
+    return calls
+
+def run(grid, calls, sessions, workers):
+    """Serve the calls on fresh sessions; return (operations per second, results, manager)."""
+    manager = SessionManager(workers or None)
+    manager.share_grid("city", grid)
+    ids = [manager.create_session("city")["session_id"] for _ in range(sessions)]
+    start = time.perf_counter()
+    if workers:
+        futures = [manager.submit(ids[session], method, *args) for session, method, args in calls]
+        results = [future.result() for future in futures]
+    else:
+        results = [manager.call(ids[session], method, *args) for session, method, args in calls]
+    elapsed = time.perf_counter() - start
+    manager.shutdown()
+    return len(calls) / elapsed, results, manager
+
+def main():
+    """Compare one caller with thread pools of several sizes, then the memory of sharing."""
+    sessions = 8
+    grid = generate_map(200, 200, "city", seed=3)
+    print(f"{os.cpu_count()} CPU(s), {sessions} sessions on one shared 200x200 city map")
+    print(f"{'writes':>7} {'workers':>8} {'ops/s':>9} {'vs serial':>10}")
+    for write_share in [0.0, 0.1, 0.5]:
+        calls = workload(grid, sessions, 300, write_share, seed=4)
+        baseline = expected = None
+        for workers in [0, 2, 4, 8]:
+            runs = [run(grid, calls, sessions, workers) for _ in range(3)]
+            throughput, results, manager = max(runs, key=lambda outcome: outcome[0])
+            if not write_share:
+                # Without edits the order of the queries cannot change their answers
+                costs = [result.get("cost") for result in results]
+                expected = expected if workers else costs
+                assert costs == expected
+            baseline = baseline or throughput
+            label = workers or "serial"
+            print(f"{write_share:>7.0%} {label:>8} {throughput:>9.0f} {throughput / baseline:>9.2f}x")
+
+    overlays = sum(session.grid_map.overlay_size() for session in manager.sessions.values())
+    shared = grid.memory_usage()["total"]
+    print(f"shared grid {shared / 1024:.0f} KiB once, plus {overlays} overlaid cells across "
+          f"{sessions} sessions, instead of {sessions * shared / 1024:.0f} KiB of copies")
+
+if __name__ == "__main__":
+    main()
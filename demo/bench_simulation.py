@@ -0,0 +1,61 @@
+"""
+Script to compare lock-step and event-driven simulation over long horizons.
+"""
+
+import contextlib
+import copy
+import io
+import time
+from src.map_generator import generate_map, generate_orders
+from src.agent import Delivery_agent
+from src.simulation import DeliverySimulation
+
+def quiet_agent(grid):
+    """An agent at the depot with fuel to spare."""
+    agent = Delivery_agent(grid, 0, 0, fuel=10 ** 9)
+    agent.verbose = False
+    return agent
+
+def lock_step(grid, orders, gap):
+    """Serve the orders one time step at a time; return (seconds, delivered, ticks)."""
+    agent = quiet_agent(grid)
+    arrivals = iter([[orders[tick // gap]] if tick % gap == 0 else []
+                     for tick in range(gap * len(orders))])
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent.serve_orders(arrivals=arrivals)
+    return time.perf_counter() - start, agent.delivered_packages, grid.ticks
+
+def event_driven(grid, orders, gap, agents=1):
+    """Serve the orders with the event scheduler; return (seconds, delivered, events)."""
+    simulation = DeliverySimulation(grid, [quiet_agent(grid) for _ in range(agents)])
+    simulation.add_orders((index * gap, index % agents, package, destination)
+                          for index, (package, destination) in enumerate(orders))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = simulation.run()
+    return time.perf_counter() - start, result["delivered"], result["events"]
+
+def main():
+    """Time both clocks on sparse orders, then scale the event-driven fleet."""
+    print(f"{'obstacles':>9} {'gap':>6} {'ticks':>7} {'lock-step (s)':>14} {'events':>7} "
+          f"{'event (s)':>10} {'speedup':>8}")
+    for obstacles in [10, 100]:
+        for gap in [200, 2000]:
+            grid = generate_map(150, 150, "city", moving_obstacles=obstacles, seed=3)
+            orders = generate_orders(grid, 12, depot=(0, 0), seed=4)
+            event_time, event_delivered, events = event_driven(copy.deepcopy(grid), orders, gap)
+            step_time, step_delivered, ticks = lock_step(grid, orders, gap)
+            assert event_delivered == step_delivered
+            print(f"{obstacles:>9} {gap:>6} {ticks:>7} {step_time:>14.3f} {events:>7} "
+                  f"{event_time:>10.3f} {step_time / event_time:>7.1f}x")
+
+    print(f"\n{'agents':>6} {'orders':>7} {'delivered':>9} {'events':>7} {'event (s)':>10}")
+    grid = generate_map(150, 150, "city", moving_obstacles=10, seed=3)
+    for agents in [1, 10, 50]:
+        orders = generate_orders(grid, 4 * agents, depot=(0, 0), seed=agents)
+        elapsed, delivered, events = event_driven(copy.deepcopy(grid), orders, 50, agents)
+        print(f"{agents:>6} {len(orders):>7} {delivered:>9} {events:>7} {elapsed:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Script to measure the cost of recording a binary trace.
+Missions include planning; the sweeps time path execution alone, which is
+the worst case for relative overhead.
+"""
+
+import os
+import tempfile
+import time
+from src.environment import Grid, MovingObstacle
+from src.agent import Delivery_agent
+
+def patrolled_map(size, patrols):
+    """Build an open grid with vehicles patrolling along rows."""
+    grid = Grid(size, size)
+    for row in range(1, size, size // patrols):
+        patrol = [(x, row) for x in range(size)]
+        grid.add_moving_obstacle(MovingObstacle(0, row, patrol, pace=2))
+    return grid
+
+def snake(size):
+    """A path sweeping every row of the grid."""
+    path = []
+    for y in range(size):
+        xs = range(size) if y % 2 == 0 else range(size - 1, -1, -1)
+        path.extend((x, y) for x in xs)
+    return path[1:]
+
+def run(size, patrols, trace_file, compress, mode):
+    """Time one run: a planned mission, or executing a sweep step by step or in bulk."""
+    grid = patrolled_map(size, patrols)
+    agent = Delivery_agent(grid, 0, 0, fuel=10 ** 9)
+    agent.verbose = False
+    for x in range(0, size, 7):
+        agent.add_package(x, size // 2)
+        agent.add_destination(x, size - 1)
+    if mode != "mission":
+        agent.path = snake(size)
+    if trace_file:
+        agent.start_trace(trace_file, compress)
+
+    start = time.perf_counter()
+    if mode == "mission":
+        agent.deliver_packages()
+    elif mode == "execute_step":
+        while agent.execute_step():
+            pass
+    else:
+        agent.fast_forward()
+    agent.stop_trace()
+    return time.perf_counter() - start
+
+def main():
+    """Compare untraced, traced and compressed traced runs, interleaved to even out noise."""
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_file = os.path.join(tmp, "run.trc")
+        variants = [(None, False), (trace_file, False), (trace_file, True)]
+        print(f"{'mode':>13} {'patrols':>8} {'plain (s)':>10} {'trace':>8} {'zlib':>8} {'zlib bytes':>11}")
+        for mode, size in [("mission", 60), ("execute_step", 120), ("fast_forward", 120)]:
+            for patrols in [4, 16]:
+                best = [float("inf")] * len(variants)
+                for _ in range(5):
+                    for index, (trace, compress) in enumerate(variants):
+                        best[index] = min(best[index], run(size, patrols, trace, compress, mode))
+                plain, traced, packed = best
+                print(f"{mode:>13} {patrols:>8} {plain:>10.4f} {traced / plain - 1:>+8.1%} "
+                      f"{packed / plain - 1:>+8.1%} {os.path.getsize(trace_file):>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Tests for concurrent use of the API: the reader-writer lock and sessions.
+"""
+
+import threading
+import unittest
+from src.environment import Grid, CellType
+from src.map_generator import generate_map
+from src import API
+from src.API import Delivery_API, SessionManager
+from src.rwlock import ReadWriteLock
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test cases for the reader-writer lock."""
+
+    def setUp(self):
+        """Set up an unheld lock."""
+        self.lock = ReadWriteLock()
+
+    def test_readers_overlap(self):
+        """Two readers can hold the lock at the same time."""
+        both_inside = threading.Barrier(2, timeout=5)
+
+        def reader():
+            with self.lock.read():
+                both_inside.wait()
+
+        threads = [threading.Thread(target=reader, daemon=True) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertFalse(both_inside.broken)
+        self.assertEqual(self.lock.readers, 0)
+
+    def test_writer_excludes_readers(self):
+        """A reader waits for the writer, and a waiting writer holds back new readers."""
+        events = []
+
+        def reader():
+            self.lock.acquire_read()
+            events.append("read")
+
+        self.lock.acquire_write()
+        first = threading.Thread(target=reader, daemon=True)
+        first.start()
+        first.join(0.2)
+        self.assertTrue(first.is_alive())
+        events.append("written")
+        self.lock.release_write()
+        first.join(5)
+        self.assertEqual(events, ["written", "read"])
+
+        def writer():
+            with self.lock.write():
+                events.append("wrote")
+
+        writing = threading.Thread(target=writer, daemon=True)
+        writing.start()  # waits for the reader above, which still holds the lock
+        while not self.lock.waiting_writers:
+            writing.join(0.01)
+        late = threading.Thread(target=reader, daemon=True)
+        late.start()
+        late.join(0.2)
+        self.assertTrue(late.is_alive())
+        self.lock.release_read()
+        writing.join(5)
+        late.join(5)
+        self.assertFalse(writing.is_alive() or late.is_alive())
+        self.assertEqual(events, ["written", "read", "wrote", "read"])
+        self.lock.release_read()
+        self.assertEqual((self.lock.readers, self.lock.writer), (0, None))
+
+    def test_misuse_raises(self):
+        """Releasing an unheld lock or re-entering the write lock raises."""
+        with self.assertRaises(RuntimeError):
+            self.lock.release_read()
+        with self.assertRaises(RuntimeError):
+            self.lock.release_write()
+        with self.lock.write():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+
+class TestSessions(unittest.TestCase):
+    """Test cases for sessions sharing grids copy-on-write."""
+
+    def setUp(self):
+        """Set up a manager with one shared city map."""
+        self.grid = generate_map(60, 60, "city", seed=2)
+        self.manager = SessionManager(workers=4)
+        self.manager.share_grid("city", self.grid)
+        self.first = self.manager.create_session("city")["session_id"]
+        self.second = self.manager.create_session("city")["session_id"]
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_edits_stay_in_their_session(self):
+        """An obstacle added in one session is not seen by the other or the shared grid."""
+        self.assertEqual(self.manager.call(self.first, "add_obstacle", 1, 0)["status"], "success")
+        first, second = (self.manager.get_session(session).grid_map for session in (self.first, self.second))
+        self.assertEqual(first.grid[0, 1], CellType.OBSTACLE.value)
+        self.assertNotEqual(second.grid[0, 1], CellType.OBSTACLE.value)
+        self.assertNotEqual(self.grid.grid[0, 1], CellType.OBSTACLE.value)
+        self.assertEqual(first.overlay_size(), 1)
+
+    def test_unknown_session_method_or_grid(self):
+        """Unknown sessions, private or missing methods and unknown grids are errors."""
+        self.assertEqual(self.manager.call("missing", "plan_path", 0, 0, 1, 0)["status"], "error")
+        self.assertEqual(self.manager.call(self.first, "_count_obstacles")["status"], "error")
+        self.assertEqual(self.manager.call(self.first, "launch")["status"], "error")
+        self.assertEqual(self.manager.create_session("nowhere")["status"], "error")
+        self.assertEqual(self.manager.close_session(self.first)["status"], "success")
+        self.assertIsNone(self.manager.get_session(self.first))
+        self.assertEqual(self.manager.close_session(self.first)["status"], "error")
+
+    def test_pool_matches_serial_planning(self):
+        """plan_paths on the pool gives the same answers as plan_path one by one."""
+        queries = [(0, 0, 50, 50), (0, 0, 1, 50), (50, 0, 0, 50), (10, 10, 11, 10)]
+        serial = Delivery_API()
+        serial.use_grid(self.grid)
+        expected = [serial.plan_path(*query) for query in queries]
+        self.assertEqual(self.manager.plan_paths(self.first, queries), expected)
+
+    def test_concurrent_readers_build_caches_once(self):
+        """Readers racing to fill a lazy cache all get the one array it keeps."""
+        grid = self.manager.get_session(self.first).grid_map
+        start = threading.Barrier(4, timeout=5)
+        built = []
+
+        def reader():
+            start.wait()
+            built.append((grid.to_csr()[0], grid.components(), grid.grid))
+
+        threads = [threading.Thread(target=reader, daemon=True) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(built), 4)
+        for arrays in built[1:]:
+            self.assertTrue(all(mine is first for mine, first in zip(arrays, built[0])))
+
+    def test_session_portfolios_do_not_fork(self):
+        """Portfolio workers of sessions are not forked from the pool's threads."""
+        session = self.manager.get_session(self.first)
+        self.assertNotEqual(session.portfolio.context.get_start_method(), "fork")
+
+    def test_mixed_load_is_consistent(self):
+        """Queries racing edits on the pool return whole paths, and the edits all land."""
+        walls = [(x, 20) for x in range(60)]  # a full row, cutting the map in two
+        futures = []
+        for x, y in walls:
+            futures.append(self.manager.submit(self.first, "add_obstacle", x, y))
+            futures.append(self.manager.submit(self.first, "plan_path", 0, 0, x, 59))
+        results = [future.result() for future in futures]
+        self.assertTrue(all(result["status"] == "success" for result in results[::2]))
+        for result in results[1::2]:
+            if result["status"] == "success":
+                path = result["path"]
+                self.assertEqual(path[0], (0, 0))
+                self.assertTrue(all(abs(ax - bx) + abs(ay - by) == 1
+                                    for (ax, ay), (bx, by) in zip(path, path[1:])))
+        self.assertEqual(self.manager.call(self.first, "plan_path", 0, 0, 0, 59)["status"], "error")
+        self.assertEqual(self.manager.call(self.second, "plan_path", 0, 0, 0, 59)["status"], "success")
+
+    def test_module_level_sessions(self):
+        """The module-level functions drive the global session manager."""
+        API.share_grid("testing-city", self.grid)
+        session_id = API.create_session("testing-city")["session_id"]
+        try:
+            self.assertEqual(API.session_call(session_id, "add_obstacle", 1, 0)["status"], "success")
+            results = API.plan_paths(session_id, [(0, 0, 50, 50), (0, 0, 1, 0)])
+            self.assertEqual([result["status"] for result in results], ["success", "error"])
+        finally:
+            self.assertEqual(API.close_session(session_id)["status"], "success")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Tests for mission timing and its statistics.
+"""
+
+import unittest
+import numpy as np
+from src.benchmark import time_mission, summarize, compare, mann_whitney_u
+from src.UTILITY import create_test_map
+
+class TestBenchmark(unittest.TestCase):
+    """Test cases for the benchmark statistics and timer."""
+
+    def test_summary_order_statistics(self):
+        """Quartiles and intervals come from the samples themselves."""
+        samples = list(range(1, 101))
+        summary = summarize(samples)
+        self.assertEqual(summary["n"], 100)
+        self.assertAlmostEqual(summary["median"], 50.5)
+        self.assertAlmostEqual(summary["iqr"], np.percentile(samples, 75) - np.percentile(samples, 25))
+        low, high = summary["median_ci"]
+        self.assertTrue(low <= summary["median"] <= high)
+        self.assertLessEqual(summary["p95_ci"][1], 100)
+
+    def test_mann_whitney_u_known_value(self):
+        """U counts the pairs where the first sample wins, ties counting half."""
+        u_statistic, _ = mann_whitney_u(np.array([1.0, 2.0, 3.0]), np.array([2.0, 4.0]))
+        self.assertEqual(u_statistic, 1.5)
+
+    def test_compare_detects_shift_only(self):
+        """A clear slowdown is significant, a resample of the same distribution is not."""
+        rng = np.random.default_rng(3)
+        baseline = rng.lognormal(0, 0.2, 40)
+        slower = compare(baseline, rng.lognormal(0, 0.2, 40) * 1.5)
+        same = compare(baseline, rng.lognormal(0, 0.2, 40))
+        self.assertTrue(slower["significant"])
+        self.assertGreater(slower["probability_slower"], 0.8)
+        self.assertGreater(slower["ratio_ci"][0], 1)
+        self.assertFalse(same["significant"])
+
+    def test_time_mission(self):
+        """Planning and execution times add up and the mission completes."""
+        run = time_mission("medium", "a_star")
+        self.assertTrue(run["success"])
+        self.assertGreater(run["planning_ns"], 0)
+        self.assertEqual(run["total_ns"], run["planning_ns"] + run["execution_ns"])
+
+    def test_repetitions_share_one_map(self):
+        """A seeded random map comes out the same every time, so repetitions time one map."""
+        first, second = create_test_map("large", seed=7), create_test_map("large", seed=7)
+        self.assertTrue(np.array_equal(first.grid, second.grid))
+        self.assertFalse(np.array_equal(first.grid, create_test_map("large", seed=8).grid))
+
+if __name__ == "__main__":
+    unittest.main()
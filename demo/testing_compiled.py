@@ -0,0 +1,166 @@
+"""
+Tests for component labelling and precompiled map bundles.
+"""
+
+from collections import deque
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.environment import Grid
+from src.ALGO import a_star, ucs, BFS_path_finder, hill_climbing
+from src.API import Delivery_API
+from src.components import label_components
+from src.compiled_map import compile_map, bundle_path, CompiledMap
+from src.map_generator import generate_map
+
+def flood_labels(passable):
+    """Reference labelling by breadth-first flood fill in row-major order."""
+    height, width = passable.shape
+    labels = np.full(passable.shape, -1)
+    count = 0
+    for y in range(height):
+        for x in range(width):
+            if not passable[y, x] or labels[y, x] >= 0:
+                continue
+            labels[y, x] = count
+            queue = deque([(x, y)])
+            while queue:
+                cx, cy = queue.popleft()
+                for nx, ny in [(cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)]:
+                    if 0 <= nx < width and 0 <= ny < height and passable[ny, nx] and labels[ny, nx] < 0:
+                        labels[ny, nx] = count
+                        queue.append((nx, ny))
+            count += 1
+    return labels
+
+class TestComponents(unittest.TestCase):
+    """Test cases for the vectorized union-find labelling."""
+
+    def test_matches_flood_fill(self):
+        """Labels equal a flood fill's, including their numbering."""
+        rng = np.random.default_rng(8)
+        for density in [0.2, 0.4, 0.6]:
+            passable = rng.random((23, 37)) >= density
+            np.testing.assert_array_equal(label_components(passable), flood_labels(passable))
+
+    def test_clusters_cut_components(self):
+        """With clusters, an open map splits into one region per cluster."""
+        labels = label_components(np.ones((20, 30), dtype=bool), cluster_size=10)
+        self.assertEqual(labels.max() + 1, 6)
+        self.assertEqual(len(np.unique(labels[:10, :10])), 1)
+
+def same_partition(first, second):
+    """Whether two labellings group the cells the same way, whatever the ids."""
+    if not np.array_equal(first < 0, second < 0):
+        return False
+    pairs = np.unique(np.stack([first[first >= 0], second[second >= 0]]), axis=1)
+    return len(np.unique(pairs[0])) == len(np.unique(pairs[1])) == pairs.shape[1]
+
+class TestGridComponents(unittest.TestCase):
+    """Test cases for the labels a grid keeps current as obstacles are added."""
+
+    def test_incremental_matches_relabel(self):
+        """Labels after random additions group cells as a full relabel does."""
+        grid = generate_map(40, 30, "open", 0.25, seed=4)
+        grid.components()
+        rng = np.random.default_rng(5)
+        for x, y in rng.integers(0, [40, 30], (300, 2)).tolist():
+            grid.add_obstacle(x, y)
+        self.assertTrue(same_partition(grid.components(), label_components(grid.passable_mask())))
+
+    def test_wall_splits_component(self):
+        """Closing the last gap in a wall splits the component in two."""
+        grid = Grid(7, 5)
+        for y in range(4):
+            grid.add_obstacle(3, y)
+        self.assertTrue(grid.connected((0, 0), (6, 0)))
+        grid.add_obstacle(3, 4)
+        self.assertFalse(grid.connected((0, 0), (6, 0)))
+        self.assertTrue(grid.connected((0, 0), (2, 4)))
+        self.assertTrue(same_partition(grid.components(), label_components(grid.passable_mask())))
+
+    def test_snapshot_keeps_own_labels(self):
+        """A wall built in a snapshot leaves the base grid connected."""
+        grid = Grid(7, 5)
+        grid.components()
+        snapshot = grid.snapshot()
+        for y in range(5):
+            snapshot.add_obstacle(3, y)
+        self.assertFalse(snapshot.connected((0, 0), (6, 0)))
+        self.assertTrue(grid.connected((0, 0), (6, 0)))
+
+    def test_connected_edge_cases(self):
+        """Blocked goals are unreachable; a blocked start counts through its neighbours."""
+        grid = Grid(5, 5)
+        grid.add_obstacle(2, 2)
+        self.assertFalse(grid.connected((0, 0), (2, 2)))
+        self.assertFalse(grid.connected((0, 0), (5, 0)))
+        self.assertTrue(grid.connected((2, 2), (0, 0)))
+        self.assertTrue(grid.connected((2, 2), (2, 2)))
+
+    def test_planners_answer_unreachable_at_once(self):
+        """Planners and the API give up without expanding a node."""
+        api = Delivery_API()
+        api.create_grid_map(30, 20)
+        grid = api.grid_map
+        for y in range(20):
+            grid.add_obstacle(15, y)
+        for planner in (a_star, ucs, BFS_path_finder):
+            self.assertEqual(planner(grid, (0, 0), (29, 19)), (None, float("inf"), 0))
+        self.assertIsNone(hill_climbing(grid, (0, 0), (29, 19)))
+        result = api.plan_path(0, 0, 29, 19, "a_star")
+        self.assertEqual(result["status"], "error")
+        self.assertIn("different components", result["message"])
+
+class TestCompiledMap(unittest.TestCase):
+    """Test cases for compiling, storing and using map bundles."""
+
+    def setUp(self):
+        """Set up a generated map saved to a scratch directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.grid = generate_map(60, 40, "city", 0.05, block_size=6, seed=21)
+        self.filename = os.path.join(self.tmp.name, "city.txt")
+        self.grid.save_to_file(self.filename)
+
+    def test_bundle_picked_up_on_load(self):
+        """The API installs a matching bundle, which goes stale on the first edit."""
+        compiled = compile_map(self.grid, landmarks=4, cluster_size=8)
+        compiled.save(bundle_path(self.filename, compiled.digest))
+
+        api = Delivery_API()
+        result = api.load_grid_map(self.filename)
+        self.assertEqual(result["compiled"], bundle_path(self.filename, compiled.digest))
+        grid = api.grid_map
+        self.assertIsNotNone(grid.compiled_map())
+        np.testing.assert_array_equal(grid.to_csr()[1], compiled.indices)
+        np.testing.assert_array_equal(grid.components(), compiled.components)
+
+        grid.add_obstacle(0, 0)
+        self.assertIsNone(grid.compiled_map())
+        with self.assertRaises(ValueError):
+            CompiledMap.load(result["compiled"]).install(grid)
+
+    def test_no_bundle(self):
+        """Maps without a bundle load as before."""
+        self.assertIsNone(Delivery_API().load_grid_map(self.filename)["compiled"])
+
+    def test_lower_bounds(self):
+        """Landmark bounds never exceed the optimal cost, and split components are unreachable."""
+        compiled = compile_map(self.grid, landmarks=4)
+        rng = np.random.default_rng(2)
+        ys, xs = np.nonzero(compiled.components >= 0)
+        for _ in range(25):
+            first, second = rng.integers(0, len(xs), 2)
+            origin, goal = (int(xs[first]), int(ys[first])), (int(xs[second]), int(ys[second]))
+            _, cost, _ = a_star(self.grid, origin, goal)
+            self.assertLessEqual(compiled.lower_bound(origin, goal), cost)
+
+        grid = Grid(5, 3)
+        for y in range(3):
+            grid.add_obstacle(2, y)
+        self.assertEqual(compile_map(grid, landmarks=2).lower_bound((0, 0), (4, 0)), float("inf"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,531 @@
+"""
+Tests for delivery missions run by the agent.
+"""
+
+import copy
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from src.environment import Grid, GroundType, MovingObstacle
+from src.agent import Delivery_agent
+from src.spatial_index import StopIndex
+from src.ALGO import a_star
+from src.trace import TraceReader, TraceRecorder, FOOTER
+from src.API import Delivery_API
+from src.path_codec import decode_moves, decode_rle, encode_moves, encode_rle
+from src.simulation import EventScheduler, DeliverySimulation
+from src.lookahead import first_conflict, predict_cells, repair
+
+class TestFuelAwarePlanning(unittest.TestCase):
+    """Test cases for fuel-bounded planning and mission feasibility."""
+
+    def setUp(self):
+        """Set up a grid with a long wall that forces a detour."""
+        self.grid = Grid(30, 30)
+        for y in range(0, 29):
+            self.grid.add_obstacle(15, y)
+
+    def test_lower_bound_rejects_without_moving(self):
+        """A mission whose lower bound exceeds the fuel is rejected up front."""
+        agent = Delivery_agent(self.grid, 0, 0, fuel=50)
+        agent.add_package(29, 29)
+        agent.add_destination(0, 29)
+
+        self.assertEqual(agent.leg_lower_bounds(agent.route_order()), [116, 58])
+        self.assertFalse(agent.deliver_packages())
+        self.assertEqual((agent.x, agent.y, agent.fuel), (0, 0, 50))
+
+    def test_detour_rejected_before_execution(self):
+        """A mission that only fails because of the detour never starts moving."""
+        agent = Delivery_agent(self.grid, 0, 0, fuel=100)
+        agent.add_package(29, 0)
+
+        self.assertLess(sum(agent.leg_lower_bounds(agent.packages)), 100)
+        self.assertIsNone(agent.plan_mission(agent.packages))
+        self.assertFalse(agent.deliver_packages())
+        self.assertEqual((agent.x, agent.y, agent.fuel), (0, 0, 100))
+
+    def test_feasible_mission_runs(self):
+        """A mission with just enough fuel completes and keeps fuel above zero."""
+        agent = Delivery_agent(self.grid, 0, 0, fuel=2 * 87 + 1)
+        agent.add_package(29, 0)
+        self.assertTrue(agent.deliver_packages())
+        self.assertEqual(agent.fuel, 1)
+
+    def test_bounded_search(self):
+        """plan_path_to honours max_cost for every algorithm."""
+        for algorithm in ["bfs", "ucs", "a_star"]:
+            agent = Delivery_agent(self.grid, 0, 0)
+            self.assertFalse(agent.plan_path_to(29, 0, algorithm, max_cost=173))
+            self.assertTrue(agent.plan_path_to(29, 0, algorithm, max_cost=174))
+
+    def test_pinned_destination_bound_is_exact(self):
+        """Legs to pinned destinations use the exact flow-field cost."""
+        self.grid.set_ground_type(29, 0, GroundType.SLUDGE)
+        self.grid.pin_destination(29, 0)
+        agent = Delivery_agent(self.grid, 0, 0)
+        self.assertEqual(agent.leg_lower_bounds([(29, 0)]), [2 * 86 + 8])
+
+class TestFastForward(unittest.TestCase):
+    """Test cases for bulk execution of planned paths."""
+
+    def setUp(self):
+        """Set up a grid with mixed terrain, a moving obstacle and a planned route."""
+        self.grid = Grid(12, 12)
+        for x in range(12):
+            self.grid.set_ground_type(x, 5, GroundType.SLUDGE)
+        self.grid.add_moving_obstacle(MovingObstacle(0, 11, [(0, 11), (1, 11), (2, 11)], pace=2))
+        self.route = [(x, 0) for x in range(1, 12)] + [(11, y) for y in range(1, 12)]
+
+    def make_agent(self, grid, fuel):
+        """Create a quiet agent with two orders along the route."""
+        agent = Delivery_agent(grid, 0, 0, fuel=fuel)
+        agent.verbose = False
+        agent.add_package(6, 0)
+        agent.add_package(11, 8)
+        agent.add_destination(11, 3)
+        agent.add_destination(11, 11)
+        agent.path = list(self.route)
+        return agent
+
+    def test_matches_step_execution(self):
+        """Fast-forward leaves the same state as stepping, including obstacles."""
+        for fuel in [500, 30]:
+            stepped = self.make_agent(copy.deepcopy(self.grid), fuel)
+            while stepped.execute_step() and stepped.fuel > 0:
+                pass
+            forwarded = self.make_agent(copy.deepcopy(self.grid), fuel)
+            self.assertTrue(forwarded.fast_forward())
+
+            self.assertEqual(self.state(forwarded), self.state(stepped))
+
+    def state(self, agent):
+        """Everything execution can change, including the obstacle's phase."""
+        obstacle = agent.grid.moving_obstacles[0]
+        return (agent.x, agent.y, agent.fuel, agent.current_step, list(agent.packages),
+                list(agent.destinations), agent.delivered_packages,
+                obstacle.current_step, obstacle.pace_counter)
+
+    def test_deliveries_need_a_package_on_board(self):
+        """A destination reached before any pickup is not counted as delivered."""
+        agent = self.make_agent(self.grid, 500)
+        agent.add_destination(3, 0)
+        agent.fast_forward()
+        self.assertEqual(agent.delivered_packages, 2)
+        self.assertEqual(list(agent.destinations), [(3, 0)])
+
+    def test_obstacle_advance(self):
+        """advance(n) equals n calls to move()."""
+        moved = MovingObstacle(0, 0, [(0, 0), (1, 0), (2, 0), (3, 0)], pace=3)
+        advanced = copy.deepcopy(moved)
+        for _ in range(11):
+            moved.move()
+        advanced.advance(11)
+        self.assertEqual((advanced.current_step, advanced.pace_counter, advanced.current_x),
+                         (moved.current_step, moved.pace_counter, moved.current_x))
+
+class TestTrace(unittest.TestCase):
+    """Test cases for recording and replaying binary traces."""
+
+    make_agent = TestFastForward.make_agent
+
+    def setUp(self):
+        """Set up the fast-forward scenario and a scratch directory."""
+        TestFastForward.setUp(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def traced_run(self, name, stepwise, compress=False):
+        """Run the route with tracing on; returns the trace path and the agent."""
+        filename = os.path.join(self.tmp.name, name)
+        agent = self.make_agent(copy.deepcopy(self.grid), 500)
+        # Small blocks so seeks cross block boundaries
+        agent.trace = TraceRecorder(filename, agent.grid, compress=compress, block_records=5)
+        agent.trace.record(agent.x, agent.y, agent.fuel, 0, agent.grid.ticks)
+        if stepwise:
+            while agent.execute_step():
+                pass
+        else:
+            agent.fast_forward()
+        agent.stop_trace()
+        return filename, agent
+
+    def test_fast_forward_trace_matches_stepping(self):
+        """Bulk and per-step recording write the same records."""
+        stepped, _ = self.traced_run("stepped.trc", True)
+        forwarded, _ = self.traced_run("forwarded.trc", False, compress=True)
+        with TraceReader(stepped) as first, TraceReader(forwarded) as second:
+            self.assertEqual(len(first), len(self.route) + 1)
+            self.assertEqual(first.records(0, len(first)).tolist(),
+                             second.records(0, len(second)).tolist())
+            self.assertEqual([first.state(step) for step in range(len(first))],
+                             [second.state(step) for step in range(len(second))])
+
+    def test_seek_matches_simulation(self):
+        """Any step can be decoded directly and matches the live state at that step."""
+        filename, _ = self.traced_run("run.trc", True)
+        agent = self.make_agent(copy.deepcopy(self.grid), 500)
+        expected = []
+        while agent.execute_step():
+            obstacle = agent.grid.moving_obstacles[0]
+            expected.append(((agent.x, agent.y), agent.fuel, agent.delivered_packages,
+                             (obstacle.current_x, obstacle.current_y)))
+        with TraceReader(filename) as reader:
+            for step in [17, 3, 22, 9]:
+                state = reader.state(step)
+                self.assertEqual((state["position"], state["fuel"], state["delivered"],
+                                  state["obstacles"][0]), expected[step - 1])
+
+            replayed = self.make_agent(copy.deepcopy(self.grid), 500)
+            reader.restore(12, replayed)
+            obstacle = replayed.grid.moving_obstacles[0]
+            self.assertEqual(((replayed.x, replayed.y), replayed.fuel, replayed.delivered_packages,
+                              (obstacle.current_x, obstacle.current_y)), expected[11])
+
+    def test_truncated_trace(self):
+        """A trace without its index, as left by a crash, is still readable."""
+        filename, _ = self.traced_run("run.trc", True, compress=True)
+        with TraceReader(filename) as reader:
+            last = reader.state(-1)
+            index_offset = reader.block_offsets[-1]
+            index_size = 8 * len(reader.block_offsets) + FOOTER.size
+        with open(filename, "r+b") as f:
+            f.seek(0, 2)
+            f.truncate(f.tell() - index_size)
+        with TraceReader(filename) as reader:
+            self.assertEqual(reader.block_offsets[-1], index_offset)
+            self.assertEqual(reader.state(-1), last)
+
+class TestStopIndex(unittest.TestCase):
+    """Test cases for the bucketed index of pending stops."""
+
+    def test_membership_and_removal(self):
+        """Stops behave like a multiset in insertion order."""
+        index = StopIndex([(3, 4), (40, 2), (3, 4)], bucket_size=8)
+        self.assertEqual(len(index), 3)
+        index.remove((3, 4))
+        self.assertIn((3, 4), index)
+        index.remove((3, 4))
+        self.assertNotIn((3, 4), index)
+        self.assertEqual(list(index), [(40, 2)])
+        with self.assertRaises(ValueError):
+            index.remove((3, 4))
+
+    def test_nearest_matches_brute_force(self):
+        """k-nearest queries agree with sorting every stop by distance."""
+        rng = random.Random(7)
+        stops = list({(rng.randrange(200), rng.randrange(200)) for _ in range(300)})
+        index = StopIndex(stops, bucket_size=10)
+        for _ in range(50):
+            x, y = rng.randrange(-20, 220), rng.randrange(-20, 220)
+            found = index.nearest(x, y, k=5)
+            distances = sorted(abs(sx - x) + abs(sy - y) for sx, sy in stops)[:5]
+            self.assertEqual([abs(sx - x) + abs(sy - y) for sx, sy in found], distances)
+
+    def test_mask(self):
+        """The vectorized membership test tracks additions and removals."""
+        index = StopIndex([(1, 2), (5, 5)])
+        self.assertEqual(index.mask([1, 5, 2], [2, 5, 1]).tolist(), [True, True, False])
+        index.remove((5, 5))
+        index.add(2, 1)
+        self.assertEqual(index.mask([1, 5, 2], [2, 5, 1]).tolist(), [True, False, True])
+
+    def test_route_order(self):
+        """Deliveries visit the nearest package first and drop off afterwards."""
+        grid = Grid(20, 20)
+        agent = Delivery_agent(grid, 0, 0)
+        agent.verbose = False
+        agent.add_package(15, 15)
+        agent.add_package(2, 1)
+        agent.add_destination(0, 19)
+        agent.add_destination(16, 16)
+        self.assertEqual(agent.route_order(), [(2, 1), (15, 15), (16, 16), (0, 19)])
+        self.assertTrue(agent.deliver_packages())
+        self.assertEqual(agent.delivered_packages, 2)
+
+class TestOrderStream(unittest.TestCase):
+    """Test cases for orders inserted into a live route."""
+
+    def setUp(self):
+        """Set up a grid with a partial wall and a quiet agent with plenty of fuel."""
+        self.grid = Grid(30, 30)
+        for y in range(25):
+            self.grid.add_obstacle(15, y)
+        self.agent = Delivery_agent(self.grid, 0, 0, fuel=10000)
+        self.agent.verbose = False
+        self.rng = random.Random(3)
+
+    def open_cell(self):
+        """Pick a random passable cell."""
+        while True:
+            cell = (self.rng.randrange(30), self.rng.randrange(30))
+            if self.grid.is_valid(*cell):
+                return cell
+
+    def test_cached_legs_are_exact(self):
+        """Every cached leg starts at the previous stop and costs what A* finds."""
+        for _ in range(15):
+            self.assertTrue(self.agent.insert_order(self.open_cell(), self.open_cell()))
+        position = (0, 0)
+        for stop, path, cost in zip(self.agent.route.stops, self.agent.route.paths,
+                                    self.agent.route.costs):
+            self.assertEqual((path[0], path[-1]), (position, stop))
+            self.assertEqual(cost, a_star(self.grid, position, stop)[1])
+            position = stop
+
+    def test_cheapest_insertion(self):
+        """The chosen slots match a brute-force search over all slot pairs."""
+        for _ in range(6):
+            self.agent.insert_order(self.open_cell(), self.open_cell())
+        route = self.agent.route
+        for _ in range(20):
+            package, destination = self.open_cell(), self.open_cell()
+            added = route.best_insertion((0, 0), package, destination, 1)[2]
+            best = min(self.added_cost(route, package_slot, destination_slot, package, destination)
+                       for package_slot in range(len(route) + 1)
+                       for destination_slot in range(package_slot, len(route) + 1))
+            self.assertEqual(added, best)
+
+    def added_cost(self, route, package_slot, destination_slot, package, destination):
+        """Estimated extra cost of inserting both stops at the given gaps."""
+        distance = lambda a, b: abs(a[0] - b[0]) + abs(a[1] - b[1])
+        stops = [(stop, index) for index, stop in enumerate(route.stops)]
+        stops.insert(destination_slot, (destination, None))
+        stops.insert(package_slot, (package, None))
+        total, previous = 0, ((0, 0), -1)
+        for stop in stops:
+            # Untouched legs keep their cached cost, new ones use the estimate
+            if stop[1] is not None and previous[1] == stop[1] - 1:
+                total += route.costs[stop[1]]
+            else:
+                total += distance(previous[0], stop[0])
+            previous = stop
+        return total - route.total_cost()
+
+    def test_only_affected_legs_are_planned(self):
+        """Inserting an order plans at most four legs, whatever the route length."""
+        for _ in range(30):
+            self.agent.insert_order(self.open_cell(), self.open_cell())
+        planned = []
+        plan_leg = self.agent._plan_leg
+        self.agent._plan_leg = lambda *args: planned.append(args) or plan_leg(*args)
+        self.assertTrue(self.agent.insert_order(self.open_cell(), self.open_cell()))
+        self.assertLessEqual(len(planned), 4)
+
+    def test_infeasible_order_leaves_route_unchanged(self):
+        """An order that would overrun the fuel is rejected and rolled back."""
+        self.agent.fuel = 60
+        self.assertTrue(self.agent.insert_order((5, 0), (5, 5)))
+        stops = list(self.agent.route.stops)
+        self.assertFalse(self.agent.insert_order((29, 0), (29, 29)))
+        self.assertEqual(self.agent.route.stops, stops)
+        self.assertEqual(list(self.agent.packages), [(5, 0)])
+
+    def test_serve_orders_while_driving(self):
+        """Orders arriving mid-route are all delivered."""
+        self.agent.submit_order(*self.open_cell(), *self.open_cell())
+        arrivals = iter([[(self.open_cell(), self.open_cell())] if step % 7 == 0 else []
+                         for step in range(100)])
+        self.assertTrue(self.agent.serve_orders(arrivals=arrivals))
+        self.assertEqual(self.agent.delivered_packages, 16)
+        self.assertEqual(len(self.agent.route), 0)
+
+class TestCompactPaths(unittest.TestCase):
+    """Test cases for array paths and their encodings."""
+
+    def setUp(self):
+        """Set up a grid with a wall to detour around."""
+        self.grid = Grid(20, 20)
+        for y in range(15):
+            self.grid.add_obstacle(10, y)
+
+    def test_encodings_round_trip(self):
+        """Move codes and move runs rebuild the planned path exactly."""
+        path, _, _ = a_star(self.grid, (0, 0), (19, 0))
+        start, codes = encode_moves(path)
+        self.assertEqual(len(codes), len(path) - 1)
+        self.assertEqual(decode_moves(start, codes).tolist(), [list(cell) for cell in path])
+        encoded = encode_rle(path)
+        self.assertLess(len(encoded["moves"]), len(path))
+        self.assertEqual(decode_rle(encoded).tolist(), [list(cell) for cell in path])
+        self.assertEqual(decode_rle(encode_rle([(4, 5)])).tolist(), [[4, 5]])
+        with self.assertRaises(ValueError):
+            encode_moves([(0, 0), (2, 0)])
+
+    def test_agent_path_is_a_view(self):
+        """The agent drives an int32 array and keeps driving views of it."""
+        agent = Delivery_agent(self.grid, 0, 0)
+        self.assertTrue(agent.plan_path_to(19, 0))
+        self.assertEqual(agent.path.dtype, np.int32)
+        self.assertIsNotNone(agent.path.base)
+        full = agent.path
+        agent.execute_step()
+        remaining = agent.path[agent.current_step:]
+        self.assertTrue(np.shares_memory(remaining, full))
+        self.assertEqual((agent.x, agent.y), tuple(full[0].tolist()))
+        self.assertIsInstance(agent.x, int)
+
+    def test_api_rle_format(self):
+        """plan_path returns move runs on request and rejects unknown formats."""
+        api = Delivery_API()
+        api.create_grid_map(20, 20)
+        for y in range(15):
+            api.grid_map.add_obstacle(10, y)
+        listed = api.plan_path(0, 0, 19, 0)
+        encoded = api.plan_path(0, 0, 19, 0, path_format="rle")
+        self.assertEqual(encoded["status"], "success")
+        self.assertEqual(encoded["length"], encoded["path"]["length"])
+        self.assertEqual(decode_rle(encoded["path"]).tolist(), [list(cell) for cell in listed["path"]])
+        self.assertEqual(api.plan_path(0, 0, 19, 0, path_format="xml")["status"], "error")
+
+class TestEventScheduler(unittest.TestCase):
+    """Test cases for the event clock."""
+
+    def test_events_run_in_time_order(self):
+        """Events run by time, ties in scheduling order, and cancelled ones never."""
+        scheduler = EventScheduler()
+        seen = []
+        scheduler.on("tick", lambda time, payload: seen.append((time, payload)))
+        for time, payload in [(5, "c"), (1, "a"), (5, "d"), (3, "b")]:
+            scheduler.schedule(time, "tick", payload)
+        scheduler.cancel(scheduler.schedule(4, "tick", "cancelled"))
+        self.assertEqual(scheduler.next_time(), 1)
+        self.assertEqual(scheduler.run(until=3), 2)
+        self.assertEqual(scheduler.now, 3)
+        self.assertEqual(scheduler.run(), 2)
+        self.assertEqual(seen, [(1, "a"), (3, "b"), (5, "c"), (5, "d")])
+        self.assertEqual(len(scheduler), 0)
+        with self.assertRaises(ValueError):
+            scheduler.schedule(2, "tick")
+
+class TestDeliverySimulation(unittest.TestCase):
+    """Test cases for event-driven delivery simulation."""
+
+    def setUp(self):
+        """Set up a grid with a wall and a patrolling obstacle."""
+        self.grid = Grid(30, 30)
+        for y in range(25):
+            self.grid.add_obstacle(15, y)
+        self.grid.add_moving_obstacle(MovingObstacle(20, 28, [(20, 28), (21, 28), (22, 28)], pace=2))
+        self.orders = [(0, (3, 3), (25, 5)), (10, (20, 10), (2, 20)), (500, (10, 10), (28, 2))]
+
+    def quiet_agent(self, grid):
+        """An agent at the origin with plenty of fuel."""
+        agent = Delivery_agent(grid, 0, 0, fuel=10000)
+        agent.verbose = False
+        return agent
+
+    def test_matches_lock_step(self):
+        """Event-driven and step-by-step serving deliver the same orders with the same fuel."""
+        stepped_grid = copy.deepcopy(self.grid)
+        agent = self.quiet_agent(self.grid)
+        simulation = DeliverySimulation(self.grid, [agent])
+        simulation.add_orders((time, 0, package, destination) for time, package, destination in self.orders)
+        result = simulation.run()
+        self.assertEqual(result["delivered"], 3)
+        self.assertEqual(result["failed"], [])
+        self.assertLess(result["events"], 10)
+        self.assertEqual(self.grid.ticks, result["time"])
+
+        stepped = self.quiet_agent(stepped_grid)
+        batches = [[] for _ in range(501)]
+        for time, package, destination in self.orders:
+            batches[time].append((package, destination))
+        self.assertTrue(stepped.serve_orders(arrivals=iter(batches)))
+        self.assertEqual(stepped.delivered_packages, 3)
+        self.assertEqual(stepped.fuel, agent.fuel)
+
+    def test_fleet_and_watched_obstacle(self):
+        """Several agents share the grid, and watched waypoints match the obstacle's moves."""
+        agents = [self.quiet_agent(self.grid) for _ in range(3)]
+        simulation = DeliverySimulation(self.grid, agents)
+        simulation.add_orders((time, index, package, destination)
+                              for index, (time, package, destination) in enumerate(self.orders))
+        waypoints = []
+        simulation.watch_obstacle(0, lambda time, index, position: waypoints.append((time, position)))
+        with self.assertRaises(ValueError):
+            simulation.run()
+        result = simulation.run(until=600)
+        self.assertEqual(result["delivered"], 3)
+        self.assertEqual([time for time, _ in waypoints[:3]], [2, 4, 6])
+        self.assertEqual([position for _, position in waypoints[:3]], [(21, 28), (22, 28), (20, 28)])
+        obstacle = self.grid.moving_obstacles[0]
+        self.assertEqual(waypoints[-1][1], obstacle.path[obstacle.current_step])
+
+    def test_arriving_on_empty_tank(self):
+        """A leg that uses up the last fuel on arrival succeeds; one that runs dry a cell short fails."""
+        for spare, expected in [(0, 1), (-2, 0)]:
+            grid = Grid(10, 10)
+            agent = self.quiet_agent(grid)
+            self.assertTrue(agent.insert_order((3, 0), (3, 5)))
+            agent.fuel = agent.route.total_cost() + spare
+            legs = [agent.drive_leg(), agent.drive_leg()]
+            self.assertEqual(agent.delivered_packages, expected)
+            if expected:
+                self.assertEqual((legs, agent.fuel, agent.drive_leg()), ([3, 5], 0, 0))
+            else:
+                self.assertEqual((legs[1], agent.fuel), (None, 0))
+
+class TestLookahead(unittest.TestCase):
+    """Test cases for predicted collisions and their local repair."""
+
+    def setUp(self):
+        """Set up an open grid with a corridor route along the top row."""
+        self.grid = Grid(12, 6)
+        self.cells = np.array([(x, 0) for x in range(1, 12)], dtype=np.int32)
+        # Pulls onto the route at (5, 0) just as the agent would get there
+        self.crossing = [(5, 1)] * 3 + [(5, 0)] * 2 + [(5, 1)] * 3
+
+    def assertClear(self, origin, cells):
+        """The cells form a walk from origin (waits allowed) that meets no obstacle."""
+        steps = np.abs(np.diff(np.vstack([origin, cells]), axis=0)).sum(axis=1)
+        self.assertTrue((steps <= 1).all())
+        self.assertIsNone(first_conflict(self.grid, cells))
+
+    def test_prediction_matches_obstacles(self):
+        """Predicted cells follow get_position_at_time for every pace and phase."""
+        for pace in [1, 2, 3]:
+            obstacle = MovingObstacle(0, 1, [(0, 1), (1, 1), (2, 1), (3, 1)], pace)
+            obstacle.advance(pace + 1)
+            self.grid.add_moving_obstacle(obstacle)
+        predicted = predict_cells(self.grid, 10)
+        for row, obstacle in zip(predicted, self.grid.moving_obstacles):
+            expected = [y * 12 + x for x, y in map(obstacle.get_position_at_time, range(11))]
+            self.assertEqual(row.tolist(), expected)
+
+    def test_wait_for_crossing_obstacle(self):
+        """A vehicle crossing the route is let through by waiting."""
+        self.grid.add_moving_obstacle(MovingObstacle(5, 1, self.crossing))
+        conflict = first_conflict(self.grid, self.cells)
+        self.assertIsNotNone(conflict)
+        repaired = repair(self.grid, (0, 0), self.cells, conflict)
+        self.assertClear((0, 0), repaired)
+        self.assertEqual(repaired[-1].tolist(), [11, 0])
+        self.assertLessEqual(len(repaired) - len(self.cells), 3)
+
+    def test_detour_around_parked_obstacle(self):
+        """A vehicle parked on the route is passed by a detour that rejoins it."""
+        self.grid.add_moving_obstacle(MovingObstacle(5, 0, [(5, 0)]))
+        repaired = repair(self.grid, (0, 0), self.cells, first_conflict(self.grid, self.cells))
+        self.assertClear((0, 0), repaired)
+        self.assertEqual(repaired[-4:].tolist(), self.cells[-4:].tolist())
+
+    def test_agent_repairs_instead_of_replanning(self):
+        """The mission drives planned legs with local repairs rather than new searches."""
+        self.grid = Grid(12, 2)
+        for x in range(12):
+            if x != 5:
+                self.grid.add_obstacle(x, 1)
+        self.grid.add_moving_obstacle(MovingObstacle(5, 1, self.crossing))
+        agent = Delivery_agent(self.grid, 0, 0, fuel=1000)
+        agent.verbose = False
+        agent.add_package(11, 0)
+        agent.add_destination(0, 0)
+        self.assertTrue(agent.deliver_packages())
+        self.assertGreaterEqual(agent.local_repairs, 1)
+        self.assertEqual(agent.searches, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Tests for seeded map and scenario generation and the map file formats.
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.environment import Grid, GroundType
+from src.bulk_paths import multi_source_dijkstra
+from src.map_generator import generate_map, generate_orders, save_orders, load_orders, TERRAIN_MIX
+
+class TestMapGenerator(unittest.TestCase):
+    """Test cases for generated layouts, terrain, vehicles and orders."""
+
+    def test_same_seed_same_scenario(self):
+        """A seed fixes the layers, the vehicles and the orders."""
+        first = generate_map(60, 40, "city", 0.05, moving_obstacles=6, seed=11)
+        second = generate_map(60, 40, "city", 0.05, moving_obstacles=6, seed=11)
+        self.assertTrue((first.grid == second.grid).all())
+        self.assertTrue((first.terrain == second.terrain).all())
+        self.assertEqual([o.path for o in first.moving_obstacles],
+                         [o.path for o in second.moving_obstacles])
+        self.assertEqual(generate_orders(first, 50, seed=2), generate_orders(second, 50, seed=2))
+
+    def test_maze_is_a_spanning_tree(self):
+        """Every corridor cell is reachable and there is exactly one way between any two."""
+        grid = generate_map(41, 31, "maze", terrain_scale=None, seed=3)
+        free = grid.passable_mask()
+        links = (free[:, 1:] & free[:, :-1]).sum() + (free[1:] & free[:-1]).sum()
+        dist, _ = multi_source_dijkstra(grid, [(1, 1)])
+        self.assertTrue(np.isfinite(dist[free]).all())
+        self.assertEqual(links, free.sum() - 1)
+
+    def test_terrain_bands_follow_mix(self):
+        """Each terrain covers its share of the map and the counts are tracked."""
+        grid = generate_map(200, 100, seed=5)
+        for ground, share in TERRAIN_MIX.items():
+            self.assertAlmostEqual(grid.terrain_counts[ground.value] / grid.terrain.size, share, places=2)
+        self.assertEqual(grid.min_cost(), GroundType.ASPHALT.value)
+
+    def test_vehicles_and_orders_on_free_cells(self):
+        """Patrols and orders never touch static obstacles, and a depot restricts orders to its component."""
+        grid = generate_map(80, 80, "city", moving_obstacles=30, seed=7)
+        free = grid.passable_mask()
+        for obstacle in grid.moving_obstacles:
+            self.assertTrue(all(free[y, x] for x, y in obstacle.path))
+        grid.add_obstacle(1, 0)
+        grid.add_obstacle(0, 1)
+        orders = generate_orders(grid, 20, depot=(1, 5), seed=1)
+        self.assertNotIn((0, 0), [cell for order in orders for cell in order])
+        self.assertTrue(all(free[y, x] for order in orders for x, y in order))
+
+class TestMapFiles(unittest.TestCase):
+    """Test cases for the text and binary map formats."""
+
+    def test_round_trip(self):
+        """Both formats restore obstacles, terrain and moving obstacles."""
+        grid = generate_map(70, 45, "city", 0.1, moving_obstacles=8, seed=13)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["map.txt", "map.npz"]:
+                filename = os.path.join(tmp, name)
+                grid.save_to_file(filename)
+                loaded = Grid(1, 1)
+                loaded.load_from_file(filename)
+                self.assertTrue((loaded.grid == grid.grid).all())
+                self.assertTrue((loaded.terrain == grid.terrain).all())
+                self.assertEqual(loaded.terrain_counts, grid.terrain_counts)
+                self.assertEqual([(o.path, o.pace) for o in loaded.moving_obstacles],
+                                 [(o.path, o.pace) for o in grid.moving_obstacles])
+
+            orders = generate_orders(grid, 25, seed=4)
+            filename = os.path.join(tmp, "orders.txt")
+            save_orders(filename, orders)
+            self.assertEqual(load_orders(filename), orders)
+
+    def test_unknown_terrain_rejected(self):
+        """Layers with values that are not ground types are refused."""
+        grid = Grid(3, 2)
+        with self.assertRaises(ValueError):
+            grid.set_layers(np.zeros((2, 3), dtype=bool), np.full((2, 3), 5))
+
+if __name__ == "__main__":
+    unittest.main()
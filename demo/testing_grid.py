@@ -0,0 +1,250 @@
+"""
+Tests for the Grid change tracking and derived-data support.
+"""
+
+from collections import deque
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.environment import Grid, GroundType, MovingObstacle
+from src.ALGO import ucs, a_star, BFS_path_finder
+from src.agent import Delivery_agent
+from src.API import Delivery_API
+
+class TestGridChanges(unittest.TestCase):
+    """Test cases for Grid versioning, dirty regions and subscriptions."""
+
+    def setUp(self):
+        """Set up a test grid."""
+        self.grid = Grid(10, 8)
+
+    def test_version_is_monotonic(self):
+        """Every structural edit bumps the version once; no-ops do not."""
+        self.assertEqual(self.grid.version, 0)
+        self.grid.add_obstacle(2, 3)
+        self.grid.set_ground_type(4, 4, GroundType.FIELD)
+        self.assertEqual(self.grid.version, 2)
+
+        self.grid.add_obstacle(2, 3)
+        self.grid.set_ground_type(4, 4, GroundType.FIELD)
+        self.assertEqual(self.grid.version, 2)
+
+    def test_changes_since(self):
+        """changes_since returns only the edits after the given version."""
+        self.grid.add_obstacle(1, 1)
+        version = self.grid.version
+        self.grid.set_ground_type(5, 6, GroundType.SLUDGE)
+        self.grid.add_moving_obstacle(MovingObstacle(3, 3, [(3, 3), (4, 3), (4, 5)]))
+
+        changes = self.grid.changes_since(version)
+        self.assertEqual([c.kind for c in changes], ["terrain", "moving_obstacle"])
+        self.assertEqual(changes[1][2:], (3, 3, 4, 5))
+        self.assertEqual(self.grid.dirty_region_since(version), (3, 3, 5, 6))
+        self.assertIsNone(self.grid.dirty_region_since(self.grid.version))
+
+    def test_truncated_log(self):
+        """A version older than the log forces a full rebuild."""
+        grid = Grid(100, 100)
+        grid.change_log = deque(maxlen=4)
+        for x in range(10):
+            grid.add_obstacle(x, 0)
+        self.assertIsNone(grid.changes_since(2))
+        self.assertEqual(grid.dirty_region_since(2), (0, 0, 99, 99))
+        self.assertEqual(len(grid.changes_since(7)), 3)
+
+    def test_subscribe(self):
+        """Subscribers see each change until they unsubscribe."""
+        seen = []
+        subscriber_id = self.grid.subscribe(seen.append)
+        self.grid.add_obstacle(0, 0)
+        self.grid.unsubscribe(subscriber_id)
+        self.grid.add_obstacle(1, 0)
+
+        self.assertEqual(len(seen), 1)
+        self.assertTrue(seen[0].contains(0, 0))
+
+    def test_reload_keeps_version_monotonic(self):
+        """Loading a file reports one whole-grid change to existing subscribers."""
+        lines = ["4 3", "1", "1 1"] + ["2 2 2 2"] * 3 + ["0"]
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "map.txt")
+            with open(filename, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            seen = []
+            self.grid.add_obstacle(0, 0)
+            self.grid.subscribe(seen.append)
+            self.grid.load_from_file(filename)
+
+        self.assertEqual(self.grid.version, 2)
+        self.assertEqual([c.kind for c in seen], ["reload"])
+        self.assertEqual(seen[0][2:], (0, 0, 3, 2))
+        self.assertFalse(self.grid.is_valid(1, 1))
+
+class TestFlowFields(unittest.TestCase):
+    """Test cases for pinned destinations and their flow fields."""
+
+    def setUp(self):
+        """Set up a grid with a wall and a sludge band, and pin a depot."""
+        self.grid = Grid(12, 12)
+        for y in range(0, 9):
+            self.grid.add_obstacle(6, y)
+        for x in range(12):
+            self.grid.set_ground_type(x, 10, GroundType.SLUDGE)
+        self.grid.pin_destination(10, 2)
+
+    def test_field_matches_search(self):
+        """Cost-to-go and walked paths match uniform cost search."""
+        field = self.grid.flow_field(10, 2)
+        for start in [(0, 0), (3, 11), (11, 11), (7, 2)]:
+            _, cost, _ = ucs(self.grid, start, (10, 2))
+            path = field.path_from(*start)
+            self.assertEqual(field.cost_from(*start), cost)
+            self.assertEqual(path[0], start)
+            self.assertEqual(path[-1], (10, 2))
+            self.assertEqual(sum(self.grid.get_cost(x, y) for x, y in path[1:]), cost)
+
+    def test_unpinned_goal_has_no_field(self):
+        """Only pinned destinations get a flow field."""
+        self.assertIsNone(self.grid.flow_field(0, 0))
+        self.grid.unpin_destination(10, 2)
+        self.assertIsNone(self.grid.flow_field(10, 2))
+
+    def test_invalidation(self):
+        """Edits on reachable cells drop the field; unreachable ones keep it."""
+        field = self.grid.flow_field(10, 2)
+        self.grid.set_ground_type(6, 3, GroundType.FIELD)  # under the wall
+        self.assertIs(self.grid.flow_field(10, 2), field)
+
+        self.grid.add_obstacle(6, 9)
+        rebuilt = self.grid.flow_field(10, 2)
+        self.assertIsNot(rebuilt, field)
+        self.assertEqual(rebuilt.version, self.grid.version)
+
+    def test_memory_bound(self):
+        """The cache evicts least recently used fields past its byte budget."""
+        self.grid.pin_destination(0, 0)
+        self.grid.flow_fields.max_bytes = self.grid.flow_field(10, 2).nbytes
+        self.grid.flow_field(0, 0)
+        self.assertEqual(list(self.grid.flow_fields.fields), [(0, 0)])
+        self.assertIsNotNone(self.grid.flow_field(10, 2))
+
+    def test_agent_walks_field(self):
+        """plan_path_to a pinned goal uses the field's path."""
+        agent = Delivery_agent(self.grid, 0, 11)
+        self.assertTrue(agent.plan_path_to(10, 2))
+        self.assertEqual(list(map(tuple, agent.path.tolist())), self.grid.flow_field(10, 2).path_from(0, 11)[1:])
+
+class TestGridSnapshots(unittest.TestCase):
+    """Test cases for copy-on-write grid snapshots."""
+
+    def setUp(self):
+        """Set up a grid with a moving obstacle and a snapshot of it."""
+        self.grid = Grid(20, 20)
+        self.grid.add_moving_obstacle(MovingObstacle(5, 5, [(5, 5), (6, 5)]))
+        self.snapshot = self.grid.snapshot()
+
+    def test_shares_base_arrays(self):
+        """An unedited snapshot copies nothing."""
+        self.assertTrue(np.shares_memory(self.snapshot.grid, self.grid.grid))
+        self.assertIs(self.snapshot.moving_obstacles, self.grid.moving_obstacles)
+        self.assertEqual(self.snapshot.overlay_size(), 0)
+
+    def test_edits_stay_in_overlay(self):
+        """Closing a street in the snapshot reroutes only the snapshot's planners."""
+        for y in range(19):
+            self.snapshot.add_obstacle(10, y)
+        self.snapshot.set_ground_type(3, 0, GroundType.SLUDGE)
+
+        self.assertEqual(self.snapshot.overlay_size(), 20)
+        self.assertTrue(self.grid.is_valid(10, 0))
+        self.assertEqual(a_star(self.grid, (0, 0), (19, 0))[1], 38)
+        _, cost, _ = a_star(self.snapshot, (0, 0), (19, 0))
+        self.assertEqual(cost, ucs(self.snapshot, (0, 0), (19, 0))[1])
+        self.assertEqual(BFS_path_finder(self.snapshot, (0, 0), (19, 0), "wavefront")[1], 57)
+        self.assertEqual(self.snapshot.min_cost(), GroundType.ASPHALT.value)
+        self.assertEqual(self.snapshot.terrain[0, 3], GroundType.SLUDGE.value)
+
+    def test_base_edits_do_not_show_through(self):
+        """The base saves old values into live snapshots before changing a cell."""
+        self.grid.add_obstacle(2, 2)
+        self.grid.set_ground_type(4, 4, GroundType.FIELD)
+        self.assertTrue(self.snapshot.is_valid(2, 2))
+        self.assertEqual(self.snapshot.get_cost(4, 4), GroundType.ASPHALT.value)
+        self.assertEqual(self.snapshot.grid[2, 2], 0)
+
+    def test_handed_out_arrays_stay_unchanged(self):
+        """Layers read from an unedited snapshot are read-only and keep their contents."""
+        cells, terrain = self.snapshot.grid, self.snapshot.terrain
+        self.assertFalse(cells.flags.writeable)
+        with self.assertRaises(ValueError):
+            cells[0, 0] = 1
+        self.grid.add_obstacle(2, 2)
+        self.grid.set_ground_type(4, 4, GroundType.FIELD)
+        self.assertEqual(cells[2, 2], 0)
+        self.assertEqual(terrain[4, 4], GroundType.ASPHALT.value)
+        self.assertFalse(self.grid.is_valid(2, 2))
+        self.assertEqual(self.grid.get_cost(4, 4), GroundType.FIELD.value)
+
+    def test_whole_grid_replacement_is_rejected(self):
+        """Snapshots refuse file loads and layer replacement with a TypeError."""
+        with self.assertRaises(TypeError):
+            self.snapshot.load_from_file("grid.txt")
+        with self.assertRaises(TypeError):
+            self.snapshot.set_layers(np.zeros((20, 20), bool), np.zeros((20, 20), np.uint8))
+
+    def test_moving_obstacles_copied_on_write(self):
+        """Advancing the snapshot's obstacles leaves the base's in place."""
+        self.snapshot.update_moving_obstacles()
+        self.assertEqual(self.snapshot.moving_obstacles[0].current_x, 6)
+        self.assertEqual(self.grid.moving_obstacles[0].current_x, 5)
+
+    def test_snapshot_of_snapshot(self):
+        """Nested snapshots inherit the overlay but not later edits."""
+        self.snapshot.add_obstacle(1, 1)
+        nested = self.snapshot.snapshot()
+        self.snapshot.add_obstacle(1, 2)
+        self.assertFalse(nested.is_valid(1, 1))
+        self.assertTrue(nested.is_valid(1, 2))
+
+class TestCompactLayers(unittest.TestCase):
+    """Test cases for the one-byte grid layers and the API's grid reports."""
+
+    def setUp(self):
+        """Set up an API with a small mixed-terrain grid saved to disk."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        grid = Grid(6, 4)
+        grid.add_obstacle(2, 1)
+        grid.add_obstacle(2, 2)
+        grid.set_ground_type(0, 0, GroundType.RIVER)
+        grid.set_ground_type(5, 3, GroundType.SLUDGE)
+        self.filename = os.path.join(self.tmp.name, "map.txt")
+        grid.save_to_file(self.filename)
+        self.api = Delivery_API()
+
+    def test_layers_are_bytes(self):
+        """Both layers take one byte per cell and costs come from the lookup table."""
+        grid = Grid(30, 20)
+        grid.set_ground_type(3, 4, GroundType.SLUDGE)
+        self.assertEqual((grid.grid.dtype, grid.terrain.dtype), (np.uint8, np.uint8))
+        self.assertEqual(grid.get_cost(3, 4), GroundType.SLUDGE.value)
+        self.assertEqual(grid.cost_array()[4, 3], GroundType.SLUDGE.value)
+        usage = grid.memory_usage()
+        self.assertEqual(usage["cell_types"] + usage["terrain"], 2 * 30 * 20)
+
+    def test_load_and_info(self):
+        """Loading reports the grid, and grid info counts obstacles, terrain and memory."""
+        loaded = self.api.load_grid_map(self.filename)
+        self.assertEqual(loaded["status"], "success")
+        self.assertEqual((loaded["width"], loaded["height"], loaded["obstacles"]), (6, 4, 2))
+
+        self.assertEqual(self.api.set_Ground(1, 1, "grass")["status"], "success")
+        self.assertEqual(self.api.set_Ground(1, 1, "lava")["status"], "error")
+        info = self.api.get_grid_info()
+        self.assertEqual(info["status"], "success")
+        self.assertEqual(info["terrain_types"], {"road": 21, "grass": 1, "mud": 1, "water": 1})
+        self.assertEqual(info["memory"]["total"], 2 * 6 * 4)
+
+if __name__ == "__main__":
+    unittest.main()
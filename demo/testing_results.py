@@ -0,0 +1,83 @@
+"""
+Tests for streamed experiment results.
+"""
+
+import csv
+import json
+import math
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from src.UTILITY import ResultsWriter, iter_results, aggregate_results, CSV_COLUMNS
+
+class TestResultsStream(unittest.TestCase):
+    """Test cases for the append-only results writer and chunked reader."""
+
+    def setUp(self):
+        """Set up a scratch directory and a batch of synthetic results."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = random.Random(5)
+        self.results = []
+        for index in range(500):
+            success = index % 7 != 0
+            self.results.append({
+                "success": success,
+                "path_cost": rng.randrange(50, 300) if success else float("inf"),
+                "fuel_remaining": 0,
+                "time_taken": rng.random(),
+                "path_length": rng.randrange(10, 60) if success else 0,
+                "algorithm": rng.choice(["bfs", "a_star"]),
+                "map_size": rng.choice(["small", "large"]),
+            })
+
+    def write(self, name):
+        """Stream every result into a file and return its path."""
+        filename = os.path.join(self.tmp.name, name)
+        with ResultsWriter(filename) as writer:
+            for result in self.results:
+                writer.write(result)
+        return filename
+
+    def test_csv_matches_plotting_columns(self):
+        """CSV rows are headerless and follow the plotting script's column order."""
+        filename = self.write("results.csv")
+        with open(filename, newline="") as f:
+            first = next(csv.reader(f))
+        result = self.results[0]
+        self.assertEqual(len(first), len(CSV_COLUMNS))
+        self.assertEqual(first[:2], [result["algorithm"], result["map_size"]])
+        self.assertEqual(float(first[3]), result["path_cost"])
+        self.assertEqual(float(first[5]), result["time_taken"])
+
+    def test_appends_and_skips_torn_line(self):
+        """Reopening appends, and a half-written last line is ignored."""
+        filename = self.write("results.jsonl")
+        with ResultsWriter(filename) as writer:
+            writer.write(self.results[0])
+        with open(filename, "a") as f:
+            f.write(json.dumps(self.results[1])[:20])
+
+        chunks = list(iter_results(filename, chunk_size=64))
+        self.assertTrue(all(len(chunk) <= 64 for chunk in chunks))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(self.results) + 1)
+
+    def test_aggregate_matches_full_load(self):
+        """Chunked aggregation gives the same statistics as loading everything."""
+        for name in ["results.jsonl", "results.csv"]:
+            summary = aggregate_results(self.write(name), chunk_size=33)
+            for (map_size, algorithm), stats in summary.items():
+                group = [r for r in self.results
+                         if r["map_size"] == map_size and r["algorithm"] == algorithm]
+                costs = [r["path_cost"] for r in group if math.isfinite(r["path_cost"])]
+                runtimes = [r["time_taken"] for r in group]
+                self.assertEqual((stats["runs"], stats["successes"]), (len(group), len(costs)))
+                self.assertAlmostEqual(stats["cost_mean"], np.mean(costs))
+                self.assertAlmostEqual(stats["cost_p90"], np.percentile(costs, 90))
+                self.assertAlmostEqual(stats["runtime_p50"], np.median(runtimes))
+            self.assertEqual(sum(stats["runs"] for stats in summary.values()), len(self.results))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,353 @@
+"""
+Tests for the search functions in the ALGO module.
+"""
+
+import heapq
+import random
+import unittest
+from src.environment import Grid, GroundType, MovingObstacle
+from src.ALGO import (
+    BFS_path_finder, _anneal_run, a_star, ara_star, ara_star_iter, bfs_hop_distances, simulated_annealing,
+    ucs
+)
+from src.API import Delivery_API
+from src.bucket_queue import BucketQueue
+from src.bulk_paths import HAVE_SCIPY, distance_matrix, multi_source_dijkstra
+from src.portfolio import PlannerPortfolio
+
+def path_cost(grid, path):
+    """Sum of terrain costs along a path, excluding the start cell."""
+    return sum(grid.get_cost(x, y) for x, y in path[1:])
+
+class TestSimulatedAnnealing(unittest.TestCase):
+    """Test cases for the path-space simulated annealer."""
+
+    def setUp(self):
+        """Set up a grid with a wall and an expensive band."""
+        self.grid = Grid(20, 20)
+        for y in range(2, 18):
+            self.grid.add_obstacle(10, y)
+        for x in range(20):
+            for y in range(0, 2):
+                self.grid.set_ground_type(x, y, GroundType.SLUDGE)
+
+    def test_returns_valid_path(self):
+        """Annealed paths are connected, obstacle-free and loop-free."""
+        path = simulated_annealing(self.grid, (2, 10), (17, 10), workers=1, seed=7)
+
+        self.assertIsNotNone(path)
+        self.assertEqual(path[0], (2, 10))
+        self.assertEqual(path[-1], (17, 10))
+        self.assertEqual(len(set(path)), len(path))
+        for (x1, y1), (x2, y2) in zip(path, path[1:]):
+            self.assertEqual(abs(x1 - x2) + abs(y1 - y2), 1)
+            self.assertTrue(self.grid.is_valid(x2, y2))
+
+    def test_matches_a_star_cost(self):
+        """On a small map the annealer reaches the optimal cost."""
+        path = simulated_annealing(self.grid, (2, 10), (17, 10), workers=1, seed=7)
+        _, optimal_cost, _ = a_star(self.grid, (2, 10), (17, 10))
+        self.assertEqual(path_cost(self.grid, path), optimal_cost)
+
+    def test_run_cost_matches_path(self):
+        """The cost kept incrementally across accepted moves is the cost of the path."""
+        for seed in range(5):
+            path, cost = _anneal_run(self.grid, (2, 10), (17, 10), 400, 50.0, 0.99, seed)
+            self.assertEqual(cost, path_cost(self.grid, path))
+
+    def test_parallel_restarts(self):
+        """Restarts in a process pool return the best of the runs."""
+        path = simulated_annealing(self.grid, (2, 10), (17, 10), restarts=2, workers=2, seed=3)
+        _, optimal_cost, _ = a_star(self.grid, (2, 10), (17, 10))
+        self.assertGreaterEqual(path_cost(self.grid, path), optimal_cost)
+
+    def test_unreachable_goal(self):
+        """An enclosed goal yields None."""
+        for x, y in [(4, 3), (6, 3), (5, 2), (5, 4)]:
+            self.grid.add_obstacle(x, y)
+        self.assertIsNone(simulated_annealing(self.grid, (0, 10), (5, 3), workers=1))
+
+class TestWavefrontBFS(unittest.TestCase):
+    """Test cases for the bit-packed wavefront BFS engine."""
+
+    def setUp(self):
+        """Set up a grid wider than one 64-bit word with a maze-like wall."""
+        self.grid = Grid(70, 9)
+        for y in range(0, 8):
+            self.grid.add_obstacle(30, y)
+        for y in range(1, 9):
+            self.grid.add_obstacle(65, y)
+
+    def test_matches_queue_engine(self):
+        """Both engines agree on hop counts and wavefront paths are valid."""
+        for goal in [(69, 8), (31, 0), (64, 8), (0, 0)]:
+            _, queue_hops, _ = BFS_path_finder(self.grid, (0, 0), goal)
+            path, hops, _ = BFS_path_finder(self.grid, (0, 0), goal, engine="wavefront")
+            self.assertEqual(hops, queue_hops)
+            self.assertEqual(path[0], (0, 0))
+            self.assertEqual(path[-1], goal)
+            for (x1, y1), (x2, y2) in zip(path, path[1:]):
+                self.assertEqual(abs(x1 - x2) + abs(y1 - y2), 1)
+                self.assertTrue(self.grid.is_valid(x2, y2))
+
+    def test_hop_distance_array(self):
+        """The full hop array marks unreachable and blocked cells with -1."""
+        self.grid.add_obstacle(30, 8)
+        hops, reached = bfs_hop_distances(self.grid, (0, 0))
+        self.assertEqual(hops[0, 0], 0)
+        self.assertEqual(hops[8, 29], 37)
+        self.assertEqual(hops[0, 31], -1)
+        self.assertEqual(reached, 30 * 9)
+
+    def test_unreachable_and_moving_obstacles(self):
+        """Moving obstacles at time 0 block cells just like in the queue engine."""
+        self.grid.add_moving_obstacle(MovingObstacle(30, 8, [(30, 8)]))
+        path, cost, _ = BFS_path_finder(self.grid, (0, 0), (69, 0), engine="wavefront")
+        self.assertIsNone(path)
+        self.assertEqual(cost, float("inf"))
+
+    def test_connectivity_checked_once(self):
+        """Each engine asks the grid about connectivity once per search."""
+        checks = []
+        connected = self.grid.connected
+        self.grid.connected = lambda *pair: checks.append(pair) or connected(*pair)
+        for engine in ["queue", "wavefront"]:
+            checks.clear()
+            BFS_path_finder(self.grid, (0, 0), (69, 8), engine=engine)
+            self.assertEqual(len(checks), 1)
+
+class TestAStarHeuristic(unittest.TestCase):
+    """Test cases for the terrain-scaled and weighted A* heuristic."""
+
+    def setUp(self):
+        """Set up a grid where the cheapest terrain is FIELD."""
+        self.grid = Grid(25, 25)
+        for x in range(25):
+            for y in range(25):
+                self.grid.set_ground_type(x, y, GroundType.FIELD if (x + y) % 3 else GroundType.SLUDGE)
+        for y in range(3, 22):
+            self.grid.add_obstacle(12, y)
+
+    def test_min_cost_tracks_terrain(self):
+        """min_cost follows set_ground_type changes."""
+        self.assertEqual(self.grid.min_cost(), 4)
+        self.grid.set_ground_type(0, 0, GroundType.ASPHALT)
+        self.assertEqual(self.grid.min_cost(), 2)
+        self.grid.set_ground_type(0, 0, GroundType.RIVER)
+        self.assertEqual(self.grid.min_cost(), 4)
+
+    def test_scaled_heuristic_is_optimal(self):
+        """Scaled A* matches UCS cost with fewer expansions."""
+        _, ucs_cost, ucs_expanded = ucs(self.grid, (0, 12), (24, 12))
+        _, cost, expanded = a_star(self.grid, (0, 12), (24, 12))
+        _, _, plain_expanded = a_star(self.grid, (0, 12), (24, 12), weight=1.0 / self.grid.min_cost())
+
+        self.assertEqual(cost, ucs_cost)
+        self.assertLess(expanded, ucs_expanded)
+        self.assertLessEqual(expanded, plain_expanded)
+
+    def test_weighted_mode_is_bounded(self):
+        """Weighted A* stays within its weight of the optimum."""
+        _, optimal_cost, _ = a_star(self.grid, (0, 12), (24, 12))
+        _, cost, _ = a_star(self.grid, (0, 12), (24, 12), weight=2.0)
+        self.assertLessEqual(cost, 2.0 * optimal_cost)
+
+class TestBucketQueue(unittest.TestCase):
+    """Test cases for the bucket open list."""
+
+    def test_pops_in_heap_order(self):
+        """A UCS-like push/pop sequence comes out in the same key order as heapq."""
+        rng = random.Random(3)
+        buckets, heap = BucketQueue(13), [0]
+        buckets.push(0, "start")
+        popped = []
+        while heap and len(popped) < 2000:
+            key, _ = buckets.pop()
+            self.assertEqual(key, heapq.heappop(heap))
+            popped.append(key)
+            for cost in rng.choices([2, 4, 8, 12], k=rng.randint(0, 3)):
+                buckets.push(key + cost, "cell")
+                heapq.heappush(heap, key + cost)
+        self.assertEqual(len(buckets), len(heap))
+
+    def test_rejects_keys_outside_window(self):
+        """Keys below the last pop or beyond the span are refused."""
+        queue = BucketQueue(5, start=10)
+        with self.assertRaises(ValueError):
+            queue.push(9, "early")
+        with self.assertRaises(ValueError):
+            queue.push(15, "late")
+        queue.push(12, "ok")
+        self.assertEqual(queue.pop(), (12, "ok"))
+        with self.assertRaises(IndexError):
+            queue.pop()
+
+    def test_planners_agree_with_heap(self):
+        """UCS and A* find equally cheap paths on either open list."""
+        grid = Grid(25, 25)
+        for x in range(25):
+            for y in range(25):
+                grid.set_ground_type(x, y, list(GroundType)[(x * 7 + y * 3) % 4])
+        for y in range(3, 22):
+            grid.add_obstacle(12, y)
+        for planner in (ucs, a_star):
+            _, heap_cost, _ = planner(grid, (0, 12), (24, 12), queue="heap")
+            path, bucket_cost, _ = planner(grid, (0, 12), (24, 12), queue="bucket")
+            self.assertEqual(bucket_cost, heap_cost)
+            self.assertEqual(path_cost(grid, path), bucket_cost)
+
+class TestAraStar(unittest.TestCase):
+    """Test cases for the anytime ARA* planner."""
+
+    def setUp(self):
+        """Set up a grid with mixed terrain and a partial wall."""
+        self.grid = Grid(30, 30)
+        for y in range(0, 25):
+            self.grid.add_obstacle(15, y)
+        for x in range(30):
+            for y in range(10, 20):
+                self.grid.set_ground_type(x, y, GroundType.FIELD)
+
+    def test_solutions_improve_within_bound(self):
+        """Every published solution respects its bound and the last one is optimal."""
+        _, optimal_cost, _ = a_star(self.grid, (0, 0), (29, 0))
+        solutions = list(ara_star_iter(self.grid, (0, 0), (29, 0)))
+
+        self.assertGreater(len(solutions), 0)
+        costs = [cost for _, cost, _, _ in solutions]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+        for _, cost, _, bound in solutions:
+            self.assertLessEqual(cost, bound * optimal_cost)
+        self.assertEqual(solutions[-1][1], optimal_cost)
+        self.assertEqual(solutions[-1][3], 1.0)
+
+    def test_deadline_returns_bounded_path(self):
+        """A deadline far too short for an optimal search still returns a bounded path."""
+        grid = Grid(300, 300)
+        path, cost, _, bound = ara_star(grid, (0, 0), (299, 299), deadline_ms=200)
+        self.assertIsNotNone(path)
+        self.assertEqual((path[0], path[-1]), ((0, 0), (299, 299)))
+        self.assertLessEqual(cost, bound * 598 * grid.get_cost(0, 0))
+
+    def test_api_deadline(self):
+        """plan_path with a deadline reports the ARA* bound."""
+        api = Delivery_API()
+        api.create_grid_map(20, 20)
+        result = api.plan_path(0, 0, 19, 19, deadline_ms=500)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["algorithm"], "ara_star")
+        self.assertEqual(result["cost"], 76)
+        self.assertEqual(result["bound"], 1.0)
+
+    def test_api_deadline_excludes_other_algorithms(self):
+        """A deadline cannot silently replace an explicitly requested algorithm."""
+        api = Delivery_API()
+        api.create_grid_map(20, 20)
+        self.assertEqual(api.plan_path(0, 0, 19, 19, "ucs", deadline_ms=500)["status"], "error")
+        self.assertEqual(api.plan_path(0, 0, 19, 19, "ara_star", deadline_ms=500)["status"], "success")
+
+class TestBulkPaths(unittest.TestCase):
+    """Test cases for the CSR export and the bulk shortest-path engine."""
+
+    def setUp(self):
+        """Set up a grid with a wall, mixed terrain and a walled-off corner."""
+        self.grid = Grid(15, 10)
+        for y in range(0, 8):
+            self.grid.add_obstacle(7, y)
+        for x in range(15):
+            self.grid.set_ground_type(x, 9, GroundType.RIVER)
+        self.grid.add_obstacle(13, 0)
+        self.grid.add_obstacle(14, 1)
+        self.points = [(0, 0), (14, 9), (10, 3), (14, 0)]
+
+    def test_csr_export(self):
+        """The CSR graph has one edge per ordered pair of adjacent free cells."""
+        indptr, indices, weights = self.grid.to_csr()
+        self.assertEqual(len(indptr), 15 * 10 + 1)
+        self.assertEqual(indptr[-1], len(indices))
+        start, end = indptr[9 * 15 + 0], indptr[9 * 15 + 1]
+        self.assertEqual(sorted(indices[start:end]), [8 * 15 + 0, 9 * 15 + 1])
+        self.assertEqual(list(weights[start:end][indices[start:end] == 9 * 15 + 1]), [12])
+        self.assertIs(self.grid.to_csr()[0], indptr)
+
+        self.grid.add_obstacle(0, 8)
+        self.assertIsNot(self.grid.to_csr()[0], indptr)
+
+    def check_backend(self, backend):
+        """Compare a backend's distances against uniform cost search."""
+        matrix = distance_matrix(self.grid, self.points, backend=backend)
+        for i, origin in enumerate(self.points):
+            for j, goal in enumerate(self.points):
+                self.assertEqual(matrix[i, j], ucs(self.grid, origin, goal)[1])
+
+        dist, nearest = multi_source_dijkstra(self.grid, self.points[:2], backend=backend)
+        for x, y in [(3, 3), (12, 8), (10, 3)]:
+            costs = [ucs(self.grid, source, (x, y))[1] for source in self.points[:2]]
+            self.assertEqual(dist[y, x], min(costs))
+            self.assertEqual(nearest[y, x], costs.index(min(costs)))
+        self.assertEqual(nearest[0, 14], -1)
+
+    def test_numpy_backend(self):
+        """The pure-NumPy fallback matches UCS."""
+        self.check_backend("numpy")
+
+    @unittest.skipUnless(HAVE_SCIPY, "SciPy is not installed")
+    def test_scipy_backend(self):
+        """The csgraph backend matches UCS."""
+        self.check_backend("scipy")
+
+class TestPortfolio(unittest.TestCase):
+    """Test cases for racing planners and learning which to launch."""
+
+    def setUp(self):
+        """Set up a uniform grid and a copy with a band of field terrain."""
+        self.uniform = Grid(30, 20)
+        for y in range(0, 15):
+            self.uniform.add_obstacle(12, y)
+        self.mixed = Grid(30, 20)
+        for x in range(30):
+            for y in range(5, 10):
+                self.mixed.set_ground_type(x, y, GroundType.FIELD)
+
+    def test_bfs_only_on_uniform_terrain(self):
+        """BFS engines are raced only where they are optimal, and answers match A*."""
+        portfolio = PlannerPortfolio()
+        self.assertIn("wavefront", portfolio.candidates(self.uniform))
+        self.assertNotIn("bfs", portfolio.candidates(self.mixed))
+        for grid in [self.uniform, self.mixed]:
+            result = portfolio.plan(grid, (0, 0), (29, 0))
+            self.assertEqual(result["cost"], a_star(grid, (0, 0), (29, 0))[1])
+            self.assertEqual(path_cost(grid, result["path"]), result["cost"])
+
+    def test_statistics_narrow_candidates(self):
+        """After the first queries only the winners are launched, with periodic exploration."""
+        portfolio = PlannerPortfolio(width=2, min_queries=3, explore_every=5)
+        launched = [len(portfolio.plan(self.uniform, (0, 0), (29, 19))["candidates"])
+                    for _ in range(6)]
+        self.assertEqual(launched, [4, 4, 4, 1, 1, 4])
+        self.assertEqual(len(portfolio.candidates(self.uniform)), 2)
+
+    def test_race_in_processes(self):
+        """Racing in worker processes returns an optimal path, or none when unreachable."""
+        portfolio = PlannerPortfolio(parallel_cells=0)
+        portfolio.cores = 2
+        result = portfolio.plan(self.mixed, (0, 0), (29, 19))
+        self.assertIn(result["winner"], result["candidates"])
+        self.assertEqual(result["cost"], ucs(self.mixed, (0, 0), (29, 19))[1])
+
+        self.mixed.add_obstacle(28, 19)
+        self.mixed.add_obstacle(29, 18)
+        self.assertIsNone(portfolio.plan(self.mixed, (0, 0), (29, 19))["path"])
+
+    def test_api_portfolio(self):
+        """plan_path reports the winning planner."""
+        api = Delivery_API()
+        api.create_grid_map(20, 20)
+        result = api.plan_path(0, 0, 19, 19, "portfolio")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["cost"], 76)
+        self.assertIn(result["winner"], result["candidates"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,24 @@
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import heapq
 import math
 import random
+import time
+
+import numpy as np
+
+from .bucket_queue import BucketQueue
 
 
 # ---------- BFS ----------
-def BFS_path_finder(grid, origin, destination):
+def BFS_path_finder(grid, origin, destination, engine="queue"):
+    if engine == "wavefront":
+        return wavefront_bfs(grid, origin, destination)  # checks connectivity itself
+    if engine != "queue":
+        raise ValueError(f"Unknown BFS engine: {engine}")
+    if not grid.connected(origin, destination):
+        return None, float("inf"), 0  # walled off: no need to sweep the component
+
     queue = deque([origin])
     visited = set([origin])
     parent = {origin: None}
@@ -20,23 +33,132 @@ def BFS_path_finder(grid, origin, destination):
 
         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             next_x, next_y = x + dx, y + dy
-            if grid.is_valid(next_x, next_y, time=0) and (next_x, next_y) not in visited:
+            if grid.is_valid(next_x, next_y, time_step=0) and (next_x, next_y) not in visited:
                 visited.add((next_x, next_y))
                 parent[(next_x, next_y)] = (x, y)
                 queue.append((next_x, next_y))
     return None, float("inf"), nodes_expanded
 
 
+# ---------- BFS (wavefront) ----------
+# Rows are bit-packed into 64-bit words (bit k of word j is column 64 * j + k), so
+# one frontier expansion is a handful of whole-array shifts and masks.
+def wavefront_bfs(grid, origin, destination):
+    if not grid.connected(origin, destination):
+        return None, float("inf"), 0
+    hops, nodes_expanded = bfs_hop_distances(grid, origin, destination)
+    if not (0 <= destination[0] < grid.grid_width and 0 <= destination[1] < grid.grid_height) \
+            or hops[destination[1], destination[0]] < 0:
+        return None, float("inf"), nodes_expanded
+    path = path_from_hops(hops, destination)
+    return path, len(path) - 1, nodes_expanded
+
+
+def bfs_hop_distances(grid, origin, destination=None):
+    height, width = grid.grid_height, grid.grid_width
+    words = (width + 63) // 64
+
+    passable = grid.passable_mask()
+    for obstacle in grid.moving_obstacles:
+        pred_x, pred_y = obstacle.get_position_at_time(0)
+        if 0 <= pred_x < width and 0 <= pred_y < height:
+            passable[pred_y, pred_x] = False
+    passable_bits = _pack_rows(passable, words)
+
+    hops = np.full((height, width), -1, dtype=np.int32)
+    hops[origin[1], origin[0]] = 0
+    frontier = np.zeros((height, words), dtype=np.uint64)
+    frontier[origin[1], origin[0] // 64] = np.uint64(1) << np.uint64(origin[0] % 64)
+    visited = frontier.copy()
+    one, high = np.uint64(1), np.uint64(63)
+
+    level = 0
+    while True:
+        if destination is not None and 0 <= destination[0] < width \
+                and 0 <= destination[1] < height and hops[destination[1], destination[0]] >= 0:
+            break
+        grown = frontier.copy()
+        grown[1:] |= frontier[:-1]
+        grown[:-1] |= frontier[1:]
+        grown |= frontier << one
+        grown[:, 1:] |= frontier[:, :-1] >> high
+        grown |= frontier >> one
+        grown[:, :-1] |= frontier[:, 1:] << high
+        frontier = grown & passable_bits & ~visited
+
+        # Only words holding frontier cells are unpacked to write hop counts
+        rows, cols = np.nonzero(frontier)
+        if not len(rows):
+            break
+        level += 1
+        visited |= frontier
+        bits = np.unpackbits(frontier[rows, cols].astype("<u8").view(np.uint8)
+                             .reshape(-1, 8), axis=1, bitorder="little")
+        word_index, bit = np.nonzero(bits)
+        hops[rows[word_index], cols[word_index] * 64 + bit] = level
+
+    return hops, int(np.count_nonzero(hops >= 0))
+
+
+def path_from_hops(hops, destination):
+    # Walk down the hop gradient: every cell at level d > 0 has a neighbour at d - 1
+    height, width = hops.shape
+    x, y = destination
+    path = [(x, y)]
+    level = hops[y, x]
+    while level > 0:
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            next_x, next_y = x + dx, y + dy
+            if 0 <= next_x < width and 0 <= next_y < height and hops[next_y, next_x] == level - 1:
+                x, y = next_x, next_y
+                break
+        path.append((x, y))
+        level -= 1
+    path.reverse()
+    return path
+
+
+def _pack_rows(mask, words):
+    padded = np.zeros((mask.shape[0], words * 64), dtype=bool)
+    padded[:, :mask.shape[1]] = mask
+    packed = np.packbits(padded, axis=1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64)
+
+
+# ---------- Open lists ----------
+# Keys of UCS and consistent A* never drop below the last key popped nor jump more
+# than a step's cost (plus a heuristic step) above it, so integer keys fit a
+# bucket ring; "heap" keeps the general heapq version
+def open_list(kind, span, start, origin):
+    if kind == "bucket":
+        queue = BucketQueue(span, start)
+        queue.push(start, origin)
+        return queue, queue.push, queue.pop
+    if kind != "heap":
+        raise ValueError(f"Unknown open list: {kind}")
+    queue = [(start, origin)]
+
+    def push(priority, item):
+        heapq.heappush(queue, (priority, item))
+
+    def pop():
+        return heapq.heappop(queue)
+
+    return queue, push, pop
+
+
 # ---------- UCS ----------
-def ucs(grid, origin, destination):
-    priority_queue = [(0, origin)]
+def ucs(grid, origin, destination, max_cost=None, queue="bucket"):
+    if not grid.connected(origin, destination):
+        return None, float("inf"), 0
+    priority_queue, push, pop = open_list(queue, grid.max_cost() + 1, 0, origin)
     visited = set()
     parent = {origin: None}
     cost_so_far = {origin: 0}
     nodes_expanded = 0
 
     while priority_queue:
-        cost, (x, y) = heapq.heappop(priority_queue)
+        cost, (x, y) = pop()
         nodes_expanded += 1
         if (x, y) == destination:
             path = reconstruct_path(parent, destination)
@@ -48,25 +170,38 @@ def ucs(grid, origin, destination):
 
         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             next_x, next_y = x + dx, y + dy
-            if grid.is_valid(next_x, next_y, time=0):
+            if grid.is_valid(next_x, next_y, time_step=0):
                 new_cost = cost_so_far[(x, y)] + grid.get_cost(next_x, next_y)
+                if max_cost is not None and new_cost > max_cost:
+                    continue  # beyond the fuel budget
                 if (next_x, next_y) not in cost_so_far or new_cost < cost_so_far[(next_x, next_y)]:
                     cost_so_far[(next_x, next_y)] = new_cost
                     parent[(next_x, next_y)] = (x, y)
-                    heapq.heappush(priority_queue, (new_cost, (next_x, next_y)))
+                    push(new_cost, (next_x, next_y))
     return None, float("inf"), nodes_expanded
 
 
 # ---------- A* ----------
-def a_star(grid, origin, destination):
-    priority_queue = [(0, origin)]
+def a_star(grid, origin, destination, weight=1.0, max_cost=None, queue=None):
+    # Every step costs at least the cheapest terrain on the map, so scaling Manhattan
+    # distance by it keeps the heuristic admissible; weight > 1 trades optimality
+    # (cost <= weight * optimal) for fewer expansions. Only the unweighted heuristic
+    # is consistent, so by default it gets the bucket queue and weighted runs the heap
+    if not grid.connected(origin, destination):
+        return None, float("inf"), 0
+    min_step = grid.min_cost()
+    h_scale = min_step if weight == 1 else weight * min_step
+    if queue is None:
+        queue = "bucket" if weight == 1 else "heap"
+    start = h_scale * (abs(destination[0] - origin[0]) + abs(destination[1] - origin[1]))
+    priority_queue, push, pop = open_list(queue, grid.max_cost() + min_step + 1, start, origin)
     cost_so_far = {origin: 0}
     parent = {origin: None}
     visited = set()
     nodes_expanded = 0
 
     while priority_queue:
-        f_score, (x, y) = heapq.heappop(priority_queue)
+        f_score, (x, y) = pop()
         nodes_expanded += 1
         if (x, y) == destination:
             path = reconstruct_path(parent, destination)
@@ -78,19 +213,116 @@ def a_star(grid, origin, destination):
 
         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             next_x, next_y = x + dx, y + dy
-            if grid.is_valid(next_x, next_y, time=0):
+            if grid.is_valid(next_x, next_y, time_step=0):
                 new_cost = cost_so_far[(x, y)] + grid.get_cost(next_x, next_y)
+                distance = abs(destination[0] - next_x) + abs(destination[1] - next_y)
+                if max_cost is not None and new_cost + min_step * distance > max_cost:
+                    continue  # even the cheapest completion is beyond the fuel budget
                 if (next_x, next_y) not in cost_so_far or new_cost < cost_so_far[(next_x, next_y)]:
                     cost_so_far[(next_x, next_y)] = new_cost
                     parent[(next_x, next_y)] = (x, y)
-                    h = abs(destination[0] - next_x) + abs(destination[1] - next_y)
-                    f_score = new_cost + h
-                    heapq.heappush(priority_queue, (f_score, (next_x, next_y)))
+                    f_score = new_cost + h_scale * distance
+                    push(f_score, (next_x, next_y))
     return None, float("inf"), nodes_expanded
 
 
+# ---------- Anytime Repairing A* (ARA*) ----------
+def ara_star(
+    grid, origin, destination, deadline_ms=None, initial_weight=3.0, weight_step=0.5
+):
+    """
+    Anytime weighted A*: returns (path, cost, nodes_expanded, bound) for the best path
+    found before the deadline, where cost <= bound * optimal cost.
+    """
+    best = (None, float("inf"), 0, float("inf"))
+    for path, cost, nodes_expanded, bound in ara_star_iter(
+        grid, origin, destination, deadline_ms, initial_weight, weight_step
+    ):
+        best = (path, cost, nodes_expanded, bound)
+    return best
+
+
+def ara_star_iter(
+    grid, origin, destination, deadline_ms=None, initial_weight=3.0, weight_step=0.5
+):
+    """Yield (path, cost, nodes_expanded, bound) each time ARA* publishes a better solution."""
+    if not grid.connected(origin, destination):
+        return
+    deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000.0
+
+    h_scale = grid.min_cost()
+
+    def heuristic(node):
+        return h_scale * (abs(destination[0] - node[0]) + abs(destination[1] - node[1]))
+
+    weight = initial_weight
+    cost_so_far = {origin: 0}
+    parent = {origin: None}
+    open_keys = {origin: weight * heuristic(origin)}
+    priority_queue = [(open_keys[origin], origin)]
+    closed = set()
+    incons = set()
+    nodes_expanded = 0
+
+    while True:
+        # ImprovePath: weighted A* that reuses g-values from earlier iterations
+        while priority_queue:
+            key, node = priority_queue[0]
+            if open_keys.get(node) != key:
+                heapq.heappop(priority_queue)
+                continue
+            if cost_so_far.get(destination, float("inf")) <= key:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            heapq.heappop(priority_queue)
+            del open_keys[node]
+            closed.add(node)
+            nodes_expanded += 1
+
+            x, y = node
+            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+                next_node = (x + dx, y + dy)
+                if not grid.is_valid(next_node[0], next_node[1], time_step=0):
+                    continue
+                new_cost = cost_so_far[node] + grid.get_cost(next_node[0], next_node[1])
+                if next_node not in cost_so_far or new_cost < cost_so_far[next_node]:
+                    cost_so_far[next_node] = new_cost
+                    parent[next_node] = node
+                    if next_node in closed:
+                        incons.add(next_node)
+                    else:
+                        open_keys[next_node] = new_cost + weight * heuristic(next_node)
+                        heapq.heappush(priority_queue, (open_keys[next_node], next_node))
+
+        if destination not in cost_so_far:
+            return
+
+        # Proven suboptimality bound from the unexpanded frontier
+        goal_cost = cost_so_far[destination]
+        frontier = [cost_so_far[n] + heuristic(n) for n in list(open_keys) + list(incons)]
+        bound = 1.0 if not frontier else min(weight, goal_cost / max(min(frontier), 1e-9))
+        bound = max(bound, 1.0)
+        yield reconstruct_path(parent, destination), goal_cost, nodes_expanded, bound
+
+        if bound <= 1.0:
+            return
+
+        # Decrease the weight and carry OPEN and INCONS into the next iteration
+        weight = max(1.0, weight - weight_step)
+        for node in incons:
+            open_keys[node] = 0
+        incons.clear()
+        open_keys = {n: cost_so_far[n] + weight * heuristic(n) for n in open_keys}
+        priority_queue = [(key, n) for n, key in open_keys.items()]
+        heapq.heapify(priority_queue)
+        closed.clear()
+
+
 # ---------- Local Search: Hill Climbing ----------
 def hill_climbing(grid, origin, destination, max_restarts=5):
+    if not grid.connected(origin, destination):
+        return None
     best_path = None
     for _ in range(max_restarts):
         current = origin
@@ -121,37 +353,163 @@ def hill_climbing(grid, origin, destination, max_restarts=5):
 
 # ---------- Local Search: Simulated Annealing ----------
 def simulated_annealing(
-    grid, origin, destination, max_iterations=200, temperature=98.0, cooling_rate=0.95
+    grid, origin, destination, max_iterations=1500, temperature=20.0, cooling_rate=0.995,
+    restarts=4, workers=1, seed=None
 ):
-    current = origin
-    path = [current]
+    if origin == destination:
+        return [origin]
+    if not grid.connected(origin, destination):
+        return None
+
+    # Restarts are independent, so each gets its own seed; they run in worker
+    # processes only when asked, since starting a pool costs more than one short leg
+    rng = random.Random(seed)
+    seeds = [rng.randrange(2 ** 32) for _ in range(restarts)]
+    args = (grid, origin, destination, max_iterations, temperature, cooling_rate)
+    if restarts > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, restarts)) as pool:
+            runs = list(pool.map(_anneal_run, *zip(*[args + (s,) for s in seeds])))
+    else:
+        runs = [_anneal_run(*args, s) for s in seeds]
 
-    def heuristic(a, b):
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+    best_path, best_cost = None, float("inf")
+    for path, cost in runs:
+        if path is not None and cost < best_cost:
+            best_path, best_cost = path, cost
+    return best_path
 
-    for _ in range(max_iterations):
-        if current == destination:
-            return path
 
-        neighbors = [
-            (current[0] + dx, current[1] + dy)
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
-            if grid.is_valid(current[0] + dx, current[1] + dy)
-        ]
+def _anneal_run(
+    grid, origin, destination, max_iterations, temperature, cooling_rate, seed,
+    max_segment=24, margin=3, detour_radius=3, patience=300
+):
+    rng = random.Random(seed)
+    path = greedy_path(grid, origin, destination)
+    if path is None:
+        return None, float("inf")
+
+    # prefix[k] = cost of walking path[0..k]; the origin cell itself is free
+    prefix = _path_prefix_costs(grid, path)
+    best_path, best_cost = path, prefix[-1]
+    last_improvement = 0
 
-        if not neighbors:
+    for iteration in range(max_iterations):
+        n = len(path)
+        if n < 3 or iteration - last_improvement > patience:
             break
 
-        next_node = random.choice(neighbors)
-        delta_e = heuristic(current, destination) - heuristic(next_node, destination)
+        i = rng.randrange(0, n - 2)
+        j = min(n - 1, i + rng.randint(2, max_segment))
+        start, end = path[i], path[j]
 
-        if delta_e > 0 or math.exp(delta_e / temperature) > random.random():
-            current = next_node
-            path.append(current)
+        if rng.random() < 0.5:
+            # Segment reroute: cheapest route between the two cut points inside a local window
+            segment = _window_route(grid, start, end, margin)
+        else:
+            # Detour: force the segment through a random waypoint near the old one
+            px, py = path[rng.randint(i, j)]
+            waypoint = (px + rng.randint(-detour_radius, detour_radius),
+                        py + rng.randint(-detour_radius, detour_radius))
+            if not grid.is_valid(waypoint[0], waypoint[1], time_step=0):
+                temperature *= cooling_rate
+                continue
+            first = _window_route(grid, start, waypoint, margin)
+            second = _window_route(grid, waypoint, end, margin) if first else None
+            segment = first + second[1:] if second else None
+
+        if segment is not None:
+            # Incremental delta: only the replaced interior path[i+1..j] changes
+            segment_prefix = _path_prefix_costs(grid, segment, prefix[i])
+            delta_e = segment_prefix[-1] - prefix[j]
+            if delta_e <= 0 or math.exp(-delta_e / temperature) > rng.random():
+                candidate = path[:i] + segment + path[j + 1:]
+                path = _remove_cycles(candidate)
+                if len(path) == len(candidate):
+                    # Costs up to path[i] stand; the tail only shifts by the delta
+                    prefix = prefix[:i] + segment_prefix + [cost + delta_e for cost in prefix[j + 1:]]
+                else:
+                    prefix = _path_prefix_costs(grid, path)
+                if prefix[-1] < best_cost:
+                    best_path, best_cost = path, prefix[-1]
+                    last_improvement = iteration
 
         temperature *= cooling_rate
 
-    return path if path[-1] == destination else None
+    return best_path, best_cost
+
+
+def greedy_path(grid, origin, destination):
+    """Greedy best-first search: fast, always feasible, rarely optimal."""
+    def heuristic(a):
+        return abs(a[0] - destination[0]) + abs(a[1] - destination[1])
+
+    priority_queue = [(heuristic(origin), origin)]
+    parent = {origin: None}
+    while priority_queue:
+        _, (x, y) = heapq.heappop(priority_queue)
+        if (x, y) == destination:
+            return reconstruct_path(parent, destination)
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            next_node = (x + dx, y + dy)
+            if next_node not in parent and grid.is_valid(next_node[0], next_node[1], time_step=0):
+                parent[next_node] = (x, y)
+                heapq.heappush(priority_queue, (heuristic(next_node), next_node))
+    return None
+
+
+def _window_route(grid, origin, destination, margin):
+    """Cheapest route between two cells, restricted to their bounding box grown by margin."""
+    min_x = min(origin[0], destination[0]) - margin
+    max_x = max(origin[0], destination[0]) + margin
+    min_y = min(origin[1], destination[1]) - margin
+    max_y = max(origin[1], destination[1]) + margin
+
+    priority_queue = [(0, origin)]
+    cost_so_far = {origin: 0}
+    parent = {origin: None}
+    visited = set()
+    while priority_queue:
+        _, (x, y) = heapq.heappop(priority_queue)
+        if (x, y) == destination:
+            return reconstruct_path(parent, destination)
+        if (x, y) in visited:
+            continue
+        visited.add((x, y))
+        cost = cost_so_far[(x, y)]
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            next_x, next_y = x + dx, y + dy
+            if not (min_x <= next_x <= max_x and min_y <= next_y <= max_y):
+                continue
+            if grid.is_valid(next_x, next_y, time_step=0):
+                new_cost = cost + grid.get_cost(next_x, next_y)
+                if (next_x, next_y) not in cost_so_far or new_cost < cost_so_far[(next_x, next_y)]:
+                    cost_so_far[(next_x, next_y)] = new_cost
+                    parent[(next_x, next_y)] = (x, y)
+                    h = abs(destination[0] - next_x) + abs(destination[1] - next_y)
+                    heapq.heappush(priority_queue, (new_cost + h, (next_x, next_y)))
+    return None
+
+
+def _path_prefix_costs(grid, path, start=0):
+    prefix = [start]
+    for x, y in path[1:]:
+        prefix.append(prefix[-1] + grid.get_cost(x, y))
+    return prefix
+
+
+def _remove_cycles(path):
+    # Terrain costs are positive, so cutting out any loop never makes a path worse
+    result = []
+    index = {}
+    for node in path:
+        if node in index:
+            for dropped in result[index[node] + 1:]:
+                del index[dropped]
+            del result[index[node] + 1:]
+        else:
+            index[node] = len(result)
+            result.append(node)
+    return result
 
 
 # ---------- Helper ----------
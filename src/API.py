@@ -3,20 +3,77 @@ API module for the autonomous delivery agent.
 Provides a clean interface for interacting with the delivery system.
 """
 
-from typing import Dict, List, Any, Optional
-from .environment import Grid, GroundType, Moving_Obstacle
-from .AGENT import Delivery_Agent
-from .planners import BFS, UCS, A_Star, Simulated_Annealing ,Hill_Climbing
+import functools
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+import numpy as np
+from .environment import Grid, GroundType, CellType, MovingObstacle
+from .agent import Delivery_agent
+from .ALGO import BFS_path_finder, ucs, a_star, ara_star, simulated_annealing, hill_climbing
+from .portfolio import PlannerPortfolio
+from .compiled_map import load_bundle
+from .path_codec import encode_rle
+from .rwlock import ReadWriteLock
+
+# Portfolio workers of sessions must not be forked from the session pool's threads
+THREAD_SAFE_START = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# How plan_path can report a path: a list of [x, y] cells, or runs of moves
+PATH_FORMATS = ("list", "rle")
+
+# Terrain names accepted and reported by the API
+GROUND_NAMES = {
+    "road": GroundType.ASPHALT,
+    "grass": GroundType.FIELD,
+    "mud": GroundType.SLUDGE,
+    "water": GroundType.RIVER
+}
+
+def _reads(method):
+    """Run an API method holding the instance's lock for reading."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+def _writes(method):
+    """Run an API method holding the instance's lock for writing."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return locked
 
 class Delivery_API:
-    """API for interacting with the autonomous delivery system."""
+    """
+    API for interacting with the autonomous delivery system.
+    
+    Methods are safe to call from several threads: queries share a
+    reader-writer lock and may run together, while anything that changes
+    the grid, the agent or the settings runs alone.
+    """
     
-    def __init__(self):
-        """Initialize the API."""
+    def __init__(self, start_method: Optional[str] = None):
+        """
+        Initialize the API.
+        
+        Args:
+            start_method: multiprocessing start method of the "portfolio"
+                planner's workers (see PlannerPortfolio); pass a non-forking
+                one when methods are called from several threads
+        """
         self.grid_map = None
         self.agent = None
         self.current_algorithm = "a_star"
+        self.portfolio = PlannerPortfolio(start_method=start_method)
+        self.portfolio_lock = threading.Lock()  # the portfolio's statistics are not shared-safe
+        self.lock = ReadWriteLock()
         
+    @_writes
     def create_grid_map(self, map_width: int, map_height: int) -> Dict[str, Any]:
         """
         Create a new grid environment.
@@ -42,27 +99,34 @@ class Delivery_API:
                 "message": f"Failed to create grid: {str(e)}"
             }
     
+    @_writes
     def load_grid_map(self, filename: str) -> Dict[str, Any]:
         """
         Load a grid from a file.
         
+        A bundle made by the compile command for this map's contents is
+        picked up automatically, so its precomputed data is not rebuilt.
+        
         Args:
             filename: Path to the grid file
             
         Returns:
-            Dictionary with operation status and grid details
+            Dictionary with operation status and grid details, including the
+            path of the bundle used (None if there was none)
         """
         try:
             self.grid_map = Grid(1, 1)  # Temporary grid
             self.grid_map.load_from_file(filename)
+            compiled = load_bundle(filename, self.grid_map)
             
             return {
                 "status": "success",
                 "message": f"Grid loaded from {filename}",
-                "width": self.grid_map.width,
-                "height": self.grid_map.height,
+                "width": self.grid_map.grid_width,
+                "height": self.grid_map.grid_height,
                 "obstacles": self._count_obstacles(),
-                "moving_obstacles": len(self.grid.moving_obstacles)
+                "moving_obstacles": len(self.grid_map.moving_obstacles),
+                "compiled": compiled
             }
         except Exception as e:
             return {
@@ -70,6 +134,7 @@ class Delivery_API:
                 "message": f"Failed to load grid: {str(e)}"
             }
     
+    @_reads
     def save_grid_map(self, filename: str) -> Dict[str, Any]:
         """
         Save the current grid to a file.
@@ -98,6 +163,37 @@ class Delivery_API:
                 "message": f"Failed to save grid: {str(e)}"
             }
     
+    @_writes
+    def use_grid(self, grid: Grid) -> Dict[str, Any]:
+        """
+        Work on a copy-on-write snapshot of a grid shared with others.
+        
+        The snapshot costs O(1) to take and registers with the grid under
+        the grid's own lock, so sessions may take theirs concurrently; edits
+        made through this API land in its own overlay and never reach the
+        shared grid.
+        
+        Args:
+            grid: Grid to share; it must not be edited directly afterwards
+            
+        Returns:
+            Dictionary with operation status and grid details
+        """
+        try:
+            self.grid_map = grid.snapshot()
+            return {
+                "status": "success",
+                "message": f"Using a snapshot of a {grid.grid_width}x{grid.grid_height} grid",
+                "width": grid.grid_width,
+                "height": grid.grid_height
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Failed to use grid: {str(e)}"
+            }
+    
+    @_writes
     def add_obstacle(self, x: int, y: int) -> Dict[str, Any]:
         """
         Add an obstacle to the grid.
@@ -127,6 +223,7 @@ class Delivery_API:
                 "message": f"Failed to add obstacle: {str(e)}"
             }
     
+    @_writes
     def set_Ground(self, x: int, y: int, ground_type: str) -> Dict[str, Any]:
         """
         Set ground type for a cell.
@@ -134,7 +231,7 @@ class Delivery_API:
         Args:
             x: x-coordinate
             y: y-coordinate
-            terrain_type: Type of terrain ("ASPHALT", "FIELD", "SLUDGE", "RIVER")
+            ground_type: Type of terrain ("road", "grass", "mud", "water")
             
         Returns:
             Dictionary with operation status
@@ -146,21 +243,13 @@ class Delivery_API:
                     "message": "No grid created"
                 }
                 
-            # Map string to TerrainType
-            ground_map = {
-                "road": GroundType.ASPHALT,
-                "grass": GroundType.FIELD,
-                "mud": GroundType.SLUDGE,
-                "water": GroundType.RIVER
-            }
-            
-            if ground_type not in ground_map:
+            if ground_type not in GROUND_NAMES:
                 return {
                     "status": "error",
-                    "message": f"Invalid terrain type: {ground_type}. Must be one of {list(ground_map.keys())}"
+                    "message": f"Invalid terrain type: {ground_type}. Must be one of {list(GROUND_NAMES)}"
                 }
                 
-            self.grid_map.set_terrain(x, y, ground_map[ground_type])
+            self.grid_map.set_ground_type(x, y, GROUND_NAMES[ground_type])
             return {
                 "status": "success",
                 "message": f"Terrain at ({x}, {y}) set to {ground_type}"
@@ -171,6 +260,7 @@ class Delivery_API:
                 "message": f"Failed to set terrain: {str(e)}"
             }
     
+    @_writes
     def add_moving_obstacle(self, x: int, y: int, path: List[List[int]], speed: int = 1) -> Dict[str, Any]:
         """
         Add a moving obstacle to the grid.
@@ -193,7 +283,7 @@ class Delivery_API:
                 
             # Convert path to list of tuples
             path_tuples = [(point[0], point[1]) for point in path]
-            obstacle = Moving_Obstacle(x, y, path_tuples, speed)
+            obstacle = MovingObstacle(x, y, path_tuples, speed)
             self.grid_map.add_moving_obstacle(obstacle)
             
             return {
@@ -206,6 +296,7 @@ class Delivery_API:
                 "message": f"Failed to add moving obstacle: {str(e)}"
             }
     
+    @_writes
     def create_agent(self, x: int, y: int, fuel: int = 100) -> Dict[str, Any]:
         """
         Create a delivery agent.
@@ -225,7 +316,7 @@ class Delivery_API:
                     "message": "No grid created"
                 }
                 
-            self.agent = Delivery_Agent(self.grid, x, y, fuel)
+            self.agent = Delivery_agent(self.grid_map, x, y, fuel)
             return {
                 "status": "success",
                 "message": f"Agent created at ({x}, {y}) with {fuel} fuel"
@@ -236,6 +327,7 @@ class Delivery_API:
                 "message": f"Failed to create agent: {str(e)}"
             }
     
+    @_writes
     def add_package(self, x: int, y: int) -> Dict[str, Any]:
         """
         Add a package for delivery.
@@ -265,6 +357,7 @@ class Delivery_API:
                 "message": f"Failed to add package: {str(e)}"
             }
     
+    @_writes
     def add_destination(self, x: int, y: int) -> Dict[str, Any]:
         """
         Add a delivery destination.
@@ -294,18 +387,20 @@ class Delivery_API:
                 "message": f"Failed to add destination: {str(e)}"
             }
     
+    @_writes
     def set_algorithm(self, algorithm: str) -> Dict[str, Any]:
         """
         Set the path planning algorithm.
         
         Args:
-            algorithm: Algorithm to use ("bfs", "ucs", "a_star", "sa")
+            algorithm: Algorithm to use ("bfs", "ucs", "a_star", "ara_star", "sa", "hill",
+                "portfolio")
             
         Returns:
             Dictionary with operation status
         """
         try:
-            valid_algorithms = ["bfs", "ucs", "a_star", "sa"]
+            valid_algorithms = ["bfs", "ucs", "a_star", "ara_star", "sa", "hill", "portfolio"]
             if algorithm not in valid_algorithms:
                 return {
                     "status": "error",
@@ -323,8 +418,11 @@ class Delivery_API:
                 "message": f"Failed to set algorithm: {str(e)}"
             }
     
+    @_reads
     def plan_path(self, start_x: int, start_y: int, goal_x: int, goal_y: int, 
-                 algorithm: Optional[str] = None) -> Dict[str, Any]:
+                 algorithm: Optional[str] = None,
+                 deadline_ms: Optional[float] = None,
+                 path_format: str = "list") -> Dict[str, Any]:
         """
         Plan a path from start to goal.
         
@@ -333,7 +431,16 @@ class Delivery_API:
             start_y: Start y-coordinate
             goal_x: Goal x-coordinate
             goal_y: Goal y-coordinate
-            algorithm: Algorithm to use (optional, uses current algorithm if not specified)
+            algorithm: Algorithm to use (optional, uses current algorithm if not specified).
+                "portfolio" races several optimal planners in worker processes and
+                reports which one answered first.
+            deadline_ms: Latency budget in milliseconds. When given, the anytime
+                planner (ARA*) is used and the best path found in time is returned
+                together with its suboptimality bound; asking for another
+                algorithm at the same time is an error.
+            path_format: "list" for the path as a list of cells, or "rle" for
+                {"start", "moves", "length"} with moves as runs such as "R12D3"
+                (see path_codec.encode_rle), far smaller for long routes
             
         Returns:
             Dictionary with operation status and path details
@@ -344,48 +451,80 @@ class Delivery_API:
                     "status": "error",
                     "message": "No grid created"
                 }
+            if path_format not in PATH_FORMATS:
+                return {
+                    "status": "error",
+                    "message": f"Invalid path format: {path_format}"
+                }
                 
-            algo = algorithm or self.current_algorithm
+            if deadline_ms is not None and algorithm not in (None, "ara_star"):
+                return {
+                    "status": "error",
+                    "message": f"A deadline runs ara_star and cannot be combined with algorithm {algorithm}"
+                }
+                
+            algo = "ara_star" if deadline_ms is not None else algorithm or self.current_algorithm
+            origin, goal = (start_x, start_y), (goal_x, goal_y)
+            bound = 1.0
+            
+            if not self.grid_map.connected(origin, goal):
+                return {
+                    "status": "error",
+                    "message": "No path found: start and goal are in different components"
+                }
             
             if algo == "bfs":
-                planner = BFS(self.grid_map)
+                path, cost, _ = BFS_path_finder(self.grid_map, origin, goal)
             elif algo == "ucs":
-                planner = UCS(self.grid_map)
+                path, cost, _ = ucs(self.grid_map, origin, goal)
             elif algo == "a_star":
-                planner = A_Star(self.grid_map)
+                path, cost, _ = a_star(self.grid_map, origin, goal)
+            elif algo == "ara_star":
+                path, cost, _, bound = ara_star(self.grid_map, origin, goal, deadline_ms)
             elif algo == "sa":
-                planner = Simulated_Annealing(self.grid_map)
+                path = simulated_annealing(self.grid_map, origin, goal)
             elif algo == "hill":
-                planner = Hill_Climbing(self.grid_map)
+                path = hill_climbing(self.grid_map, origin, goal)
+            elif algo == "portfolio":
+                with self.portfolio_lock:
+                    race = self.portfolio.plan(self.grid_map, origin, goal)
+                path, cost = race["path"], race["cost"]
             else:
                 return {
                     "status": "error",
                     "message": f"Invalid algorithm: {algo}"
                 }
                 
-            result = planner.plan(start_x, start_y, goal_x, goal_y)
-            
-            if result is None:
+            if path is None:
                 return {
                     "status": "error",
-                    "message": "No path found"
+                    "message": "No path found" if deadline_ms is None
+                    else f"No path found within {deadline_ms} ms"
                 }
                 
-            path = result.get_path()
-            return {
+            if algo in ("sa", "hill"):
+                cost = sum(self.grid_map.get_cost(x, y) for x, y in path[1:])
+            result = {
                 "status": "success",
-                "message": f"Path found with cost {result.cost}",
-                "path": path,
-                "cost": result.cost,
+                "message": f"Path found with cost {cost}",
+                "path": encode_rle(path) if path_format == "rle" else path,
+                "cost": cost,
                 "length": len(path),
                 "algorithm": algo
             }
+            if algo == "ara_star":
+                result["bound"] = bound
+            elif algo == "portfolio":
+                result["winner"] = race["winner"]
+                result["candidates"] = race["candidates"]
+            return result
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Failed to plan path: {str(e)}"
             }
     
+    @_writes
     def execute_delivery(self, algorithm: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute the complete package delivery mission.
@@ -426,6 +565,7 @@ class Delivery_API:
                 "message": f"Failed to execute delivery: {str(e)}"
             }
     
+    @_reads
     def get_agent_status(self) -> Dict[str, Any]:
         """
         Get the current status of the agent.
@@ -455,15 +595,17 @@ class Delivery_API:
                 "message": f"Failed to get agent status: {str(e)}"
             }
     
+    @_reads
     def get_grid_info(self) -> Dict[str, Any]:
         """
         Get information about the current grid.
         
         Returns:
-            Dictionary with grid information
+            Dictionary with grid information, including the bytes held by
+            the grid's layers and caches
         """
         try:
-            if self.grid is None:
+            if self.grid_map is None:
                 return {
                     "status": "error",
                     "message": "No grid created"
@@ -471,11 +613,12 @@ class Delivery_API:
                 
             return {
                 "status": "success",
-                "width": self.grid.width,
-                "height": self.grid.height,
+                "width": self.grid_map.grid_width,
+                "height": self.grid_map.grid_height,
                 "obstacles": self._count_obstacles(),
-                "moving_obstacles": len(self.grid.moving_obstacles),
-                "terrain_types": self._get_terrain_distribution()
+                "moving_obstacles": len(self.grid_map.moving_obstacles),
+                "terrain_types": self._get_terrain_distribution(),
+                "memory": self.grid_map.memory_usage()
             }
         except Exception as e:
             return {
@@ -485,45 +628,187 @@ class Delivery_API:
     
     def _count_obstacles(self) -> int:
         """Count the number of static obstacles in the grid."""
-        if self.grid is None:
+        if self.grid_map is None:
             return 0
-            
-        count = 0
-        for y in range(self.grid.height):
-            for x in range(self.grid.width):
-                if self.grid.grid[y, x] == 1:  # OBSTACLE value
-                    count += 1
-        return count
+        return int(np.count_nonzero(self.grid_map.grid == CellType.OBSTACLE.value))
     
     def _get_terrain_distribution(self) -> Dict[str, int]:
         """Get the distribution of terrain types in the grid."""
-        if self.grid is None:
+        if self.grid_map is None:
             return {}
+        counts = np.bincount(self.grid_map.terrain.ravel(), minlength=256)
+        return {name: int(counts[ground.value]) for name, ground in GROUND_NAMES.items()}
+
+class SessionManager:
+    """
+    Delivery_API sessions addressed by ID, for callers that must not share state.
+    
+    Each session has its own grid and agent. Grids published with
+    share_grid() are held once and every session created on them works on
+    a copy-on-write snapshot, so sessions cost memory only for the cells
+    they edit. Path queries can be run on a thread pool; each session's
+    reader-writer lock lets them overlap while its edits run alone.
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Initialize with no sessions.
+        
+        Args:
+            workers: Threads of the query pool (ThreadPoolExecutor's default if None);
+                the pool is started on first use
+        """
+        self.sessions: Dict[str, Delivery_API] = {}
+        self.shared_grids: Dict[str, Grid] = {}
+        self.lock = threading.Lock()  # guards the two tables and the pool
+        self.workers = workers
+        self.pool = None
+        
+    def share_grid(self, name: str, grid: Grid) -> Dict[str, Any]:
+        """
+        Publish a grid for sessions to start from.
+        
+        The grid is read by every session created on it and must not be
+        edited directly from now on.
+        
+        Args:
+            name: Name sessions refer to the grid by
+            grid: Grid to share
             
-        distribution = {
-            "road": 0,
-            "grass": 0,
-            "mud": 0,
-            "water": 0
+        Returns:
+            Dictionary with operation status
+        """
+        with self.lock:
+            self.shared_grids[name] = grid
+        return {
+            "status": "success",
+            "message": f"Grid shared as {name}"
         }
         
-        for y in range(self.grid.height):
-            for x in range(self.grid.width):
-                terrain_value = self.grid.terrain[y, x]
-                if terrain_value == 1:
-                    distribution["road"] += 1
-                elif terrain_value == 3:
-                    distribution["grass"] += 1
-                elif terrain_value == 5:
-                    distribution["mud"] += 1
-                elif terrain_value == 10:
-                    distribution["water"] += 1
-                    
-        return distribution
+    def create_session(self, grid: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Open a new session.
+        
+        Args:
+            grid: Name of a shared grid to start from; without one the session
+                starts empty, like a fresh Delivery_API
+            
+        Returns:
+            Dictionary with operation status and the new "session_id"
+        """
+        session = Delivery_API(start_method=THREAD_SAFE_START)
+        with self.lock:
+            if grid is not None:
+                if grid not in self.shared_grids:
+                    return {
+                        "status": "error",
+                        "message": f"No shared grid named {grid}"
+                    }
+                result = session.use_grid(self.shared_grids[grid])
+                if result["status"] != "success":
+                    return result
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = session
+        return {
+            "status": "success",
+            "message": f"Session {session_id} created",
+            "session_id": session_id
+        }
+        
+    def get_session(self, session_id: str) -> Optional[Delivery_API]:
+        """Get a session's API, or None if there is no such session."""
+        with self.lock:
+            return self.sessions.get(session_id)
+            
+    def close_session(self, session_id: str) -> Dict[str, Any]:
+        """
+        Close a session, dropping its grid and agent.
+        
+        Args:
+            session_id: Session to close
+            
+        Returns:
+            Dictionary with operation status
+        """
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return {
+                "status": "error",
+                "message": f"No session {session_id}"
+            }
+        return {
+            "status": "success",
+            "message": f"Session {session_id} closed"
+        }
+        
+    def call(self, session_id: str, method: str, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Call a Delivery_API method of a session.
+        
+        Args:
+            session_id: Session to act on
+            method: Name of a public Delivery_API method, e.g. "plan_path"
+            *args, **kwargs: The method's arguments
+            
+        Returns:
+            The method's result dictionary
+        """
+        session = self.get_session(session_id)
+        if session is None:
+            return {
+                "status": "error",
+                "message": f"No session {session_id}"
+            }
+        if method.startswith("_") or not callable(getattr(Delivery_API, method, None)):
+            return {
+                "status": "error",
+                "message": f"Invalid method: {method}"
+            }
+        return getattr(session, method)(*args, **kwargs)
+        
+    def submit(self, session_id: str, method: str, *args, **kwargs) -> Future:
+        """
+        Run call() on the thread pool.
+        
+        Returns:
+            Future resolving to the method's result dictionary
+        """
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="delivery-api")
+            pool = self.pool
+        return pool.submit(self.call, session_id, method, *args, **kwargs)
+        
+    def plan_paths(self, session_id: str, queries: Sequence[Tuple[int, int, int, int]],
+                   **kwargs) -> List[Dict[str, Any]]:
+        """
+        Plan many paths of one session concurrently on the thread pool.
+        
+        Args:
+            session_id: Session whose grid to plan on
+            queries: (start_x, start_y, goal_x, goal_y) tuples
+            **kwargs: Further plan_path arguments, applied to every query
+            
+        Returns:
+            plan_path result dictionaries, in the order of the queries
+        """
+        futures = [self.submit(session_id, "plan_path", *query, **kwargs) for query in queries]
+        return [future.result() for future in futures]
+        
+    def shutdown(self):
+        """Stop the thread pool once the queries already submitted finish."""
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
 
 # Global API instance
 api = Delivery_API()
 
+# Sessions for callers that must not share the global instance's state
+sessions = SessionManager()
+
 # Convenience functions for easy access to the API
 def create_grid(width: int, height: int) -> Dict[str, Any]:
     """Create a new grid environment."""
@@ -566,9 +851,10 @@ def set_algorithm(algorithm: str) -> Dict[str, Any]:
     return api.set_algorithm(algorithm)
 
 def plan_path(start_x: int, start_y: int, goal_x: int, goal_y: int, 
-              algorithm: Optional[str] = None) -> Dict[str, Any]:
+              algorithm: Optional[str] = None, deadline_ms: Optional[float] = None,
+              path_format: str = "list") -> Dict[str, Any]:
     """Plan a path from start to goal."""
-    return api.plan_path(start_x, start_y, goal_x, goal_y, algorithm)
+    return api.plan_path(start_x, start_y, goal_x, goal_y, algorithm, deadline_ms, path_format)
 
 def execute_delivery(algorithm: Optional[str] = None) -> Dict[str, Any]:
     """Execute the complete package delivery mission."""
@@ -580,4 +866,24 @@ def get_agent_status() -> Dict[str, Any]:
 
 def get_grid_info() -> Dict[str, Any]:
     """Get information about the current grid."""
-    return api.get_grid_info()
\ No newline at end of file
+    return api.get_grid_info()
+
+def share_grid(name: str, grid: Grid) -> Dict[str, Any]:
+    """Publish a grid for sessions to start from."""
+    return sessions.share_grid(name, grid)
+
+def create_session(grid: Optional[str] = None) -> Dict[str, Any]:
+    """Open a session, optionally on a shared grid."""
+    return sessions.create_session(grid)
+
+def close_session(session_id: str) -> Dict[str, Any]:
+    """Close a session."""
+    return sessions.close_session(session_id)
+
+def session_call(session_id: str, method: str, *args, **kwargs) -> Dict[str, Any]:
+    """Call a Delivery_API method of a session."""
+    return sessions.call(session_id, method, *args, **kwargs)
+
+def plan_paths(session_id: str, queries: Sequence[Tuple[int, int, int, int]], **kwargs) -> List[Dict[str, Any]]:
+    """Plan many paths of a session concurrently."""
+    return sessions.plan_paths(session_id, queries, **kwargs)
\ No newline at end of file
@@ -2,12 +2,17 @@
 Command-line interface for the autonomous delivery agent.
 """
 import json
-from .api import system_api
+from .API import api as system_api
 import argparse
 import sys
-from .utils import run_experiment, save_results
+import time
+from .UTILITY import run_experiment, run_experiments, save_results, ResultsWriter, aggregate_results
 from .environment import Grid
-from .AGENT import DeliveryAgent
+from .agent import Delivery_agent
+from .trace import TraceReader
+from .benchmark import benchmark, compare, METRICS
+from .map_generator import generate_map, generate_orders, save_orders, LAYOUTS
+from .compiled_map import compile_map, bundle_path
 
 def api_command(args):
     """Handle API commands."""
@@ -21,6 +26,13 @@ def api_command(args):
     
     print(json.dumps(result, indent=2))
 
+def load_benchmark(spec):
+    """Load one algorithm's run from a bench --output file given as FILE or FILE:ALGORITHM."""
+    filename, _, algorithm = spec.rpartition(":") if ":" in spec else (spec, "", "")
+    with open(filename) as f:
+        runs = json.load(f)
+    return runs[algorithm] if algorithm else next(iter(runs.values()))
+
 # Add API subparser to your main CLI
 
 def main():
@@ -36,10 +48,71 @@ def main():
     experiment_parser.add_argument("--algorithm", choices=["bfs", "ucs", "a_star", "sa"],
                                   required=True, help="Planning algorithm")
     experiment_parser.add_argument("--output", help="Output file for results")
+    experiment_parser.add_argument("--trace", help="Record a binary step trace to this file")
     
     # Run all experiments command
     all_parser = subparsers.add_parser("run-all", help="Run all experiments")
-    all_parser.add_argument("--output", required=True, help="Output file for results")
+    all_parser.add_argument("--output", required=True,
+                            help="Output file for results; .jsonl or .csv files are appended to as results arrive")
+    all_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    
+    # Summarize command
+    summary_parser = subparsers.add_parser("summarize", help="Aggregate a streamed results file")
+    summary_parser.add_argument("results", help="JSONL or CSV file written by run-all")
+    summary_parser.add_argument("--chunk-size", type=int, default=10000, help="Results read at a time")
+    
+    # Benchmark command
+    algorithm_choices = ["bfs", "ucs", "a_star", "ara_star", "sa", "hill"]
+    bench_parser = subparsers.add_parser("bench", help="Time planning and execution repeatedly")
+    bench_parser.add_argument("--map", choices=["small", "medium", "large", "dynamic"],
+                              required=True, help="Map size")
+    bench_parser.add_argument("--algorithm", choices=algorithm_choices, nargs="+",
+                              required=True, help="Planning algorithms (repetitions are interleaved)")
+    bench_parser.add_argument("-n", "--repetitions", type=int, default=30, help="Timed repetitions")
+    bench_parser.add_argument("--warmup", type=int, default=3, help="Untimed warmup runs")
+    bench_parser.add_argument("--output", help="JSON file for the samples and summaries")
+    
+    # Compare command
+    compare_parser = subparsers.add_parser("compare", help="Test whether two benchmarks differ")
+    compare_parser.add_argument("baseline", help="bench --output file (FILE or FILE:ALGORITHM), "
+                                                 "or an algorithm name with --map")
+    compare_parser.add_argument("candidate", help="Same form as baseline")
+    compare_parser.add_argument("--map", choices=["small", "medium", "large", "dynamic"],
+                                help="Benchmark the two algorithms now on this map instead of reading files")
+    compare_parser.add_argument("--metric", choices=METRICS, default="total_ns", help="Timing to compare")
+    compare_parser.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+    compare_parser.add_argument("-n", "--repetitions", type=int, default=30,
+                                help="Timed repetitions when benchmarking now")
+    
+    # Generate command
+    generate_parser = subparsers.add_parser("generate", help="Generate a seeded map and order set")
+    generate_parser.add_argument("--width", type=int, required=True, help="Grid width")
+    generate_parser.add_argument("--height", type=int, required=True, help="Grid height")
+    generate_parser.add_argument("--layout", choices=LAYOUTS, default="open", help="Obstacle layout")
+    generate_parser.add_argument("--density", type=float, default=0.0, help="Share of random extra obstacles")
+    generate_parser.add_argument("--terrain-scale", type=int, default=32,
+                                 help="Size of terrain features in cells (0 for asphalt only)")
+    generate_parser.add_argument("--moving", type=int, default=0, help="Number of moving obstacles")
+    generate_parser.add_argument("--seed", type=int, help="Random seed")
+    generate_parser.add_argument("--output", required=True, help="Map file (.npz for the binary format)")
+    generate_parser.add_argument("--orders", type=int, default=0, help="Number of orders to generate")
+    generate_parser.add_argument("--orders-output", help="Orders file (default: next to the map)")
+    generate_parser.add_argument("--depot", type=int, nargs=2, metavar=("X", "Y"),
+                                 help="Only place orders reachable from this cell")
+    
+    # Compile command
+    compile_parser = subparsers.add_parser("compile", help="Precompute a map's static data into a bundle")
+    compile_parser.add_argument("map", help="Map file (text or .npz)")
+    compile_parser.add_argument("--landmarks", type=int, default=8, help="Landmarks for distance bounds")
+    compile_parser.add_argument("--cluster-size", type=int, default=16, help="Cluster side in cells")
+    compile_parser.add_argument("--output", help="Bundle file (default: next to the map, named by content hash)")
+    
+    # Replay command
+    replay_parser = subparsers.add_parser("replay", help="Print recorded steps from a trace")
+    replay_parser.add_argument("trace", help="Trace file written by run --trace")
+    replay_parser.add_argument("--step", type=int, default=-1,
+                               help="First step to print (negative counts from the end)")
+    replay_parser.add_argument("--count", type=int, default=1, help="Number of steps to print")
     
     # Demo command
     demo_parser = subparsers.add_parser("demo", help="Run a demo with visualization")
@@ -51,7 +124,7 @@ def main():
     args = parser.parse_args()
     
     if args.command == "run":
-        result = run_experiment(args.map, args.algorithm)
+        result = run_experiment(args.map, args.algorithm, args.trace)
         print(f"Experiment completed: {result}")
         
         if args.output:
@@ -61,17 +134,84 @@ def main():
         results = []
         map_sizes = ["small", "medium", "large", "dynamic"]
         algorithms = ["bfs", "ucs", "a_star", "sa" , "hill"]
+        jobs = [(map_size, algorithm) for map_size in map_sizes for algorithm in algorithms]
         
-        for map_size in map_sizes:
-            for algorithm in algorithms:
-                print(f"Running {algorithm} on {map_size} map...")
-                result = run_experiment(map_size, algorithm)
-                results.append(result)
+        # Streamed formats are written result by result, so a crash keeps what finished
+        streaming = args.output.endswith((".jsonl", ".csv"))
+        writer = ResultsWriter(args.output) if streaming else None
+        try:
+            for result in run_experiments(jobs, args.workers):
                 print(f"Result: {result}")
+                if writer:
+                    writer.write(result)
+                else:
+                    results.append(result)
+        finally:
+            if writer:
+                writer.close()
                 
-        save_results(results, args.output)
+        if not streaming:
+            save_results(results, args.output)
         print(f"All experiments completed. Results saved to {args.output}")
         
+    elif args.command == "summarize":
+        for (map_size, algorithm), stats in aggregate_results(args.results, chunk_size=args.chunk_size).items():
+            print(json.dumps({"map_size": map_size, "algorithm": algorithm, **stats}))
+        
+    elif args.command == "bench":
+        runs = benchmark(args.map, args.algorithm, args.repetitions, args.warmup)
+        for algorithm, run in runs.items():
+            for metric, stats in run["summary"].items():
+                print(json.dumps({"algorithm": algorithm, "metric": metric, **stats}))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(runs, f, indent=2)
+                
+    elif args.command == "compare":
+        if args.map:
+            runs = benchmark(args.map, [args.baseline, args.candidate], args.repetitions)
+            baseline, candidate = runs[args.baseline], runs[args.candidate]
+        else:
+            baseline, candidate = load_benchmark(args.baseline), load_benchmark(args.candidate)
+        result = compare(baseline["samples"][args.metric], candidate["samples"][args.metric], args.alpha)
+        print(json.dumps({"metric": args.metric, **result}, indent=2))
+        
+    elif args.command == "generate":
+        grid = generate_map(args.width, args.height, args.layout, args.density,
+                            args.terrain_scale or None, moving_obstacles=args.moving, seed=args.seed)
+        grid.save_to_file(args.output)
+        summary = {"map": args.output, "width": grid.grid_width, "height": grid.grid_height,
+                   "obstacles": int((~grid.passable_mask()).sum()),
+                   "moving_obstacles": len(grid.moving_obstacles)}
+        if args.orders:
+            orders = generate_orders(grid, args.orders, tuple(args.depot) if args.depot else None, args.seed)
+            summary["orders"] = args.orders_output or args.output.rsplit(".", 1)[0] + ".orders.txt"
+            save_orders(summary["orders"], orders)
+        print(json.dumps(summary, indent=2))
+        
+    elif args.command == "compile":
+        grid = Grid(1, 1)
+        grid.load_from_file(args.map)
+        start = time.perf_counter()
+        compiled = compile_map(grid, args.landmarks, args.cluster_size)
+        output = args.output or bundle_path(args.map, compiled.digest)
+        compiled.save(output)
+        print(json.dumps({
+            "bundle": output,
+            "content_hash": compiled.digest,
+            "components": int(compiled.components.max()) + 1,
+            "landmarks": compiled.landmarks.tolist(),
+            "regions": int(compiled.regions.max()) + 1,
+            "bytes": compiled.nbytes,
+            "seconds": round(time.perf_counter() - start, 3),
+        }, indent=2))
+        
+    elif args.command == "replay":
+        with TraceReader(args.trace) as reader:
+            first = args.step + len(reader) if args.step < 0 else args.step
+            for step in range(first, min(first + args.count, len(reader))):
+                print(json.dumps(reader.state(step)))
+                
     elif args.command == "demo":
         print("Running demo...")
         # This would typically include visualization
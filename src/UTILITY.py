@@ -4,17 +4,24 @@ Utility functions for the autonomous delivery agent project.
 
 import time
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import math
+import os
 import random
-from typing import Dict, Any, List
-from .environment import Grid, GroundType, Moving_Obstacle
-from .AGENT import Delivery_Agent
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+import numpy as np
+from .environment import Grid, GroundType, MovingObstacle
+from .agent import Delivery_agent
 
-def create_test_map(size: str) -> Grid:
+def create_test_map(size: str, seed: Optional[int] = None) -> Grid:
     """
     Create a test map of the specified size.
     
     Args:
         size: Size of the map ("small", "medium", "large", or "dynamic")
+        seed: Seed for the random obstacles of the "large" map; None draws
+            a different map each time
         
     Returns:
         Grid object with the test map
@@ -27,10 +34,10 @@ def create_test_map(size: str) -> Grid:
         # Add different terrain
         for i in range(15):
             for j in range(5):
-                grid.set_ground(i, j, GroundType.ASPHALT)
+                grid.set_ground_type(i, j, GroundType.ASPHALT)
         for i in range(15):
             for j in range(9, 15):
-                grid.set_ground(i, j, GroundType.SLUDGE)
+                grid.set_ground_type(i, j, GroundType.SLUDGE)
                 
     elif size == "medium":
         grid = Grid(22, 22)
@@ -42,31 +49,32 @@ def create_test_map(size: str) -> Grid:
         # Add different terrain
         for i in range(22):
             for j in range(6):
-                grid.set_ground(i, j, GroundType.ASPHALT)
+                grid.set_ground_type(i, j, GroundType.ASPHALT)
         for i in range(22):
             for j in range(13, 22):
-                grid.set_ground(i, j, GroundType.SLUDGE)
+                grid.set_ground_type(i, j, GroundType.SLUDGE)
         for i in range(6):
             for j in range(22):
-                grid.set_ground(i, j, GroundType.RIVER)
+                grid.set_ground_type(i, j, GroundType.RIVER)
             
     elif size == "large":
         grid = Grid(55, 55)
         # Add random obstacles
+        rng = random.Random(seed)
         for _ in range(120):
-            x = random.randint(0, 66)
-            y = random.randint(0, 66)
+            x = rng.randint(0, 54)
+            y = rng.randint(0, 54)
             grid.add_obstacle(x, y)
         # Add different terrain in regions
-        for i in range(66):
+        for i in range(55):
             for j in range(12):
-                grid.set_ground(i, j, GroundType.ASPHALT)
+                grid.set_ground_type(i, j, GroundType.ASPHALT)
         for i in range(55):
-            for j in range(35, 66):
-                grid.set_ground(i, j, GroundType.SLUDGE)
+            for j in range(35, 55):
+                grid.set_ground_type(i, j, GroundType.SLUDGE)
         for i in range(12):
-            for j in range(66):
-                grid.set_ground(i, j, GroundType.RIVER)
+            for j in range(55):
+                grid.set_ground_type(i, j, GroundType.RIVER)
                 
     elif size == "dynamic":
         grid = Grid(25, 25)
@@ -75,31 +83,32 @@ def create_test_map(size: str) -> Grid:
             grid.add_obstacle(i, 15)
         # Add a moving obstacle
         moving_path = [ (4,4) ,(4, 5), (4,6) , (5, 5), (6,5) , (5,6), (5, 4),(6,4) , (6,6)]
-        moving_obstacle = Moving_Obstacle(3, 3, moving_path, speed=2)
+        moving_obstacle = MovingObstacle(3, 3, moving_path, pace=2)
         grid.add_moving_obstacle(moving_obstacle)
         # Add different terrain
         for i in range(25):
             for j in range(12):
-                grid.set_terrain(i, j, GroundType.FIELD)
+                grid.set_ground_type(i, j, GroundType.FIELD)
         
     else:
         raise ValueError(f"Unknown map size: {size}")
         
     return grid
 
-def run_experiment(map_size: str, algorithm: str) -> Dict[str, Any]:
+def create_test_agent(map_size: str, fuel: int = 10000, seed: Optional[int] = None) -> Delivery_agent:
     """
-    Run a delivery experiment with the specified map and algorithm.
+    Create an agent on a fresh test map, with that map's package and destination.
     
     Args:
         map_size: Size of the map ("small", "medium", "large", or "dynamic")
-        algorithm: Planning algorithm to use ("bfs", "ucs", "a_star", "sa")
+        fuel: Initial fuel amount
+        seed: Seed of the map, see create_test_map
         
     Returns:
-        Dictionary with experiment results
+        Delivery_agent starting at (0, 0)
     """
-    grid = create_test_map(map_size)
-    agent = Delivery_Agent(grid, 0, 0, fuel=10000)
+    grid = create_test_map(map_size, seed)
+    agent = Delivery_agent(grid, 0, 0, fuel=fuel)
     
     # Add package and destination based on map size
     if map_size == "small":
@@ -114,21 +123,60 @@ def run_experiment(map_size: str, algorithm: str) -> Dict[str, Any]:
     elif map_size == "dynamic":
         agent.add_package(18, 18)
         agent.add_destination(9, 4)
+    return agent
+
+def run_experiment(map_size: str, algorithm: str, trace_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run a delivery experiment with the specified map and algorithm.
+    
+    Args:
+        map_size: Size of the map ("small", "medium", "large", or "dynamic")
+        algorithm: Planning algorithm to use ("bfs", "ucs", "a_star", "sa")
+        trace_file: Optional path to record a binary step trace to
+        
+    Returns:
+        Dictionary with experiment results
+    """
+    agent = create_test_agent(map_size)
     
-    start_time = time.time()
+    if trace_file:
+        agent.start_trace(trace_file, compress=True)
+    start_time = time.perf_counter()
     success = agent.deliver_packages(algorithm)
-    end_time = time.time()
+    end_time = time.perf_counter()
+    agent.stop_trace()
     
     return {
         "success": success,
-        "path_cost": agent.path[-1].cost if success and hasattr(agent, 'path') and agent.path else float('inf'),
+        "path_cost": 10000 - agent.fuel if success else float('inf'),
         "fuel_remaining": agent.fuel,
         "time_taken": end_time - start_time,
-        "path_length": len(agent.path) if success and hasattr(agent, 'path') and agent.path else 0,
+        "path_length": len(agent.path) if success and hasattr(agent, 'path') and len(agent.path) else 0,
         "algorithm": algorithm,
         "map_size": map_size
     }
 
+def run_experiments(jobs: List[Tuple[str, str]], workers: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Run several experiments, yielding each result as soon as it is ready.
+    
+    Args:
+        jobs: (map_size, algorithm) pairs
+        workers: Number of worker processes; 1 runs in this process, in order
+        
+    Yields:
+        Experiment results, in completion order when running in parallel
+    """
+    if workers <= 1:
+        for map_size, algorithm in jobs:
+            print(f"Running {algorithm} on {map_size} map...")
+            yield run_experiment(map_size, algorithm)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_experiment, map_size, algorithm) for map_size, algorithm in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
 def save_results(results: List[Dict[str, Any]], filename: str):
     """
     Save experiment results to a JSON file.
@@ -151,4 +199,139 @@ def load_results(filename: str) -> List[Dict[str, Any]]:
         List of experiment results
     """
     with open(filename, 'r') as f:
-        return json.load(f)
\ No newline at end of file
+        return json.load(f)
+
+# Column order of headerless CSV results, as read by the plotting script
+CSV_COLUMNS = ["Algorithm", "Map", "PathLength", "Cost", "NodesExpanded", "Runtime"]
+CSV_KEYS = ["algorithm", "map_size", "path_length", "path_cost", "nodes_expanded", "time_taken"]
+
+class ResultsWriter:
+    """Append-only results file that is written one result at a time."""
+    
+    def __init__(self, filename: str, sync: bool = False):
+        """
+        Open a results file for appending.
+        
+        The format follows the extension: ".csv" writes headerless rows in
+        CSV_COLUMNS order, anything else writes one JSON object per line.
+        Each result is flushed as soon as it is written, so a crash loses
+        at most the result in flight.
+        
+        Args:
+            filename: Output filename
+            sync: Also fsync after every result
+        """
+        self.is_csv = filename.endswith(".csv")
+        self.sync = sync
+        self.file = open(filename, "a", newline="")
+        self.csv_writer = csv.writer(self.file) if self.is_csv else None
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc_info):
+        self.close()
+        
+    def write(self, result: Dict[str, Any]):
+        """
+        Append one result.
+        
+        Args:
+            result: Experiment result as returned by run_experiment
+        """
+        if self.is_csv:
+            self.csv_writer.writerow([result.get(key, "") for key in CSV_KEYS])
+        else:
+            self.file.write(json.dumps(result) + "\n")
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+            
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+def iter_results(filename: str, chunk_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read a streamed results file in chunks.
+    
+    A final line cut short by a crash is skipped.
+    
+    Args:
+        filename: JSONL or headerless CSV results file
+        chunk_size: Results per chunk
+        
+    Yields:
+        Lists of at most chunk_size results, with run_experiment's keys
+    """
+    is_csv = filename.endswith(".csv")
+    chunk = []
+    with open(filename, "r", newline="") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # torn final line
+            if not line.strip():
+                continue
+            if is_csv:
+                values = next(csv.reader([line]))
+                result = dict(zip(CSV_KEYS, values))
+                for key in CSV_KEYS[2:]:
+                    result[key] = float(result[key]) if result[key] else None
+            else:
+                result = json.loads(line)
+            chunk.append(result)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def aggregate_results(filename: str, percentiles: Tuple[float, ...] = (50, 90, 99),
+                      chunk_size: int = 10000) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Summarize a streamed results file per map and algorithm.
+    
+    The file is read chunk by chunk and only the numeric metrics are kept,
+    as float arrays, so memory grows by 16 bytes per result rather than
+    with the size of the file. Costs of failed runs (inf) are left out of
+    the cost statistics.
+    
+    Args:
+        filename: JSONL or headerless CSV results file
+        percentiles: Percentiles to report for cost and runtime
+        chunk_size: Results read at a time
+        
+    Returns:
+        Dictionary keyed by (map_size, algorithm) with run counts, and the
+        mean and percentiles of path cost and runtime
+    """
+    groups = {}
+    for chunk in iter_results(filename, chunk_size):
+        by_group = {}
+        for result in chunk:
+            key = (result["map_size"], result["algorithm"])
+            by_group.setdefault(key, []).append(
+                (_as_float(result.get("path_cost")), _as_float(result.get("time_taken"))))
+        for key, values in by_group.items():
+            groups.setdefault(key, []).append(np.array(values, dtype=np.float64).reshape(-1, 2))
+            
+    summary = {}
+    for key, parts in sorted(groups.items()):
+        values = np.concatenate(parts)
+        costs = values[:, 0][np.isfinite(values[:, 0])]
+        runtimes = values[:, 1][~np.isnan(values[:, 1])]
+        stats = {"runs": len(values), "successes": len(costs)}
+        for name, column in [("cost", costs), ("runtime", runtimes)]:
+            empty = not len(column)
+            stats[f"{name}_mean"] = None if empty else float(column.mean())
+            points = [None] * len(percentiles) if empty else np.percentile(column, percentiles).tolist()
+            for percentile, value in zip(percentiles, points):
+                stats[f"{name}_p{percentile:g}"] = value
+        summary[key] = stats
+    return summary
+
+def _as_float(value) -> float:
+    """Convert a result field to float, with NaN for missing values."""
+    if value is None or value == "":
+        return math.nan
+    return float(value)
@@ -3,14 +3,21 @@ Autonomous delivery agent implementation.
 Handles package delivery, path planning, and execution.
 """
 
-from typing import List, Tuple, Optional, Dict
-from .environment import Grid
-from .ALGO import BFS, UCS, A_Star, Simulated_Annealing , Hill_Climbing
+import queue
+from typing import List, Tuple, Optional, Dict, Iterator
+import numpy as np
+from .environment import Grid, TERRAIN_COSTS
+from .spatial_index import StopIndex
+from .route_plan import RoutePlan
+from .trace import TraceRecorder, PICKUP, DELIVERY
+from .path_codec import to_array
+from .lookahead import first_conflict, repair
+from .ALGO import BFS_path_finder, ucs, a_star, ara_star, simulated_annealing, hill_climbing
 
 class Delivery_agent:
     """Autonomous delivery agent class."""
     
-    def __init__(self, grid: Grid, start_x: int, start_y: int, energy: int = 150):
+    def __init__(self, grid: Grid, start_x: int, start_y: int, fuel: int = 150):
         """
         Initialize the delivery agent.
         
@@ -23,12 +30,21 @@ class Delivery_agent:
         self.grid = grid
         self.x = start_x
         self.y = start_y
-        self.fuel = energy
-        self.path = []  # Initialize empty path
+        self.fuel = fuel
+        self.path = to_array([])  # (n, 2) int32 cells still to drive
         self.current_step = 0
-        self.packages = []  # List of (x, y) package locations
-        self.destinations = []  # List of (x, y) destination locations
+        self.packages = StopIndex()  # Pending (x, y) package locations
+        self.destinations = StopIndex()  # Pending (x, y) destination locations
+        self.picked_up_packages = 0
         self.delivered_packages = 0
+        self.verbose = True  # print pickups and deliveries as they happen
+        self.bfs_engine = "queue"  # or "wavefront" for large open maps
+        self.route = RoutePlan()  # stops of orders taken in while driving
+        self.order_queue = queue.SimpleQueue()  # (package, destination) orders not yet routed
+        self.trace = None  # TraceRecorder while a trace is being recorded
+        self.lookahead = 8  # steps checked against moving obstacles before each step; 0 turns repair off
+        self.searches = 0  # full path searches run
+        self.local_repairs = 0  # collisions avoided by waiting or a short detour
         
     def add_package(self, x: int, y: int):
         """
@@ -38,7 +54,7 @@ class Delivery_agent:
             x: x-coordinate of package
             y: y-coordinate of package
         """
-        self.packages.append((x, y))
+        self.packages.add(x, y)
         
     def add_destination(self, x: int, y: int):
         """
@@ -48,43 +64,143 @@ class Delivery_agent:
             x: x-coordinate of destination
             y: y-coordinate of destination
         """
-        self.destinations.append((x, y))
+        self.destinations.add(x, y)
         
-    def plan_path_to(self, destination_x: int, destination_y: int, algorithm: str = "a_star") -> bool:
+    def plan_path_to(self, destination_x: int, destination_y: int, algorithm: str = "a_star",
+                     max_cost: Optional[int] = None) -> bool:
         """
         Plan a path to the goal using the specified algorithm.
         
         Args:
             goal_x: Goal x-coordinate
             goal_y: Goal y-coordinate
-            algorithm: Planning algorithm to use ("bfs", "ucs", "a_star", "sa")
+            algorithm: Planning algorithm to use ("bfs", "ucs", "a_star", "ara_star", "sa", "hill")
+            max_cost: Fuel budget for the path; costlier paths are not returned
             
         Returns:
             True if a path was found, False otherwise
         """
+        path = self._plan_leg((self.x, self.y), (destination_x, destination_y), algorithm, max_cost)
+        if path:
+            # Drop the first cell (current position); slicing the array is a view
+            self.path = to_array(path)[1:]
+            self.current_step = 0
+            return True
+        return False
+        
+    def _plan_leg(self, origin: Tuple[int, int], destination: Tuple[int, int], algorithm: str,
+                  max_cost: Optional[int] = None) -> Optional[List[Tuple[int, int]]]:
+        """Plan one leg, walking the flow field for pinned destinations; None if none fits."""
+        field = self.grid.flow_field(destination[0], destination[1])
+        if field is not None:
+            path = field.path_from(origin[0], origin[1])
+            if path is None:
+                return None
+            if not self.grid.moving_obstacles or all(
+                    self.grid.is_valid(x, y) for x, y in path[1:]):
+                cost = field.cost_from(origin[0], origin[1])
+                return path if max_cost is None or cost <= max_cost else None
+                
+        return self._search_path(origin, destination, algorithm, max_cost)
+        
+    def _search_path(self, origin: Tuple[int, int], destination: Tuple[int, int],
+                     algorithm: str, max_cost: Optional[int] = None) -> Optional[List[Tuple[int, int]]]:
+        """Run the named search algorithm and return its path (or None)."""
+        self.searches += 1
         if algorithm == "bfs":
-            planner = BFS(self.grid)
+            path, _, _ = BFS_path_finder(self.grid, origin, destination, self.bfs_engine)
         elif algorithm == "ucs":
-            planner = UCS(self.grid)
+            path, _, _ = ucs(self.grid, origin, destination, max_cost=max_cost)
         elif algorithm == "a_star":
-            planner = A_Star(self.grid)
+            path, _, _ = a_star(self.grid, origin, destination, max_cost=max_cost)
+        elif algorithm == "ara_star":
+            path, _, _, _ = ara_star(self.grid, origin, destination)
         elif algorithm == "sa":
-            planner = Simulated_Annealing(self.grid)
+            path = simulated_annealing(self.grid, origin, destination)
         elif algorithm == "hill":
-            planner = Hill_Climbing(self.grid)
+            path = hill_climbing(self.grid, origin, destination)
         else:
             raise ValueError(f"Unknown algorithm: {algorithm}")
             
-        result_node = planner.plan(self.x, self.y, destination_x, destination_y, self.current_step)
+        # Planners without built-in pruning are held to the budget afterwards
+        if path and max_cost is not None and self._path_cost(path) > max_cost:
+            return None
+        return path
+        
+    def _path_cost(self, path: List[Tuple[int, int]]) -> int:
+        """Fuel needed to walk a path (the first cell is the current position)."""
+        return self._steps_cost(to_array(path)[1:])
+        
+    def _steps_cost(self, cells: np.ndarray) -> int:
+        """Fuel needed to enter each of an (n, 2) array of cells in turn."""
+        return int(TERRAIN_COSTS[self.grid.terrain[cells[:, 1], cells[:, 0]]].sum())
+        
+    def leg_lower_bounds(self, points: List[Tuple[int, int]]) -> List[float]:
+        """
+        Get a lower bound on the fuel each leg of a route needs.
+        
+        Each step costs at least the grid's cheapest terrain, so Manhattan
+        distance times Grid.min_cost() never overestimates. A precompiled
+        bundle's landmark bound is used when it is tighter, and legs ending
+        at a pinned destination use the exact flow-field cost instead.
+        
+        Args:
+            points: Stops to visit in order, starting from the agent's position
             
-        if result_node:
-            self.path = result_node.get_path()
-            # Remove the first element (current position)
-            if self.path:
-                self.path = self.path[1:]
-            self.current_step = 0
-            return True
-        return False
+        Returns:
+            One bound per leg (inf for a leg known to be unreachable)
+        """
+        min_step = self.grid.min_cost()
+        compiled = self.grid.compiled_map()
+        bounds = []
+        position = (self.x, self.y)
+        for point in points:
+            field = self.grid.flow_field(point[0], point[1])
+            if field is not None:
+                cost = field.cost_from(position[0], position[1])
+                bounds.append(float("inf") if cost is None else cost)
+            else:
+                bound = min_step * (abs(point[0] - position[0]) + abs(point[1] - position[1]))
+                if compiled is not None:
+                    bound = max(bound, compiled.lower_bound(position, point))
+                bounds.append(bound)
+            position = point
+        return bounds
+        
+    def plan_mission(self, points: List[Tuple[int, int]],
+                     algorithm: str = "a_star") -> Optional[List[List[Tuple[int, int]]]]:
+        """
+        Plan every leg of a multi-stop route within the current fuel.
+        
+        Each leg's search is bounded by the fuel left after the earlier legs,
+        minus the lower bound of all later legs, so hopeless branches are
+        pruned instead of explored.
+        
+        Args:
+            points: Stops to visit in order, starting from the agent's position
+            algorithm: Planning algorithm to use
+            
+        Returns:
+            One path per leg (each starting at the previous stop), or None if
+            the route cannot be completed with the fuel on board
+        """
+        bounds = self.leg_lower_bounds(points)
+        remaining_bound = sum(bounds)
+        # Fuel has to stay above zero for the whole trip
+        budget = self.fuel - 1
+        legs = []
+        position = (self.x, self.y)
+        for point, bound in zip(points, bounds):
+            remaining_bound -= bound
+            if budget - remaining_bound < bound:
+                return None
+            path = self._plan_leg(position, point, algorithm, budget - remaining_bound)
+            if not path:
+                return None
+            budget -= self._path_cost(path)
+            legs.append(path)
+            position = point
+        return legs
         
     def execute_step(self) -> bool:
         """
@@ -94,8 +210,11 @@ class Delivery_agent:
             True if movement was successful, False if no more steps
         """
         if self.current_step < len(self.path):
+            if self.lookahead and self.grid.moving_obstacles:
+                # Without a local fix the step goes ahead; leg starts replan instead
+                self.check_ahead(self.lookahead)
             next_x, next_y = self.path[self.current_step]
-            self.x, self.y = next_x, next_y
+            self.x, self.y = int(next_x), int(next_y)
             self.current_step += 1
             
             # Consume fuel based on terrain cost
@@ -105,19 +224,132 @@ class Delivery_agent:
             # Update moving obstacles in the grid
             self.grid.update_moving_obstacles()
             
-            # Check if we picked up a package
-            if (self.x, self.y) in self.packages:
-                self.packages.remove((self.x, self.y))
-                print(f"Picked up package at ({self.x}, {self.y})")
-                
-            # Check if we delivered a package
-            if (self.x, self.y) in self.destinations and len(self.packages) < self.delivered_packages:
-                self.delivered_packages = len(self.packages)
-                print(f"Delivered package at ({self.x}, {self.y})")
-            
+            event = self._visit(self.x, self.y)
+            if self.trace is not None:
+                self.trace.record(self.x, self.y, self.fuel, event, self.grid.ticks)
             return True
         return False
         
+    def check_ahead(self, horizon: Optional[int] = None) -> bool:
+        """
+        Check the path still to drive against predicted moving obstacles.
+        
+        Predicted collisions are repaired where they happen, by waiting or
+        by a short detour back onto the path; the rest of the path is kept.
+        
+        Args:
+            horizon: Steps to check, the whole path if None
+            
+        Returns:
+            True if the checked steps are clear, False if a collision has no
+            local fix and the path is left as it was
+        """
+        if not self.grid.moving_obstacles:
+            return True
+        cells = to_array(self.path[self.current_step:])
+        conflict = first_conflict(self.grid, cells, horizon)
+        if conflict is None:
+            return True
+        while conflict is not None:
+            # Each repair clears the steps after it, so conflicts only move forward
+            cells = repair(self.grid, (self.x, self.y), cells, conflict)
+            if cells is None:
+                return False
+            self.local_repairs += 1
+            conflict = first_conflict(self.grid, cells, horizon)
+        self.path = cells
+        self.current_step = 0
+        return True
+        
+    def fast_forward(self, advance_obstacles: bool = True) -> bool:
+        """
+        Execute the rest of the planned path in one go.
+        
+        Fuel for the whole stretch comes from one terrain gather and a
+        prefix sum, moving obstacles are advanced arithmetically, and only
+        cells holding a pending stop are visited individually. Stops early,
+        like step-by-step execution, on the step where fuel runs out.
+        
+        Args:
+            advance_obstacles: Advance the grid's moving obstacles by the steps
+                taken; off when an external clock owns them
+        
+        Returns:
+            True if the agent moved, False if there were no steps left
+        """
+        cells = to_array(self.path[self.current_step:])
+        if not len(cells):
+            return False
+            
+        fuel_left = self.fuel - np.cumsum(TERRAIN_COSTS[self.grid.terrain[cells[:, 1], cells[:, 0]]], dtype=np.int64)
+        empty = np.flatnonzero(fuel_left <= 0)
+        steps = int(empty[0]) + 1 if empty.size else len(cells)
+        cells = cells[:steps]
+        
+        # Visit only the cells that hold a pending pickup or drop-off, in path order
+        events = np.zeros(steps, dtype=np.int32)
+        if len(self.packages) or len(self.destinations):
+            xs, ys = cells[:, 0], cells[:, 1]
+            hits = np.flatnonzero(self.packages.mask(xs, ys) | self.destinations.mask(xs, ys))
+            for index in hits:
+                events[index] = self._visit(int(cells[index, 0]), int(cells[index, 1]))
+                
+        if self.trace is not None:
+            self.trace.record_many(cells, fuel_left[:steps], events,
+                                   self.grid.ticks + np.arange(1, steps + 1))
+        self.x, self.y = int(cells[-1, 0]), int(cells[-1, 1])
+        self.fuel = int(fuel_left[steps - 1])
+        self.current_step += steps
+        if advance_obstacles:
+            self.grid.advance_moving_obstacles(steps)
+        return True
+        
+    def start_trace(self, filename: str, compress: bool = False) -> TraceRecorder:
+        """
+        Start recording every step to a binary trace file.
+        
+        The current state is recorded as step 0. Moving obstacles must not
+        be added while recording, since they fix the record width.
+        
+        Args:
+            filename: Path of the trace file
+            compress: Compress the trace blocks with zlib
+            
+        Returns:
+            The TraceRecorder, also kept in self.trace until stop_trace()
+        """
+        self.stop_trace()
+        self.trace = TraceRecorder(filename, self.grid, self.picked_up_packages,
+                                   self.delivered_packages, compress)
+        self.trace.record(self.x, self.y, self.fuel, 0, self.grid.ticks)
+        return self.trace
+        
+    def stop_trace(self):
+        """Flush and close the current trace, if any."""
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+            
+    def _visit(self, x: int, y: int) -> int:
+        """Pick up or drop off a package if there is one at the cell; returns trace event bits."""
+        event = 0
+        # Check if we picked up a package
+        if (x, y) in self.packages:
+            self.packages.remove((x, y))
+            self.picked_up_packages += 1
+            event |= PICKUP
+            if self.verbose:
+                print(f"Picked up package at ({x}, {y})")
+                
+        # Check if we delivered a package we are carrying
+        if (x, y) in self.destinations and self.picked_up_packages > self.delivered_packages:
+            self.destinations.remove((x, y))
+            self.delivered_packages += 1
+            event |= DELIVERY
+            if self.verbose:
+                print(f"Delivered package at ({x}, {y})")
+        return event
+        
     def has_reached_goal(self, destination_x: int, destination_y: int) -> bool:
         """
         Check if the agent has reached the goal.
@@ -131,6 +363,29 @@ class Delivery_agent:
         """
         return self.x == destination_x and self.y == destination_y
         
+    def route_order(self) -> List[Tuple[int, int]]:
+        """
+        Order the pending stops with a nearest-neighbour tour.
+        
+        Packages come first, each time the closest remaining one, then
+        destinations in the same way, so every drop-off happens with a
+        package on board. Each pick is a bucketed nearest query instead of
+        a scan over all stops.
+        
+        Returns:
+            List of (x, y) stops in visiting order
+        """
+        route = []
+        x, y = self.x, self.y
+        for stops in (self.packages, self.destinations):
+            pending = StopIndex(stops, stops.bucket_size)
+            while len(pending):
+                stop = pending.nearest(x, y)[0]
+                pending.remove(stop)
+                route.append(stop)
+                x, y = stop
+        return route
+        
     def deliver_packages(self, algorithm: str = "a_star") -> bool:
         """
         Execute the complete package delivery mission.
@@ -141,16 +396,33 @@ class Delivery_agent:
         Returns:
             True if all packages were delivered, False otherwise
         """
-        # Simple strategy: go to each package, then to each destination
-        all_points = self.packages + self.destinations
+        # Nearest-neighbour tour: all packages first, then all destinations
+        all_points = self.route_order()
         
-        for point_x, point_y in all_points:
-            if not self.plan_path_to(point_x, point_y, algorithm):
-                print(f"Failed to plan path to ({point_x}, {point_y})")
-                return False
+        # Reject missions that cannot fit in the tank before doing any work
+        bounds = self.leg_lower_bounds(all_points)
+        if sum(bounds) >= self.fuel:
+            print(f"Mission needs at least {sum(bounds)} fuel, only {self.fuel} on board")
+            return False
+        legs = self.plan_mission(all_points, algorithm)
+        if legs is None:
+            print("No route completes the mission with the fuel on board")
+            return False
+            
+        for index, ((point_x, point_y), leg) in enumerate(zip(all_points, legs)):
+            self.path = to_array(leg)[1:]
+            self.current_step = 0
+            if self.grid.moving_obstacles and not (self.lookahead and self.check_ahead()):
+                # Obstacles have moved since the mission was planned and block the leg
+                budget = self.fuel - 1 - sum(bounds[index + 1:])
+                if not self.plan_path_to(point_x, point_y, algorithm, budget):
+                    print(f"Failed to plan path to ({point_x}, {point_y})")
+                    return False
+                if self.lookahead:
+                    self.check_ahead()
                 
             while not self.has_reached_goal(point_x, point_y):
-                if not self.execute_step():
+                if not self.fast_forward():
                     print(f"Failed to execute path to ({point_x}, {point_y})")
                     return False
                     
@@ -161,6 +433,184 @@ class Delivery_agent:
                     
         return len(self.packages) == 0
         
+    def submit_order(self, package_x: int, package_y: int, destination_x: int, destination_y: int):
+        """
+        Queue an order to be routed the next time the agent drains its queue.
+        
+        Safe to call from other threads while the agent is driving.
+        
+        Args:
+            package_x: x-coordinate of the package
+            package_y: y-coordinate of the package
+            destination_x: x-coordinate of its destination
+            destination_y: y-coordinate of its destination
+        """
+        self.order_queue.put(((package_x, package_y), (destination_x, destination_y)))
+        
+    def drain_orders(self, algorithm: str = "a_star") -> int:
+        """
+        Insert every queued order into the route.
+        
+        Args:
+            algorithm: Planning algorithm for the new legs
+            
+        Returns:
+            Number of orders accepted
+        """
+        accepted = 0
+        while True:
+            try:
+                package, destination = self.order_queue.get_nowait()
+            except queue.Empty:
+                return accepted
+            if self.insert_order(package, destination, algorithm):
+                accepted += 1
+            elif self.verbose:
+                print(f"Rejected order {package} -> {destination}")
+                
+    def insert_order(self, package: Tuple[int, int], destination: Tuple[int, int],
+                     algorithm: str = "a_star") -> bool:
+        """
+        Add an order to the route by cheapest insertion.
+        
+        The pickup and drop-off go where they add the least estimated cost,
+        with the drop-off after the pickup. Only the legs into and out of
+        the new stops are planned; all other legs keep their cached paths.
+        
+        Args:
+            package: (x, y) pickup
+            destination: (x, y) drop-off
+            algorithm: Planning algorithm for the new legs
+            
+        Returns:
+            True if the order was routed, False if a leg is unreachable or
+            the route would no longer fit in the fuel on board
+        """
+        route = self.route
+        position = (self.x, self.y)
+        if len(route):
+            # The first leg is partly driven; charge only what is left of it
+            route.costs[0] = self._steps_cost(to_array(self.path[self.current_step:]))
+        snapshot = route.snapshot()
+        
+        package_index, destination_index, _ = route.best_insertion(
+            position, package, destination, self.grid.min_cost())
+        stale = set(route.insert(package_index, package))
+        stale.update(route.insert(destination_index, destination))
+        for index in sorted(stale):
+            origin = route.stops[index - 1] if index else position
+            path = self._plan_leg(origin, route.stops[index], algorithm)
+            if not path:
+                route.restore(snapshot)
+                return False
+            route.set_leg(index, path, self._path_cost(path))
+        if route.total_cost() >= self.fuel:
+            route.restore(snapshot)
+            return False
+            
+        if 0 in stale:
+            self._start_leg()
+        self.packages.add(*package)
+        self.destinations.add(*destination)
+        return True
+        
+    def serve_orders(self, algorithm: str = "a_star",
+                     arrivals: Optional[Iterator[List[Tuple[Tuple[int, int], Tuple[int, int]]]]] = None) -> bool:
+        """
+        Drive the route, taking in new orders between steps.
+        
+        Args:
+            algorithm: Planning algorithm for new legs
+            arrivals: Optional iterator yielding, once per step, the list of
+                (package, destination) orders that arrived during that step
+                
+        Returns:
+            True once the route is empty and no more orders can arrive,
+            False if a leg could not be replanned or fuel ran out
+        """
+        while True:
+            if arrivals is not None:
+                batch = next(arrivals, None)
+                if batch is None:
+                    arrivals = None
+                else:
+                    for package, destination in batch:
+                        self.submit_order(*package, *destination)
+            self.drain_orders(algorithm)
+            if not self._advance_route(algorithm):
+                return False
+                
+            if not len(self.route):
+                if arrivals is None:
+                    return len(self.packages) == 0
+                # Idle until the next order, but the world keeps moving
+                self.grid.update_moving_obstacles()
+                continue
+                
+            self.execute_step()
+            if self.fuel <= 0:
+                print("Out of fuel!")
+                return False
+            if not self._advance_route(algorithm):
+                return False
+                
+    def drive_leg(self, algorithm: str = "a_star") -> Optional[int]:
+        """
+        Take in queued orders, then drive the whole next leg of the route.
+        
+        Moving obstacles are left where they are: this is the step of an
+        event-driven simulation, whose clock advances them (see
+        simulation.DeliverySimulation).
+        
+        Args:
+            algorithm: Planning algorithm for new and replanned legs
+            
+        Returns:
+            Steps the leg took, 0 if the route is empty, or None if a leg
+            could not be planned or fuel ran out before its end
+        """
+        self.drain_orders(algorithm)
+        if not self._advance_route(algorithm):
+            return None
+        if not len(self.route):
+            return 0
+        if self.fuel <= 0:
+            return None
+        steps = len(self.path) - self.current_step
+        self.fast_forward(advance_obstacles=False)
+        if self.current_step < len(self.path):
+            # Fuel ran out on the way; arriving with an empty tank is fine
+            return None
+        return steps
+        
+    def _advance_route(self, algorithm: str) -> bool:
+        """Drop route stops the agent has reached and start the next leg."""
+        route = self.route
+        while len(route) and self.current_step >= len(self.path):
+            if len(route.paths[0]) == 1:
+                # Zero-length leg: execute_step never entered the cell
+                self._visit(self.x, self.y)
+            route.pop_front()
+            if not len(route):
+                break
+            self._start_leg()
+            if self.grid.moving_obstacles and not (self.lookahead and self.check_ahead()):
+                # Obstacles have moved since the leg was planned and block it
+                path = self._plan_leg((self.x, self.y), route.stops[0], algorithm)
+                if not path:
+                    print(f"Failed to plan path to {route.stops[0]}")
+                    return False
+                route.set_leg(0, path, self._path_cost(path))
+                self._start_leg()
+                if self.lookahead:
+                    self.check_ahead()
+        return True
+        
+    def _start_leg(self):
+        """Follow the planned path of the route's first leg."""
+        self.path = to_array(self.route.paths[0])[1:]
+        self.current_step = 0
+        
     def get_status(self) -> Dict:
         """
         Get the current status of the agent.
@@ -0,0 +1,208 @@
+"""
+Repeatable timing of delivery missions.
+Planning and execution are timed separately with perf_counter_ns, after
+warmup runs and with the garbage collector held off, and summarized with
+robust statistics and bootstrap confidence intervals.
+"""
+
+import gc
+import math
+import time
+from typing import Dict, Sequence
+import numpy as np
+from .UTILITY import create_test_agent
+from .path_codec import to_array
+
+METRICS = ("planning_ns", "execution_ns", "total_ns")
+
+def time_mission(map_size: str, algorithm: str, seed: int = 0) -> Dict:
+    """
+    Time one delivery mission, planning and execution separately.
+
+    The map and agent are built before the clock starts, output is
+    silenced, and garbage collection is run beforehand and disabled while
+    timing so a collection cannot land inside one repetition.
+
+    Args:
+        map_size: Test map ("small", "medium", "large", or "dynamic")
+        algorithm: Planning algorithm
+        seed: Seed of the map, so repetitions time identical copies of it
+
+    Returns:
+        Dictionary with planning_ns, execution_ns, total_ns and success
+    """
+    agent = create_test_agent(map_size, seed=seed)
+    agent.verbose = False
+    route = agent.route_order()
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        legs = agent.plan_mission(route, algorithm)
+        planned = time.perf_counter_ns()
+        for leg in legs or []:
+            agent.path = to_array(leg)[1:]
+            agent.current_step = 0
+            agent.fast_forward()
+        finished = time.perf_counter_ns()
+    finally:
+        gc.enable()
+
+    return {
+        "planning_ns": planned - start,
+        "execution_ns": finished - planned,
+        "total_ns": finished - start,
+        "success": legs is not None and not len(agent.packages),
+    }
+
+def benchmark(map_size: str, algorithms: Sequence[str], repetitions: int = 30,
+              warmup: int = 3, seed: int = 0) -> Dict[str, Dict]:
+    """
+    Benchmark one or more algorithms on a map.
+
+    Repetitions of different algorithms are interleaved so drift in machine
+    load affects them alike.
+
+    Args:
+        map_size: Test map
+        algorithms: Planning algorithms to time
+        repetitions: Timed runs per algorithm
+        warmup: Untimed runs per algorithm first
+        seed: Seed of the map; every run uses the same map
+
+    Returns:
+        Dictionary keyed by algorithm with the raw samples, success count
+        and a summary per metric
+    """
+    for _ in range(warmup):
+        for algorithm in algorithms:
+            time_mission(map_size, algorithm, seed)
+
+    samples = {algorithm: {metric: [] for metric in METRICS} for algorithm in algorithms}
+    successes = dict.fromkeys(algorithms, 0)
+    for _ in range(repetitions):
+        for algorithm in algorithms:
+            run = time_mission(map_size, algorithm, seed)
+            for metric in METRICS:
+                samples[algorithm][metric].append(run[metric])
+            successes[algorithm] += run["success"]
+
+    return {
+        algorithm: {
+            "map_size": map_size,
+            "algorithm": algorithm,
+            "repetitions": repetitions,
+            "warmup": warmup,
+            "seed": seed,
+            "successes": successes[algorithm],
+            "samples": samples[algorithm],
+            "summary": {metric: summarize(samples[algorithm][metric]) for metric in METRICS},
+        }
+        for algorithm in algorithms
+    }
+
+def summarize(samples: Sequence[float], confidence: float = 0.95, resamples: int = 2000,
+              seed: int = 0) -> Dict:
+    """
+    Summarize timing samples with order statistics.
+
+    Args:
+        samples: Measurements
+        confidence: Confidence level of the intervals
+        resamples: Bootstrap resamples
+        seed: Seed of the bootstrap
+
+    Returns:
+        Dictionary with n, mean, median, q1, q3, iqr, p95 and bootstrap
+        confidence intervals for the median and p95
+    """
+    values = np.asarray(samples, dtype=np.float64)
+    q1, median, q3, p95 = np.percentile(values, [25, 50, 75, 95])
+    boot = _bootstrap(values, resamples, seed)
+    tail = 50 * (1 - confidence)
+    return {
+        "n": len(values),
+        "mean": float(values.mean()),
+        "median": float(median),
+        "q1": float(q1),
+        "q3": float(q3),
+        "iqr": float(q3 - q1),
+        "p95": float(p95),
+        "median_ci": np.percentile(np.median(boot, axis=1), [tail, 100 - tail]).tolist(),
+        "p95_ci": np.percentile(np.percentile(boot, 95, axis=1), [tail, 100 - tail]).tolist(),
+    }
+
+def compare(baseline: Sequence[float], candidate: Sequence[float], alpha: float = 0.05,
+            resamples: int = 2000, seed: int = 0) -> Dict:
+    """
+    Test whether two sets of timings differ.
+
+    Uses the two-sided Mann-Whitney U test, which assumes nothing about the
+    shape of the timing distributions, and a bootstrap interval for the
+    ratio of medians.
+
+    Args:
+        baseline: Timings of the reference run
+        candidate: Timings of the run being compared
+        alpha: Significance level
+        resamples: Bootstrap resamples
+        seed: Seed of the bootstrap
+
+    Returns:
+        Dictionary with both medians, the candidate/baseline median ratio and
+        its confidence interval, the U statistic, the p-value, the probability
+        that a candidate run is slower than a baseline run, and whether the
+        difference is significant
+    """
+    first = np.asarray(baseline, dtype=np.float64)
+    second = np.asarray(candidate, dtype=np.float64)
+    u_statistic, p_value = mann_whitney_u(first, second)
+    ratios = (np.median(_bootstrap(second, resamples, seed + 1), axis=1)
+              / np.median(_bootstrap(first, resamples, seed), axis=1))
+    tail = 50 * alpha
+    return {
+        "baseline_median": float(np.median(first)),
+        "candidate_median": float(np.median(second)),
+        "ratio": float(np.median(second) / np.median(first)),
+        "ratio_ci": np.percentile(ratios, [tail, 100 - tail]).tolist(),
+        "u_statistic": u_statistic,
+        "p_value": p_value,
+        "probability_slower": 1 - u_statistic / (len(first) * len(second)),
+        "significant": p_value < alpha,
+    }
+
+def mann_whitney_u(first: np.ndarray, second: np.ndarray):
+    """
+    Two-sided Mann-Whitney U test with the normal approximation.
+
+    Ties get average ranks and the variance is corrected for them.
+
+    Args:
+        first: First sample
+        second: Second sample
+
+    Returns:
+        (U statistic of the first sample, p-value)
+    """
+    n1, n2 = len(first), len(second)
+    values = np.concatenate([first, second])
+    n = n1 + n2
+    order = np.argsort(values, kind="mergesort")
+    _, starts, counts = np.unique(values[order], return_index=True, return_counts=True)
+    ranks = np.empty(n)
+    ranks[order] = np.repeat(starts + (counts + 1) / 2, counts)
+
+    u_statistic = float(ranks[:n1].sum() - n1 * (n1 + 1) / 2)
+    ties = float((counts ** 3 - counts).sum())
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u_statistic, 1.0
+    deviation = abs(u_statistic - n1 * n2 / 2)
+    z = max(deviation - 0.5, 0.0) / math.sqrt(variance)  # continuity correction
+    return u_statistic, math.erfc(z / math.sqrt(2))
+
+def _bootstrap(values: np.ndarray, resamples: int, seed: int) -> np.ndarray:
+    """Resample with replacement: array of shape (resamples, len(values))."""
+    rng = np.random.default_rng(seed)
+    return values[rng.integers(0, len(values), size=(resamples, len(values)))]
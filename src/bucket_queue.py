@@ -0,0 +1,67 @@
+"""
+Bucket priority queue (Dial's algorithm) for small integer priorities.
+Terrain costs are small integers, so in uniform-cost search and A* with a
+consistent heuristic every key pushed lies within a fixed span above the key
+last popped. A ring of that many buckets then gives O(1) pushes and
+amortized O(1) pops, with no tuple built per push.
+"""
+
+from typing import Any, Tuple
+
+class BucketQueue:
+    """Monotone priority queue over a ring of buckets, one per priority."""
+
+    def __init__(self, span: int, start: int = 0):
+        """
+        Initialize an empty queue.
+
+        Args:
+            span: Number of buckets; every pushed priority must be less than
+                the last popped priority (or start) plus span
+            start: Lowest priority that will be pushed
+        """
+        if span < 1:
+            raise ValueError("span must be at least 1")
+        self.span = span
+        self.buckets = [[] for _ in range(span)]
+        self.cursor = start  # priority of the bucket popped from last
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def push(self, priority: int, item: Any):
+        """
+        Add an item.
+
+        Args:
+            priority: Integer priority in [cursor, cursor + span)
+            item: Item to store
+
+        Raises:
+            ValueError: If the priority falls outside the window, i.e. the
+                keys are not monotone or the span is too small
+        """
+        if not self.cursor <= priority < self.cursor + self.span:
+            raise ValueError(f"Priority {priority} outside [{self.cursor}, {self.cursor + self.span})")
+        self.buckets[priority % self.span].append(item)
+        self.size += 1
+
+    def pop(self) -> Tuple[int, Any]:
+        """
+        Remove an item of the lowest priority; among equals the latest pushed.
+
+        Returns:
+            (priority, item)
+
+        Raises:
+            IndexError: If the queue is empty
+        """
+        if not self.size:
+            raise IndexError("pop from an empty bucket queue")
+        buckets, span, cursor = self.buckets, self.span, self.cursor
+        while not buckets[cursor % span]:
+            cursor += 1
+        self.cursor = cursor
+        self.size -= 1
+        return cursor, buckets[cursor % span].pop()
@@ -0,0 +1,121 @@
+"""
+Bulk shortest-path engine over the grid's CSR graph.
+Runs multi-source Dijkstra and distance matrices with SciPy's csgraph when it
+is installed, and with a vectorized NumPy label-correcting search otherwise.
+"""
+
+from typing import List, Tuple, Optional
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+    HAVE_SCIPY = True
+except ImportError:
+    HAVE_SCIPY = False
+
+def multi_source_dijkstra(grid, sources: List[Tuple[int, int]],
+                          backend: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the cost from the nearest of several sources to every cell.
+
+    Args:
+        grid: Grid to search
+        sources: List of (x, y) source cells
+        backend: "scipy", "numpy", or None to pick SciPy when available
+
+    Returns:
+        (dist, nearest) arrays of shape (height, width): float64 costs with inf
+        for unreachable cells, and the index into sources of the closest
+        source (-1 if unreachable)
+    """
+    width, height = grid.grid_width, grid.grid_height
+    source_ids = np.array([y * width + x for x, y in sources], dtype=np.int64)
+
+    if _resolve_backend(backend) == "scipy":
+        dist, _, nearest_node = csgraph_dijkstra(
+            _csr_matrix(grid), directed=True, indices=source_ids,
+            min_only=True, return_predecessors=True)
+        # csgraph reports the nearest source as a node id; map it back to its index
+        lookup = np.full(width * height, -1, dtype=np.int64)
+        lookup[source_ids[::-1]] = np.arange(len(source_ids))[::-1]
+        nearest = np.where(nearest_node >= 0, lookup[np.maximum(nearest_node, 0)], -1)
+    else:
+        dist, nearest = _label_correcting(grid.to_csr(), width * height, source_ids)
+
+    return dist.reshape(height, width), nearest.reshape(height, width)
+
+def distance_matrix(grid, points: List[Tuple[int, int]],
+                    backend: Optional[str] = None) -> np.ndarray:
+    """
+    Compute shortest path costs between every ordered pair of points.
+
+    Args:
+        grid: Grid to search
+        points: List of (x, y) cells
+        backend: "scipy", "numpy", or None to pick SciPy when available
+
+    Returns:
+        float64 array of shape (len(points), len(points)); entry [i, j] is the
+        cost of travelling from points[i] to points[j] (inf if unreachable)
+    """
+    width = grid.grid_width
+    point_ids = np.array([y * width + x for x, y in points], dtype=np.int64)
+
+    if _resolve_backend(backend) == "scipy":
+        rows = csgraph_dijkstra(_csr_matrix(grid), directed=True, indices=point_ids)
+        return rows[:, point_ids]
+
+    graph = grid.to_csr()
+    matrix = np.empty((len(point_ids), len(point_ids)))
+    for row, point_id in enumerate(point_ids):
+        dist, _ = _label_correcting(graph, width * grid.grid_height, point_id[None])
+        matrix[row] = dist[point_ids]
+    return matrix
+
+def _resolve_backend(backend: Optional[str]) -> str:
+    if backend is None:
+        return "scipy" if HAVE_SCIPY else "numpy"
+    if backend == "scipy" and not HAVE_SCIPY:
+        raise ImportError("The scipy backend requires SciPy to be installed")
+    if backend not in ("scipy", "numpy"):
+        raise ValueError(f"Unknown backend: {backend}")
+    return backend
+
+def _csr_matrix(grid):
+    indptr, indices, weights = grid.to_csr()
+    size = grid.grid_width * grid.grid_height
+    return csr_matrix((weights.astype(np.float64), indices, indptr), shape=(size, size))
+
+def _label_correcting(graph, size: int, source_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Frontier Bellman-Ford: relax every out-edge of all improved nodes at once."""
+    indptr, indices, weights = graph
+    dist = np.full(size, np.inf)
+    nearest = np.full(size, -1, dtype=np.int64)
+    dist[source_ids] = 0.0
+    nearest[source_ids[::-1]] = np.arange(len(source_ids))[::-1]
+
+    active = np.unique(source_ids)
+    while active.size:
+        starts = indptr[active]
+        counts = indptr[active + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            break
+        # Concatenate the edge ranges of all active nodes without a Python loop
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        edges = offsets + np.arange(total)
+        tails = np.repeat(active, counts)
+        heads = indices[edges]
+        candidate = dist[tails] + weights[edges]
+
+        improved = candidate < dist[heads]
+        if not improved.any():
+            break
+        tails, heads, candidate = tails[improved], heads[improved], candidate[improved]
+        np.minimum.at(dist, heads, candidate)
+        winners = candidate == dist[heads]
+        nearest[heads[winners]] = nearest[tails[winners]]
+        active = np.unique(heads[winners])
+
+    return dist, nearest
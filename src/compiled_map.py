@@ -0,0 +1,229 @@
+"""
+Precompiled map bundles.
+Everything a worker would otherwise derive from a static map before its first
+query (passable mask, CSR neighbour tables, connected components, landmark
+distance tables and a cluster abstraction) is computed once and stored in a
+single .npz file named after a hash of the map's contents. Loading a map
+picks up its bundle, if there is one, instead of recomputing.
+"""
+
+import hashlib
+import os
+from typing import Optional, Tuple
+import numpy as np
+from .bulk_paths import multi_source_dijkstra
+from .components import label_components
+from .flow_field import UNREACHABLE
+
+BUNDLE_FORMAT = 1
+
+def content_hash(grid) -> str:
+    """
+    Hash the static contents of a grid: size, obstacles and terrain.
+
+    Moving obstacles are not part of the hash; nothing in a bundle depends
+    on them.
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array([grid.grid_width, grid.grid_height], dtype=np.int64).tobytes())
+    digest.update(np.packbits(~grid.passable_mask()).tobytes())
+    digest.update(np.ascontiguousarray(grid.terrain, dtype=np.uint8).tobytes())
+    return digest.hexdigest()
+
+def bundle_path(map_filename: str, digest: str) -> str:
+    """Path of the bundle for a map file with the given content hash."""
+    return f"{os.path.splitext(map_filename)[0]}.{digest[:16]}.compiled.npz"
+
+class CompiledMap:
+    """Precomputed static data for one map."""
+
+    def __init__(self, digest: str, arrays: dict):
+        """
+        Wrap a bundle's arrays. Use compile_map() or CompiledMap.load().
+
+        Args:
+            digest: Content hash of the map the arrays were computed from
+            arrays: Dictionary of the bundle's arrays
+        """
+        self.digest = digest
+        self.passable = arrays["passable"]
+        self.indptr, self.indices, self.weights = arrays["indptr"], arrays["indices"], arrays["weights"]
+        self.components = arrays["components"]
+        self.landmarks = arrays["landmarks"]
+        self.landmark_costs = arrays["landmark_costs"]  # (landmarks, height, width), UNREACHABLE where none
+        self.cluster_size = int(arrays["cluster_size"])
+        self.regions = arrays["regions"]
+        self.region_edges = arrays["region_edges"]
+        self.version = None  # grid version it was installed at
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the bundle's arrays."""
+        return sum(array.nbytes for array in self._arrays().values())
+
+    def save(self, filename: str):
+        """
+        Write the bundle, uncompressed so loading is a straight read.
+
+        Args:
+            filename: Path of the .npz file
+        """
+        with open(filename, "wb") as f:
+            np.savez(f, format=np.array(BUNDLE_FORMAT), digest=np.array(self.digest), **self._arrays())
+
+    @classmethod
+    def load(cls, filename: str) -> "CompiledMap":
+        """
+        Read a bundle written by save().
+
+        Args:
+            filename: Path of the .npz file
+
+        Returns:
+            CompiledMap
+        """
+        with np.load(filename, allow_pickle=False) as data:
+            if int(data["format"]) != BUNDLE_FORMAT:
+                raise ValueError(f"{filename} has bundle format {int(data['format'])}, expected {BUNDLE_FORMAT}")
+            arrays = {name: data[name] for name in data.files}
+        return cls(str(arrays.pop("digest")), arrays)
+
+    def install(self, grid):
+        """
+        Attach the bundle to a grid whose contents it was compiled from.
+
+        The grid's CSR cache and component labels are filled from the
+        bundle, and the bundle stays in use until the grid is next edited.
+
+        Args:
+            grid: Grid with matching contents
+        """
+        if content_hash(grid) != self.digest:
+            raise ValueError("Bundle was compiled from a different map")
+        self.version = grid.version
+        grid.compiled = self
+        grid.csr_cache = (grid.version, self.indptr, self.indices, self.weights)
+        # Labels are edited in place as obstacles are added, so the grid gets its own copy
+        grid.component_labels = self.components.copy()
+        grid.next_component = int(self.components.max()) + 1
+
+    def lower_bound(self, origin: Tuple[int, int], goal: Tuple[int, int]) -> float:
+        """
+        Lower bound on the cost of travelling between two cells.
+
+        Cells in different components are unreachable. Otherwise each
+        landmark L gives cost(L, goal) - cost(L, origin) by the triangle
+        inequality.
+
+        Args:
+            origin: Start cell
+            goal: Goal cell
+
+        Returns:
+            Bound (0 when no landmark helps, inf when unreachable)
+        """
+        (ox, oy), (gx, gy) = origin, goal
+        component = self.components[oy, ox]
+        if component < 0 or component != self.components[gy, gx]:
+            return float("inf")
+        to_origin = self.landmark_costs[:, oy, ox]
+        to_goal = self.landmark_costs[:, gy, gx]
+        useful = (to_origin != UNREACHABLE) & (to_goal != UNREACHABLE)
+        if not useful.any():
+            return 0
+        return max(int((to_goal[useful] - to_origin[useful]).max()), 0)
+
+    def _arrays(self) -> dict:
+        return {
+            "passable": self.passable,
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "weights": self.weights,
+            "components": self.components,
+            "landmarks": self.landmarks,
+            "landmark_costs": self.landmark_costs,
+            "cluster_size": np.array(self.cluster_size),
+            "regions": self.regions,
+            "region_edges": self.region_edges,
+        }
+
+def compile_map(grid, landmarks: int = 8, cluster_size: int = 16) -> CompiledMap:
+    """
+    Precompute a map's static data.
+
+    Landmarks are spread by farthest-point selection over the largest
+    component. The cluster abstraction cuts the map into square clusters,
+    labels the connected regions inside each, and lists which regions touch
+    across cluster borders.
+
+    Args:
+        grid: Grid to compile
+        landmarks: Number of landmarks
+        cluster_size: Side of a cluster in cells
+
+    Returns:
+        CompiledMap
+    """
+    passable = grid.passable_mask()
+    indptr, indices, weights = grid.to_csr()
+    components = label_components(passable)
+
+    chosen, costs = [], []
+    if components.max() >= 0:
+        largest = np.argmax(np.bincount(components[passable]))
+        in_largest = components == largest
+        ys, xs = np.nonzero(in_largest)
+        # Seed from the cell farthest from an arbitrary one, then keep adding the farthest cell
+        farthest = _cost_from(grid, (int(xs[0]), int(ys[0])))
+        for _ in range(landmarks):
+            spread = np.where(in_largest & np.isfinite(farthest), farthest, -1)
+            y, x = np.unravel_index(np.argmax(spread), spread.shape)
+            cost = _cost_from(grid, (int(x), int(y)))
+            farthest = cost if not chosen else np.minimum(farthest, cost)
+            chosen.append((int(x), int(y)))
+            costs.append(np.where(np.isfinite(cost), cost, UNREACHABLE).astype(np.int32))
+
+    regions = label_components(passable, cluster_size)
+    edges = [np.stack([regions[:, x - 1], regions[:, x]], axis=1)
+             for x in range(cluster_size, grid.grid_width, cluster_size)]
+    edges += [np.stack([regions[y - 1], regions[y]], axis=1)
+              for y in range(cluster_size, grid.grid_height, cluster_size)]
+    edges = np.concatenate(edges) if edges else np.empty((0, 2), dtype=np.int32)
+    edges = edges[(edges >= 0).all(axis=1)]
+
+    return CompiledMap(content_hash(grid), {
+        "passable": passable,
+        "indptr": indptr,
+        "indices": indices,
+        "weights": weights,
+        "components": components,
+        "landmarks": np.array(chosen, dtype=np.int32).reshape(-1, 2),
+        "landmark_costs": np.array(costs, dtype=np.int32).reshape(-1, grid.grid_height, grid.grid_width),
+        "cluster_size": cluster_size,
+        "regions": regions,
+        "region_edges": np.unique(np.sort(edges, axis=1), axis=0).astype(np.int32),
+    })
+
+def load_bundle(map_filename: str, grid) -> Optional[str]:
+    """
+    Install the bundle for a freshly loaded map, if one was compiled.
+
+    Args:
+        map_filename: Path the map was loaded from
+        grid: Grid loaded from it
+
+    Returns:
+        Path of the installed bundle, or None if there is none
+    """
+    path = bundle_path(map_filename, content_hash(grid))
+    if not os.path.exists(path):
+        return None
+    CompiledMap.load(path).install(grid)
+    return path
+
+def _cost_from(grid, cell: Tuple[int, int]) -> np.ndarray:
+    dist, _ = multi_source_dijkstra(grid, [cell])
+    return dist
@@ -0,0 +1,70 @@
+"""
+Connected-component labelling of passable cells.
+Components are found with a vectorized union-find: every round hooks the
+larger root of each still-split edge onto the smaller one and then
+compresses all parent pointers at once, so the number of rounds grows with
+the logarithm of the component size rather than its diameter.
+"""
+
+from typing import Optional
+import numpy as np
+
+def label_components(passable: np.ndarray, cluster_size: Optional[int] = None) -> np.ndarray:
+    """
+    Label the 4-connected components of passable cells.
+
+    Args:
+        passable: Boolean array of shape (height, width)
+        cluster_size: If given, moves between square clusters of this side
+            are cut, so components never span two clusters
+
+    Returns:
+        int32 array of shape (height, width): labels 0..k-1 numbered in
+        row-major order of each component's first cell, -1 where blocked
+    """
+    height, width = passable.shape
+    right = passable[:, :-1] & passable[:, 1:]
+    down = passable[:-1, :] & passable[1:, :]
+    if cluster_size:
+        right &= (np.arange(1, width) % cluster_size != 0)[None, :]
+        down &= (np.arange(1, height) % cluster_size != 0)[:, None]
+
+    ids = np.arange(height * width, dtype=np.int64).reshape(height, width)
+    sources = np.concatenate([ids[:, :-1][right], ids[:-1, :][down]])
+    targets = np.concatenate([ids[:, 1:][right], ids[1:, :][down]])
+    roots = union_find(height * width, sources, targets)
+
+    labels = np.full(height * width, -1, dtype=np.int32)
+    cells = np.flatnonzero(passable.ravel())
+    # Roots are the smallest cell id of their component, so first-cell order is root order
+    _, labels[cells] = np.unique(roots[cells], return_inverse=True)
+    return labels.reshape(height, width)
+
+def union_find(size: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Find the root of every node of an undirected graph.
+
+    Args:
+        size: Number of nodes
+        sources: First node of each edge
+        targets: Second node of each edge
+
+    Returns:
+        int64 array of roots; each root is the smallest node of its component
+    """
+    parent = np.arange(size, dtype=np.int64)
+    while len(sources):
+        first, second = parent[sources], parent[targets]
+        split = first != second
+        if not split.any():
+            break
+        sources, targets = sources[split], targets[split]
+        first, second = first[split], second[split]
+        np.minimum.at(parent, np.maximum(first, second), np.minimum(first, second))
+        # Hooks only ever point to smaller ids, so jumping terminates
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
@@ -3,9 +3,15 @@ Environment module for the autonomous delivery agent.
 Defines the grid world, terrain types, obstacles, and moving entities.
 """
 
+from collections import deque
 from enum import Enum
-from typing import List, Tuple, Dict, Set, Optional
+import copy
+import threading
+import weakref
+from typing import List, Tuple, Dict, Set, Optional, Callable, NamedTuple
 import numpy as np
+from .flow_field import FlowField, FlowFieldCache
+from .components import label_components
 
 class GroundType(Enum):
     """Enumeration of different terrain types with their movement costs."""
@@ -14,6 +20,14 @@ class GroundType(Enum):
     SLUDGE = 8
     RIVER = 12  # Essentially an obstacle unless specified otherwise
 
+# Terrain is stored per cell as a uint8 code (the GroundType value); this table
+# maps codes to movement costs, as an array for whole-grid lookups and a list
+# for single cells
+TERRAIN_COSTS = np.zeros(256, dtype=np.int32)
+for _ground in GroundType:
+    TERRAIN_COSTS[_ground.value] = _ground.value
+TERRAIN_COST_LIST = TERRAIN_COSTS.tolist()
+
 class CellType(Enum):
     """Enumeration of cell types in the grid."""
     EMPTY = 0
@@ -53,7 +67,7 @@ class MovingObstacle:
         self.path = path
         self.current_step = 0
         self.pace = pace
-        self.step_counter = 0
+        self.pace_counter = 0
         
     def move(self):
         """Move the obstacle to the next position in its path."""
@@ -62,6 +76,19 @@ class MovingObstacle:
             self.pace_counter = 0
             self.current_step = (self.current_step + 1) % len(self.path)
             self.current_x, self.current_y = self.path[self.current_step]
+            
+    def advance(self, steps: int):
+        """
+        Move the obstacle as if move() had been called steps times.
+        
+        Args:
+            steps: Number of time steps to skip ahead
+        """
+        total = self.pace_counter + steps
+        moves, self.pace_counter = divmod(total, self.pace)
+        if moves:
+            self.current_step = (self.current_step + moves) % len(self.path)
+            self.current_x, self.current_y = self.path[self.current_step]
     
     def get_position_at_time(self, time_step: int) -> Tuple[int, int]:
         """
@@ -73,12 +100,32 @@ class MovingObstacle:
         Returns:
             (x, y) coordinates at the specified time step
         """
-        predicted_step = (self.current_step + time_step) % len(self.path)
+        predicted_step = (self.current_step + (self.pace_counter + time_step) // self.pace) % len(self.path)
         return self.path[predicted_step]
+        
+    def next_move_in(self) -> int:
+        """Time steps until the obstacle next moves to a new waypoint."""
+        return self.pace - self.pace_counter
+
+class GridChange(NamedTuple):
+    """A structural edit to the grid: a kind plus an inclusive dirty rectangle."""
+    version: int
+    kind: str  # "obstacle", "terrain", "moving_obstacle" or "reload"
+    x_min: int
+    y_min: int
+    x_max: int
+    y_max: int
+
+    def contains(self, x: int, y: int) -> bool:
+        """Return True if the cell lies inside the dirty rectangle."""
+        return self.x_min <= x <= self.x_max and self.y_min <= y <= self.y_max
 
 class Grid:
     """Class representing the 2D grid environment."""
     
+    # Number of changes kept for changes_since(); older history is dropped
+    change_log_size = 4096
+    
     def __init__(self, grid_width: int, grid_height: int):
         """
         Initialize a grid with specified dimensions.
@@ -89,9 +136,39 @@ class Grid:
         """
         self.grid_width = grid_width
         self.grid_height = grid_height
-        self.grid = np.zeros((grid_height, grid_width), dtype=int)
-        self.terrain = np.full((grid_height, grid_width), GroundType.ASPHALT.value)
+        # One byte per cell for each layer
+        self.grid = np.zeros((grid_height, grid_width), dtype=np.uint8)
+        self.terrain = np.full((grid_height, grid_width), GroundType.ASPHALT.value, dtype=np.uint8)
         self.moving_obstacles = []
+        self.ticks = 0  # time steps the moving obstacles have been advanced
+        # Number of cells per terrain cost, kept current so min_cost() is O(1)
+        self.terrain_counts = {GroundType.ASPHALT.value: grid_width * grid_height}
+        # Change tracking: bumped on every structural edit so derived data can
+        # tell whether (and where) it went stale
+        self.version = 0
+        self.change_log = deque(maxlen=self.change_log_size)
+        self.subscribers = {}
+        self.next_subscriber_id = 0
+        self.flow_fields = None  # FlowFieldCache, created when a goal is pinned
+        self.csr_cache = None  # (version, indptr, indices, weights)
+        self.compiled = None  # CompiledMap installed from a precompiled bundle
+        self.obstacle_table = None  # (key, cells, starts, lengths, paces) of the moving obstacles
+        self.component_labels = None  # computed on first use, then kept current
+        self.next_component = 0
+        self.snapshots = weakref.WeakSet()  # live GridSnapshots sharing these arrays
+        self.cache_lock = threading.RLock()  # held while lazily built caches are filled or read
+        
+    def __getstate__(self) -> Dict:
+        # Weak references and locks cannot be pickled (process pools, deepcopy); snapshots re-register
+        state = dict(self.__dict__)
+        state["snapshots"] = None
+        state["cache_lock"] = None
+        return state
+        
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self.snapshots = weakref.WeakSet()
+        self.cache_lock = threading.RLock()
         
     def is_valid(self, x: int, y: int, time_step: int = 0) -> bool:
         """
@@ -106,11 +183,11 @@ class Grid:
             True if the cell is valid, False otherwise
         """
         # Check bounds
-        if not (0 <= x < self.width and 0 <= y < self.grid_height):
+        if not (0 <= x < self.grid_width and 0 <= y < self.grid_height):
             return False
             
         # Check for static obstacles
-        if self.grid_matrix[y, x] == CellType.OBSTACLE.value:
+        if self.grid[y, x] == CellType.OBSTACLE.value:
             return False
             
         # Check for moving obstacles at this time step
@@ -132,7 +209,167 @@ class Grid:
         Returns:
             Movement cost for the cell
         """
-        return self.Ground_types[y, x]
+        return TERRAIN_COST_LIST[self.terrain[y, x]]
+        
+    def cost_array(self) -> np.ndarray:
+        """
+        Get the movement cost of every cell.
+        
+        Returns:
+            int32 array of shape (height, width)
+        """
+        return TERRAIN_COSTS[self.terrain]
+        
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Report the bytes held by the grid's layers and derived caches.
+        
+        Returns:
+            Dictionary with cell_types, terrain, csr_cache, flow_fields, compiled
+            and total
+        """
+        usage = {
+            "cell_types": self.grid.nbytes,
+            "terrain": self.terrain.nbytes,
+            "csr_cache": sum(array.nbytes for array in self.csr_cache[1:]) if self.csr_cache else 0,
+            "flow_fields": self.flow_fields.nbytes if self.flow_fields is not None else 0,
+            "compiled": self.compiled.nbytes if self.compiled is not None else 0,
+        }
+        if self.compiled is not None and self.csr_cache and self.csr_cache[1] is self.compiled.indptr:
+            usage["compiled"] -= usage["csr_cache"]  # the CSR arrays came from the bundle
+        usage["total"] = sum(usage.values())
+        return usage
+        
+    def passable_mask(self) -> np.ndarray:
+        """
+        Get a boolean mask of cells free of static obstacles.
+        
+        Returns:
+            Boolean array of shape (height, width)
+        """
+        return self.grid != CellType.OBSTACLE.value
+        
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Export the 4-connected graph of static passable cells in CSR form.
+        
+        Node ids are y * width + x. An edge u -> v carries the cost of
+        entering v, so path costs match get_cost sums. The arrays are
+        cached until the grid version changes; moving obstacles are not
+        part of the graph.
+        
+        Returns:
+            (indptr, indices, weights) with int64 indptr, int32 indices and
+            int32 weights
+        """
+        with self.cache_lock:
+            if self.csr_cache is not None and self.csr_cache[0] == self.version:
+                return self.csr_cache[1:]
+                
+            height, width = self.grid_height, self.grid_width
+            passable = self.passable_mask()
+            node_ids = np.arange(width * height, dtype=np.int32).reshape(height, width)
+            sources, targets = [], []
+            for movement in Movement.get_all():
+                dx, dy = movement.value
+                src = (slice(max(0, -dy), height - max(0, dy)), slice(max(0, -dx), width - max(0, dx)))
+                dst = (slice(max(0, dy), height - max(0, -dy)), slice(max(0, dx), width - max(0, -dx)))
+                linked = passable[src] & passable[dst]
+                sources.append(node_ids[src][linked])
+                targets.append(node_ids[dst][linked])
+            sources = np.concatenate(sources)
+            targets = np.concatenate(targets)
+            
+            order = np.argsort(sources, kind="stable")
+            indices = targets[order]
+            weights = TERRAIN_COSTS[self.terrain.ravel()[indices]]
+            indptr = np.zeros(width * height + 1, dtype=np.int64)
+            np.cumsum(np.bincount(sources, minlength=width * height), out=indptr[1:])
+            
+            self.csr_cache = (self.version, indptr, indices, weights)
+            return indptr, indices, weights
+        
+    def components(self) -> np.ndarray:
+        """
+        Get connected-component labels of the cells free of static obstacles.
+        
+        Labels are computed on first use and then kept current as obstacles
+        are added, relabelling only the pieces an obstacle cuts off.
+        
+        Returns:
+            int32 array of shape (height, width): a component id per passable
+            cell (ids are arbitrary but equal within a component), -1 where blocked
+        """
+        with self.cache_lock:
+            if self.component_labels is None:
+                self.component_labels = label_components(self.passable_mask())
+                self.next_component = int(self.component_labels.max()) + 1
+        return self.component_labels
+        
+    def connected(self, origin: Tuple[int, int], goal: Tuple[int, int]) -> bool:
+        """
+        Check in O(1) whether static obstacles leave any route between two cells.
+        
+        Moving obstacles are ignored, so True does not promise a path, but
+        False means no planner can find one.
+        
+        Args:
+            origin: Start cell
+            goal: Goal cell
+            
+        Returns:
+            False if the goal is blocked, outside the grid or in another component
+        """
+        if origin == goal:
+            return True
+        (ox, oy), (gx, gy) = origin, goal
+        width, height = self.grid_width, self.grid_height
+        if not (0 <= gx < width and 0 <= gy < height):
+            return False
+        labels = self.components()
+        goal_label = labels[gy, gx]
+        if goal_label < 0:
+            return False
+        if 0 <= ox < width and 0 <= oy < height and labels[oy, ox] >= 0:
+            return labels[oy, ox] == goal_label
+        # Searches expand blocked or outside starts too; only their neighbours count
+        return any(0 <= nx < width and 0 <= ny < height and labels[ny, nx] == goal_label
+                   for nx, ny in ((ox + 1, oy), (ox - 1, oy), (ox, oy + 1), (ox, oy - 1)))
+        
+    def compiled_map(self):
+        """
+        Get the precompiled bundle installed on this grid, if it is still current.
+        
+        Returns:
+            CompiledMap, or None if none was installed or the grid changed since
+        """
+        if self.compiled is not None and self.compiled.version == self.version:
+            return self.compiled
+        return None
+        
+    def min_cost(self) -> int:
+        """
+        Get the cheapest terrain cost present on the grid.
+        
+        Every step costs at least this much, so it scales distance
+        heuristics without losing admissibility.
+        
+        Returns:
+            Smallest movement cost of any cell
+        """
+        return min(TERRAIN_COST_LIST[code] for code in self.terrain_counts)
+        
+    def max_cost(self) -> int:
+        """
+        Get the most expensive terrain cost present on the grid.
+        
+        No single step costs more, which bounds how far ahead of the
+        cheapest open node a search can push.
+        
+        Returns:
+            Largest movement cost of any cell
+        """
+        return max(TERRAIN_COST_LIST[code] for code in self.terrain_counts)
         
     def add_obstacle(self, x: int, y: int):
         """
@@ -142,7 +379,12 @@ class Grid:
             x: x-coordinate
             y: y-coordinate
         """
-        self.grid_matrix[y, x] = CellType.OBSTACLE.value
+        if self.grid[y, x] == CellType.OBSTACLE.value:
+            return
+        self._before_edit("grid", x, y)
+        self.grid[y, x] = CellType.OBSTACLE.value
+        self._cut_component(x, y)
+        self._record_change("obstacle", x, y, x, y)
         
     def set_ground_type(self, x: int, y: int, Ground_type: GroundType):
         """
@@ -153,7 +395,16 @@ class Grid:
             y: y-coordinate
             terrain_type: Type of terrain to set
         """
+        old_value = int(self.terrain[y, x])
+        if old_value == Ground_type.value:
+            return
+        self.terrain_counts[old_value] -= 1
+        if not self.terrain_counts[old_value]:
+            del self.terrain_counts[old_value]
+        self.terrain_counts[Ground_type.value] = self.terrain_counts.get(Ground_type.value, 0) + 1
+        self._before_edit("terrain", x, y)
         self.terrain[y, x] = Ground_type.value
+        self._record_change("terrain", x, y, x, y)
         
     def add_moving_obstacle(self, obstacle: MovingObstacle):
         """
@@ -163,87 +414,614 @@ class Grid:
             obstacle: MovingObstacle instance to add
         """
         self.moving_obstacles.append(obstacle)
+        xs = [obstacle.current_x] + [x for x, _ in obstacle.path]
+        ys = [obstacle.current_y] + [y for _, y in obstacle.path]
+        self._record_change("moving_obstacle", min(xs), min(ys), max(xs), max(ys))
+        
+    def moving_obstacle_table(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the moving obstacles' paths as flat arrays, cached until obstacles are added.
+        
+        Returns:
+            (cells, starts, lengths, paces): every path's flat cell ids
+            (y * width + x) concatenated, and per obstacle the offset and
+            length of its path and its pace
+        """
+        with self.cache_lock:
+            obstacles = self.moving_obstacles
+            key = (self.version, id(obstacles), len(obstacles))
+            if self.obstacle_table is None or self.obstacle_table[0] != key:
+                lengths = np.array([len(obstacle.path) for obstacle in obstacles], dtype=np.int64)
+                path = np.array([cell for obstacle in obstacles for cell in obstacle.path],
+                                dtype=np.int64).reshape(-1, 2)
+                starts = np.cumsum(lengths) - lengths
+                paces = np.array([obstacle.pace for obstacle in obstacles], dtype=np.int64)
+                self.obstacle_table = (key, path[:, 1] * self.grid_width + path[:, 0], starts, lengths, paces)
+            return self.obstacle_table[1:]
         
     def update_moving_obstacles(self):
         """Update positions of all moving obstacles."""
+        self.ticks += 1
         for obstacle in self.moving_obstacles:
             obstacle.move()
             
-    def load_from_file(self, filename: str):
+    def advance_moving_obstacles(self, steps: int):
         """
-        Load grid configuration from a file.
+        Advance all moving obstacles by several time steps at once.
         
         Args:
-            filename: Path to the grid file
+            steps: Number of time steps to skip ahead
         """
-        with open(filename, 'r') as f:
-            lines = f.readlines()
+        self.ticks += steps
+        for obstacle in self.moving_obstacles:
+            obstacle.advance(steps)
             
-        # Parse grid dimensions
-        grid_width, grid_height = map(int, lines[0].split())
+    def snapshot(self) -> "GridSnapshot":
+        """
+        Take a copy-on-write snapshot of the grid in O(1).
         
-        # Initialize grid
-        self.__init__(grid_width, grid_height)
+        The snapshot shares this grid's arrays and records its own edits
+        in a sparse overlay, so "what if" variants cost memory only for
+        the cells they change. Later edits to this grid do not show
+        through: the old value is saved into each live snapshot first.
+        
+        Returns:
+            GridSnapshot of the current state
+        """
+        return GridSnapshot(self)
         
-        line_idx = 1
+    def _live_snapshots(self) -> List["GridSnapshot"]:
+        """Copy the live snapshots under the cache lock, as one may be registering meanwhile."""
+        with self.cache_lock:
+            return list(self.snapshots)
+            
+    def _before_edit(self, layer: str, x: int, y: int):
+        """
+        Keep live snapshots, and the arrays they have handed out, as they are before a cell edit.
         
-        # Parse static obstacles
-        num_obstacles = int(lines[line_idx]); line_idx += 1
-        for _ in range(num_obstacles):
-            x, y = map(int, lines[line_idx].split()); line_idx += 1
-            self.add_obstacle(x, y)
+        A snapshot without an overlay hands out read-only views of this
+        grid's arrays. When one has, the layer is copied before the edit,
+        so the views keep the old contents and this grid writes to the copy.
+        """
+        snapshots = self._live_snapshots()
+        if any(layer in snapshot.lent for snapshot in snapshots):
+            setattr(self, layer, getattr(self, layer).copy())
+            for snapshot in snapshots:
+                snapshot.lent.discard(layer)
+        for snapshot in snapshots:
+            snapshot._preserve(x, y)
             
-        # Parse terrain
-        for y in range(self.height):
-            ground_row = list(map(int, lines[line_idx].split()))
-            line_idx += 1
-            for x, terrain_val in enumerate(ground_row):
-                self.set_ground_type(x, y, GroundType(terrain_val))
-                
-        # Parse moving obstacles
-        num_moving_obstacles = int(lines[line_idx]); line_idx += 1
-        for _ in range(num_moving_obstacles):
-            parts = lines[line_idx].split(); line_idx += 1
-            x, y = int(parts[0]), int(parts[1])
-            path_length = int(parts[2])
-            path = []
-            for i in range(path_length):
-                path.append((int(parts[3 + i*2]), int(parts[4 + i*2])))
-            pace = int(parts[3 + path_length*2])
-            obstacle = MovingObstacle(x, y, path, pace)
+    def pin_destination(self, x: int, y: int):
+        """
+        Pin a destination so paths to it come from a precomputed flow field.
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+        """
+        with self.cache_lock:
+            if self.flow_fields is None:
+                self.flow_fields = FlowFieldCache(self)
+            self.flow_fields.pin(x, y)
+        
+    def unpin_destination(self, x: int, y: int):
+        """
+        Unpin a destination and release its flow field.
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+        """
+        with self.cache_lock:
+            if self.flow_fields is not None:
+                self.flow_fields.unpin(x, y)
+            
+    def flow_field(self, x: int, y: int) -> Optional[FlowField]:
+        """
+        Get the flow field towards a pinned destination.
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+            
+        Returns:
+            FlowField, or None if the destination is not pinned
+        """
+        with self.cache_lock:  # lookups reorder the LRU and may evict
+            if self.flow_fields is None:
+                return None
+            return self.flow_fields.get(x, y)
+        
+    def subscribe(self, callback: Callable[[GridChange], None]) -> int:
+        """
+        Register a callback invoked with every GridChange after it is applied.
+        
+        Derived structures (distance fields, plan caches, ...) use this to
+        invalidate or repair only the affected region. Moving obstacles
+        advancing along their paths are time, not structure, and are not
+        reported.
+        
+        Args:
+            callback: Function taking a GridChange
+            
+        Returns:
+            Subscription id to pass to unsubscribe()
+        """
+        subscriber_id = self.next_subscriber_id
+        self.next_subscriber_id += 1
+        self.subscribers[subscriber_id] = callback
+        return subscriber_id
+        
+    def unsubscribe(self, subscriber_id: int):
+        """
+        Remove a callback registered with subscribe().
+        
+        Args:
+            subscriber_id: Id returned by subscribe()
+        """
+        self.subscribers.pop(subscriber_id, None)
+        
+    def changes_since(self, version: int) -> Optional[List[GridChange]]:
+        """
+        Get the structural changes made after a given version.
+        
+        Args:
+            version: Version the caller's derived data was built at
+            
+        Returns:
+            Changes in order, or None if the log no longer reaches back that
+            far and the caller must rebuild from scratch
+        """
+        if version >= self.version:
+            return []
+        if not self.change_log or self.change_log[0].version > version + 1:
+            return None
+        return [change for change in self.change_log if change.version > version]
+        
+    def dirty_region_since(self, version: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the bounding rectangle of everything changed after a version.
+        
+        Args:
+            version: Version the caller's derived data was built at
+            
+        Returns:
+            (x_min, y_min, x_max, y_max), None if nothing changed, or the whole
+            grid if the history is no longer available
+        """
+        changes = self.changes_since(version)
+        if changes is None:
+            return (0, 0, self.grid_width - 1, self.grid_height - 1)
+        if not changes:
+            return None
+        return (min(c.x_min for c in changes), min(c.y_min for c in changes),
+                max(c.x_max for c in changes), max(c.y_max for c in changes))
+        
+    def _cut_component(self, x: int, y: int):
+        """Keep component labels current after (x, y) became blocked."""
+        labels = self.component_labels
+        if labels is None or labels[y, x] < 0:
+            return
+        label = labels[y, x]
+        labels[y, x] = -1
+        
+        # Walk the eight surrounding cells in order; the remaining orthogonal
+        # neighbours stay connected if diagonal cells join them around the gap
+        ring = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+        inside = [0 <= x + dx < self.grid_width and 0 <= y + dy < self.grid_height
+                  and labels[y + dy, x + dx] == label for dx, dy in ring]
+        neighbours = sum(inside[0::2])
+        links = sum(inside[i] and inside[i + 1] and inside[(i + 2) % 8] for i in range(0, 8, 2))
+        if neighbours <= 1 or neighbours - links <= 1:
+            return
+            
+        # The component may have split. Flood from each neighbour in lockstep:
+        # floods that meet belong to one piece, and a piece whose floods all run
+        # dry is cut off and gets a new id, so the work is bounded by the
+        # smaller pieces rather than the whole component
+        starts = [(x + dx, y + dy) for (dx, dy), free in zip(ring[0::2], inside[0::2]) if free]
+        owner = {cell: i for i, cell in enumerate(starts)}  # cell -> flood that reached it
+        frontiers = [deque([cell]) for cell in starts]
+        group = list(range(len(starts)))  # flood -> piece
+        pieces = {i: [i] for i in group}  # piece -> its floods
+        while len(pieces) > 1:
+            for i, frontier in enumerate(frontiers):
+                if not frontier or group[i] not in pieces:
+                    continue
+                cx, cy = frontier.popleft()
+                for cell in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+                    nx, ny = cell
+                    if not (0 <= nx < self.grid_width and 0 <= ny < self.grid_height) \
+                            or labels[ny, nx] != label:
+                        continue
+                    if cell not in owner:
+                        owner[cell] = i
+                        frontier.append(cell)
+                    elif group[owner[cell]] != group[i]:
+                        keep, drop = group[owner[cell]], group[i]
+                        for flood in pieces.pop(drop):
+                            group[flood] = keep
+                            pieces[keep].append(flood)
+                piece = group[i]
+                if not any(frontiers[flood] for flood in pieces[piece]):
+                    del pieces[piece]
+                    cells = np.array([cell for cell, flood in owner.items() if group[flood] == piece])
+                    labels[cells[:, 1], cells[:, 0]] = self.next_component
+                    self.next_component += 1
+                if len(pieces) <= 1:
+                    break
+            
+    def _record_change(self, kind: str, x_min: int, y_min: int, x_max: int, y_max: int):
+        """Bump the version, log the dirty rectangle and notify subscribers."""
+        self.version += 1
+        change = GridChange(self.version, kind, x_min, y_min, x_max, y_max)
+        self.change_log.append(change)
+        for callback in list(self.subscribers.values()):
+            callback(change)
+            
+    def set_layers(self, obstacles: np.ndarray, terrain: np.ndarray):
+        """
+        Replace every cell's obstacle flag and terrain in one step.
+        
+        Generated and loaded maps use this instead of per-cell
+        add_obstacle/set_ground_type calls. New arrays are installed rather
+        than written in place, so existing snapshots keep the old ones and
+        are detached; subscribers see a single whole-grid "reload" change.
+        
+        Args:
+            obstacles: Boolean array of shape (height, width), True where blocked
+            terrain: Array of GroundType values of shape (height, width)
+        """
+        shape = (self.grid_height, self.grid_width)
+        if obstacles.shape != shape or terrain.shape != shape:
+            raise ValueError(f"Layers must have shape {shape}")
+        counts = np.bincount(np.asarray(terrain, dtype=np.int64).ravel())
+        values = np.flatnonzero(counts)
+        unknown = set(values.tolist()) - {ground.value for ground in GroundType}
+        if unknown:
+            raise ValueError(f"Unknown terrain values: {sorted(unknown)}")
+        self.grid = np.where(obstacles, CellType.OBSTACLE.value, CellType.EMPTY.value).astype(np.uint8)
+        self.terrain = np.asarray(terrain).astype(np.uint8)
+        self.terrain_counts = dict(zip(values.tolist(), counts[values].tolist()))
+        self.component_labels = None
+        self.snapshots = weakref.WeakSet()
+        self._record_change("reload", 0, 0, self.grid_width - 1, self.grid_height - 1)
+        
+    def load_from_file(self, filename: str):
+        """
+        Load grid configuration from a file.
+        
+        Files ending in .npz are read as the binary format written by
+        save_to_file; anything else as the text format.
+        
+        Args:
+            filename: Path to the grid file
+        """
+        if filename.endswith(".npz"):
+            grid_width, grid_height, obstacles, terrain, moving_obstacles = self._read_binary(filename)
+        else:
+            grid_width, grid_height, obstacles, terrain, moving_obstacles = self._read_text(filename)
+        
+        # Initialize grid, keeping the version monotonic for existing subscribers
+        version, subscribers = self.version, self.subscribers
+        next_subscriber_id, flow_fields = self.next_subscriber_id, self.flow_fields
+        self.__init__(grid_width, grid_height)
+        for obstacle in moving_obstacles:
             self.add_moving_obstacle(obstacle)
             
+        # The per-cell history of the load is meaningless to subscribers
+        self.version = version
+        self.change_log.clear()
+        self.subscribers = subscribers
+        self.next_subscriber_id = next_subscriber_id
+        self.flow_fields = flow_fields
+        self.set_layers(obstacles, terrain)
+            
     def save_to_file(self, filename: str):
         """
         Save grid configuration to a file.
         
+        Files ending in .npz get the binary format (bit-packed obstacles,
+        compressed); anything else gets the text format.
+        
         Args:
             filename: Path to save the grid file
         """
+        if filename.endswith(".npz"):
+            self._write_binary(filename)
+            return
+            
+        ys, xs = np.nonzero(self.grid == CellType.OBSTACLE.value)
         with open(filename, 'w') as f:
-            # Write dimensions
+            # Dimensions, then static obstacle count and positions
             f.write(f"{self.grid_width} {self.grid_height}\n")
-            
-            # Write static obstacles count and positions
-            obstacle_positions = []
-            for y in range(self.grid_height):
-                for x in range(self.grid_width):
-                    if self.grid_matrix[y, x] == CellType.OBSTACLE.value:
-                        obstacle_positions.append((x, y))
-            
-            f.write(f"{len(obstacle_positions)}\n")
-            for x, y in obstacle_positions:
-                f.write(f"{x} {y}\n")
+            f.write(f"{len(xs)}\n")
+            np.savetxt(f, np.column_stack([xs, ys]), fmt="%d")
                 
-            # Write ground types
-            for y in range(self.height):
-                ground_row = [str(self.ground_types[y, x]) for x in range(self.grid_width)]
-                f.write(" ".join(ground_row) + "\n")
+            # Ground types, one row per line
+            np.savetxt(f, self.terrain, fmt="%d")
                 
-            # Write moving obstacles
+            # Moving obstacles: position, path length, path, pace
             f.write(f"{len(self.moving_obstacles)}\n")
             for obstacle in self.moving_obstacles:
-                f.write(f"{obstacle.x} {obstacle.y} {len(obstacle.path)} ")
-                for x, y in obstacle.path:
-                    f.write(f"{x} {y} ")
-                f.write(f"{obstacle.pace}\n")
\ No newline at end of file
+                path = " ".join(f"{x} {y}" for x, y in obstacle.path)
+                f.write(f"{obstacle.current_x} {obstacle.current_y} {len(obstacle.path)} {path} {obstacle.pace}\n")
+                
+    @staticmethod
+    def _read_text(filename: str):
+        """Parse a text grid file into (width, height, obstacles, terrain, moving obstacles)."""
+        with open(filename, 'r') as f:
+            lines = f.read().splitlines()
+            
+        grid_width, grid_height = map(int, lines[0].split())
+        num_obstacles = int(lines[1])
+        line_idx = 2
+        
+        # Static obstacles and terrain are parsed in bulk
+        obstacles = np.zeros((grid_height, grid_width), dtype=bool)
+        cells = np.array(" ".join(lines[line_idx:line_idx + num_obstacles]).split(), dtype=np.int64)
+        cells = cells.reshape(-1, 2)
+        obstacles[cells[:, 1], cells[:, 0]] = True
+        line_idx += num_obstacles
+        terrain = np.array(" ".join(lines[line_idx:line_idx + grid_height]).split(), dtype=np.int64)
+        terrain = terrain.reshape(grid_height, grid_width)
+        line_idx += grid_height
+        
+        moving_obstacles = []
+        num_moving_obstacles = int(lines[line_idx]); line_idx += 1
+        for _ in range(num_moving_obstacles):
+            parts = list(map(int, lines[line_idx].split())); line_idx += 1
+            path_length = parts[2]
+            path = list(zip(parts[3:3 + 2 * path_length:2], parts[4:4 + 2 * path_length:2]))
+            moving_obstacles.append(MovingObstacle(parts[0], parts[1], path, parts[3 + 2 * path_length]))
+        return grid_width, grid_height, obstacles, terrain, moving_obstacles
+        
+    @staticmethod
+    def _read_binary(filename: str):
+        """Read a binary grid file into (width, height, obstacles, terrain, moving obstacles)."""
+        with np.load(filename, allow_pickle=False) as data:
+            grid_height, grid_width = data["terrain"].shape
+            obstacles = np.unpackbits(data["obstacles"], count=grid_width * grid_height)
+            obstacles = obstacles.reshape(grid_height, grid_width).astype(bool)
+            terrain = data["terrain"]
+            paths = np.split(data["obstacle_paths"], np.cumsum(data["obstacle_lengths"])[:-1])
+            moving_obstacles = [
+                MovingObstacle(x, y, [tuple(cell) for cell in path.tolist()], pace)
+                for (x, y), path, pace in zip(data["obstacle_starts"].tolist(), paths,
+                                              data["obstacle_paces"].tolist())
+            ]
+        return grid_width, grid_height, obstacles, terrain, moving_obstacles
+        
+    def _write_binary(self, filename: str):
+        """Write the binary grid format: packed obstacle bits, uint8 terrain, flat obstacle paths."""
+        obstacles = self.moving_obstacles
+        paths = [cell for obstacle in obstacles for cell in obstacle.path]
+        with open(filename, 'wb') as f:
+            np.savez_compressed(
+                f,
+                obstacles=np.packbits(self.grid == CellType.OBSTACLE.value),
+                terrain=self.terrain,
+                obstacle_starts=np.array([(o.current_x, o.current_y) for o in obstacles],
+                                         dtype=np.int32).reshape(-1, 2),
+                obstacle_lengths=np.array([len(o.path) for o in obstacles], dtype=np.int32),
+                obstacle_paths=np.array(paths, dtype=np.int32).reshape(-1, 2),
+                obstacle_paces=np.array([o.pace for o in obstacles], dtype=np.int32),
+            )
+
+class GridSnapshot(Grid):
+    """Copy-on-write view of a Grid: shared base arrays plus a sparse overlay."""
+    
+    def __init__(self, base: Grid, parent: Optional["GridSnapshot"] = None):
+        """
+        Initialize a snapshot. Use Grid.snapshot() rather than calling this.
+        
+        Args:
+            base: Grid whose arrays are shared
+            parent: Snapshot whose overlay is inherited, for snapshots of snapshots
+        """
+        self.grid_width = base.grid_width
+        self.grid_height = base.grid_height
+        self.base = base
+        self.base_grid = base.grid
+        self.base_terrain = base.terrain
+        # Overlays: (x, y) -> value, for cells that differ from the base arrays
+        self.cells = dict(parent.cells) if parent else {}
+        self.terrain_cells = dict(parent.terrain_cells) if parent else {}
+        source = parent or base
+        # Moving obstacles are shared until this snapshot moves or adds one
+        self.moving_obstacles = source.moving_obstacles
+        self.owns_obstacles = False
+        self.ticks = source.ticks
+        self.terrain_counts = dict(source.terrain_counts)
+        self.version = source.version
+        self.change_log = deque(maxlen=self.change_log_size)
+        self.subscribers = {}
+        self.next_subscriber_id = 0
+        self.flow_fields = None
+        self.csr_cache = None
+        self.compiled = None
+        self.obstacle_table = None
+        self.component_labels = None
+        self.next_component = 0
+        self.merged_cache = {}  # layer -> (version, array)
+        self.lent = set()  # layers handed out as views of the base's arrays
+        self.snapshots = weakref.WeakSet()
+        self.cache_lock = threading.RLock()
+        with base.cache_lock:
+            base.snapshots.add(self)
+        
+    def __setstate__(self, state: Dict):
+        super().__setstate__(state)
+        with self.base.cache_lock:
+            self.base.snapshots.add(self)
+        
+    @property
+    def grid(self) -> np.ndarray:
+        """Read-only cell-type array with the overlay applied."""
+        return self._merged("grid", self.base_grid, self.cells)
+        
+    @property
+    def terrain(self) -> np.ndarray:
+        """Read-only terrain array with the overlay applied."""
+        return self._merged("terrain", self.base_terrain, self.terrain_cells)
+        
+    def is_valid(self, x: int, y: int, time_step: int = 0) -> bool:
+        """
+        Check if a cell is valid (within bounds and not blocked).
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+            time_step: Time step to check for moving obstacles
+            
+        Returns:
+            True if the cell is valid, False otherwise
+        """
+        if not (0 <= x < self.grid_width and 0 <= y < self.grid_height):
+            return False
+            
+        cell = self.cells.get((x, y))
+        if cell is None:
+            cell = self.base_grid[y, x]
+        if cell == CellType.OBSTACLE.value:
+            return False
+            
+        for obstacle in self.moving_obstacles:
+            pred_x, pred_y = obstacle.get_position_at_time(time_step)
+            if x == pred_x and y == pred_y:
+                return False
+                
+        return True
+        
+    def get_cost(self, x: int, y: int) -> int:
+        """
+        Get the movement cost for a cell.
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+            
+        Returns:
+            Movement cost for the cell
+        """
+        code = self.terrain_cells.get((x, y))
+        return TERRAIN_COST_LIST[self.base_terrain[y, x] if code is None else code]
+        
+    def add_obstacle(self, x: int, y: int):
+        """
+        Add a static obstacle to the snapshot only.
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+        """
+        cell = self.cells.get((x, y))
+        if cell is None:
+            cell = self.base_grid[y, x]
+        if cell == CellType.OBSTACLE.value:
+            return
+        self.cells[(x, y)] = CellType.OBSTACLE.value
+        self._cut_component(x, y)
+        self._record_change("obstacle", x, y, x, y)
+        
+    def set_ground_type(self, x: int, y: int, Ground_type: GroundType):
+        """
+        Set the terrain type for a cell in the snapshot only.
+        
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+            terrain_type: Type of terrain to set
+        """
+        old_value = self.get_cost(x, y)
+        if old_value == Ground_type.value:
+            return
+        self.terrain_counts[old_value] -= 1
+        if not self.terrain_counts[old_value]:
+            del self.terrain_counts[old_value]
+        self.terrain_counts[Ground_type.value] = self.terrain_counts.get(Ground_type.value, 0) + 1
+        self.terrain_cells[(x, y)] = Ground_type.value
+        self._record_change("terrain", x, y, x, y)
+        
+    def add_moving_obstacle(self, obstacle: MovingObstacle):
+        """
+        Add a moving obstacle to the snapshot only.
+        
+        Args:
+            obstacle: MovingObstacle instance to add
+        """
+        self._own_obstacles()
+        super().add_moving_obstacle(obstacle)
+        
+    def update_moving_obstacles(self):
+        """Update positions of the snapshot's moving obstacles."""
+        self._own_obstacles()
+        super().update_moving_obstacles()
+        
+    def advance_moving_obstacles(self, steps: int):
+        """
+        Advance the snapshot's moving obstacles by several time steps at once.
+        
+        Args:
+            steps: Number of time steps to skip ahead
+        """
+        self._own_obstacles()
+        super().advance_moving_obstacles(steps)
+        
+    def snapshot(self) -> "GridSnapshot":
+        """
+        Take a snapshot of this snapshot.
+        
+        Shares the same base arrays; the overlay is copied, so this costs
+        O(edits) rather than O(1).
+        
+        Returns:
+            GridSnapshot of the current state
+        """
+        return GridSnapshot(self.base, self)
+        
+    def overlay_size(self) -> int:
+        """Number of overlaid cells, which is what the snapshot's memory grows with."""
+        return len(self.cells) + len(self.terrain_cells)
+        
+    def load_from_file(self, filename: str):
+        """Snapshots are read-only for file loads; load into the base Grid and take a new snapshot."""
+        raise TypeError("Grid snapshots are read-only for file loads; "
+                        "load into the base Grid and take a new snapshot")
+        
+    def set_layers(self, obstacles: np.ndarray, terrain: np.ndarray):
+        """Snapshots are read-only for layer replacement; replace the base Grid's layers instead."""
+        raise TypeError("Grid snapshots are read-only for layer replacement; "
+                        "replace the base Grid's layers and take a new snapshot")
+        
+    def _preserve(self, x: int, y: int):
+        """Save the base value of a cell the base grid is about to change."""
+        if (x, y) not in self.cells:
+            self.cells[(x, y)] = int(self.base_grid[y, x])
+        if (x, y) not in self.terrain_cells:
+            self.terrain_cells[(x, y)] = int(self.base_terrain[y, x])
+        # Cached merged arrays alias the base when there was no overlay
+        self.merged_cache.clear()
+        
+    def _own_obstacles(self):
+        """Copy the shared moving obstacles before the snapshot changes them."""
+        if not self.owns_obstacles:
+            self.moving_obstacles = [copy.copy(obstacle) for obstacle in self.moving_obstacles]
+            self.owns_obstacles = True
+            
+    def _merged(self, layer: str, base_array: np.ndarray, overlay: Dict) -> np.ndarray:
+        """Materialize a layer with the overlay applied, cached per version."""
+        with self.cache_lock:
+            cached = self.merged_cache.get(layer)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            if overlay:
+                merged = base_array.copy()
+                xs, ys = zip(*overlay)
+                merged[list(ys), list(xs)] = list(overlay.values())
+            else:
+                merged = base_array.view()
+                self.lent.add(layer)
+            merged.flags.writeable = False
+            self.merged_cache[layer] = (self.version, merged)
+            return merged
@@ -0,0 +1,199 @@
+"""
+Goal-rooted flow fields for pinned destinations.
+A flow field stores, for every cell, the first move of a cheapest path to the
+goal and the cost of that path, so routing to a pinned goal needs no search.
+"""
+
+import heapq
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+import numpy as np
+
+# Move codes, in the same order as environment.Movement.get_all()
+MOVES = ((0, -1), (0, 1), (-1, 0), (1, 0))
+NO_MOVE = -1
+UNREACHABLE = -1
+
+class FlowField:
+    """Per-cell next move and cost-to-go towards a single goal."""
+
+    def __init__(self, goal: Tuple[int, int], next_move: np.ndarray, cost_to_go: np.ndarray,
+                 version: int):
+        """
+        Initialize a flow field.
+
+        Args:
+            goal: (x, y) goal the field points to
+            next_move: int8 array (height, width) of move codes, NO_MOVE where none
+            cost_to_go: int32 array (height, width) of path costs, UNREACHABLE where none
+            version: Grid version the field was computed at
+        """
+        self.goal = goal
+        self.next_move = next_move
+        self.cost_to_go = cost_to_go
+        self.version = version
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the field's arrays."""
+        return self.next_move.nbytes + self.cost_to_go.nbytes
+
+    def cost_from(self, x: int, y: int) -> Optional[int]:
+        """
+        Get the cost of the cheapest path from a cell to the goal.
+
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+
+        Returns:
+            Path cost, or None if the goal is unreachable from the cell
+        """
+        cost = int(self.cost_to_go[y, x])
+        return None if cost == UNREACHABLE else cost
+
+    def path_from(self, x: int, y: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Walk the field from a cell to the goal.
+
+        Args:
+            x: x-coordinate
+            y: y-coordinate
+
+        Returns:
+            List of (x, y) cells from the start to the goal, or None if unreachable
+        """
+        if self.cost_to_go[y, x] == UNREACHABLE:
+            return None
+        next_move = self.next_move
+        path = [(x, y)]
+        while (x, y) != self.goal:
+            dx, dy = MOVES[next_move[y, x]]
+            x, y = x + dx, y + dy
+            path.append((x, y))
+        return path
+
+def compute_flow_field(passable: np.ndarray, terrain: np.ndarray, goal: Tuple[int, int],
+                       version: int = 0) -> FlowField:
+    """
+    Build a flow field with a reverse Dijkstra search rooted at the goal.
+
+    Args:
+        passable: Boolean array (height, width) of cells that can be entered
+        terrain: Array (height, width) of per-cell entry costs
+        goal: (x, y) goal cell
+        version: Grid version the arrays belong to
+
+    Returns:
+        FlowField towards the goal
+    """
+    height, width = passable.shape
+    # Flat Python lists are much faster than NumPy scalar indexing in this loop
+    passable_flat = passable.ravel().tolist()
+    terrain_flat = terrain.ravel().tolist()
+    dist = [UNREACHABLE] * (width * height)
+    moves = [NO_MOVE] * (width * height)
+
+    goal_index = goal[1] * width + goal[0]
+    priority_queue = []
+    if passable_flat[goal_index]:
+        dist[goal_index] = 0
+        priority_queue.append((0, goal_index))
+    while priority_queue:
+        cost, index = heapq.heappop(priority_queue)
+        if cost > dist[index]:
+            continue
+        x, y = index % width, index // width
+        # Stepping into this cell from a neighbour costs this cell's terrain
+        new_cost = cost + terrain_flat[index]
+        for code, (dx, dy) in enumerate(MOVES):
+            prev_x, prev_y = x - dx, y - dy
+            if 0 <= prev_x < width and 0 <= prev_y < height:
+                prev_index = prev_y * width + prev_x
+                if passable_flat[prev_index] and (dist[prev_index] == UNREACHABLE
+                                                  or new_cost < dist[prev_index]):
+                    dist[prev_index] = new_cost
+                    moves[prev_index] = code
+                    heapq.heappush(priority_queue, (new_cost, prev_index))
+
+    return FlowField(
+        goal,
+        np.array(moves, dtype=np.int8).reshape(height, width),
+        np.array(dist, dtype=np.int32).reshape(height, width),
+        version,
+    )
+
+class FlowFieldCache:
+    """Memory-bounded LRU cache of flow fields for a grid's pinned goals."""
+
+    def __init__(self, grid, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache and subscribe to the grid's changes.
+
+        Args:
+            grid: Grid the fields are computed on
+            max_bytes: Upper bound on memory held by cached fields
+        """
+        self.grid = grid
+        self.max_bytes = max_bytes
+        self.pinned = set()
+        self.fields = OrderedDict()
+        self.nbytes = 0
+        grid.subscribe(self._on_change)
+
+    def pin(self, x: int, y: int):
+        """Pin a goal so requests for it are answered from a flow field."""
+        self.pinned.add((x, y))
+
+    def unpin(self, x: int, y: int):
+        """Unpin a goal and drop its field."""
+        self.pinned.discard((x, y))
+        self._drop((x, y))
+
+    def get(self, x: int, y: int) -> Optional[FlowField]:
+        """
+        Get the flow field for a pinned goal, computing it if needed.
+
+        Args:
+            x: Goal x-coordinate
+            y: Goal y-coordinate
+
+        Returns:
+            FlowField, or None if the goal is not pinned
+        """
+        goal = (x, y)
+        if goal not in self.pinned:
+            return None
+        field = self.fields.get(goal)
+        if field is not None:
+            self.fields.move_to_end(goal)
+            return field
+
+        field = compute_flow_field(self.grid.passable_mask(), self.grid.cost_array(), goal,
+                                   self.grid.version)
+        self.fields[goal] = field
+        self.nbytes += field.nbytes
+        # Evict least recently used fields; pins stay and are recomputed on demand
+        while self.nbytes > self.max_bytes and len(self.fields) > 1:
+            _, evicted = self.fields.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return field
+
+    def _drop(self, goal: Tuple[int, int]):
+        field = self.fields.pop(goal, None)
+        if field is not None:
+            self.nbytes -= field.nbytes
+
+    def _on_change(self, change):
+        # Flow fields only model static structure; moving obstacles are checked by the caller
+        if change.kind == "moving_obstacle":
+            return
+        if change.kind == "reload":
+            stale = list(self.fields)
+        else:
+            # A cell no path could reach affects nobody; otherwise an edit can change
+            # costs anywhere upstream of it, so the whole field goes
+            stale = [goal for goal, field in self.fields.items()
+                     if field.cost_to_go[change.y_min, change.x_min] != UNREACHABLE]
+        for goal in stale:
+            self._drop(goal)
@@ -0,0 +1,139 @@
+"""
+Lookahead collision checks against moving obstacles, with local repair.
+Obstacle motion is deterministic, so the positions of every obstacle over the
+next steps are predicted as one array and compared with the agent's upcoming
+cells in a single vectorized check. A predicted collision is repaired where it
+happens, by waiting in place or by a short space-time detour that rejoins the
+planned path, instead of planning the whole leg again.
+"""
+
+from collections import deque
+from typing import Optional, Tuple
+import numpy as np
+
+def predict_cells(grid, horizon: int) -> np.ndarray:
+    """
+    Predict every moving obstacle's cell over the next time steps.
+
+    Uses the same arithmetic as MovingObstacle.get_position_at_time().
+
+    Args:
+        grid: Grid with moving obstacles
+        horizon: Last time offset to predict
+
+    Returns:
+        int64 array of shape (obstacles, horizon + 1): flat cell ids
+        (y * width + x) at time offsets 0..horizon
+    """
+    cells, starts, lengths, paces = grid.moving_obstacle_table()
+    obstacles = grid.moving_obstacles
+    steps = np.array([obstacle.current_step for obstacle in obstacles], dtype=np.int64)
+    counters = np.array([obstacle.pace_counter for obstacle in obstacles], dtype=np.int64)
+    offsets = np.arange(horizon + 1, dtype=np.int64)
+    phase = (steps[:, None] + (counters[:, None] + offsets) // paces[:, None]) % lengths[:, None]
+    return cells[starts[:, None] + phase]
+
+def first_conflict(grid, cells: np.ndarray, horizon: Optional[int] = None,
+                   predicted: Optional[np.ndarray] = None) -> Optional[int]:
+    """
+    Find the first upcoming step that runs into a moving obstacle.
+
+    Step i moves the agent into cells[i] while the obstacles are at time
+    offset i, after which they move to offset i + 1; the step collides if
+    an obstacle is in that cell at either offset.
+
+    Args:
+        grid: Grid with moving obstacles
+        cells: (n, 2) array of the cells the agent will enter, in order
+        horizon: Number of steps to check, all of them if None
+        predicted: predict_cells() output covering the steps, if already at hand
+
+    Returns:
+        Index into cells of the first colliding step, or None
+    """
+    steps = len(cells) if horizon is None else min(len(cells), horizon)
+    if not steps or not grid.moving_obstacles:
+        return None
+    if predicted is None:
+        predicted = predict_cells(grid, steps)
+    codes = cells[:steps, 1].astype(np.int64) * grid.grid_width + cells[:steps, 0]
+    hits = ((predicted[:, :steps] == codes) | (predicted[:, 1:steps + 1] == codes)).any(axis=0)
+    conflicts = np.flatnonzero(hits)
+    return int(conflicts[0]) if len(conflicts) else None
+
+def repair(grid, origin: Tuple[int, int], cells: np.ndarray, conflict: int,
+           max_wait: int = 3, window: int = 8, margin: int = 2) -> Optional[np.ndarray]:
+    """
+    Repair a predicted collision locally.
+
+    Waiting in the cell before the collision is tried first, for up to
+    max_wait steps. Failing that, a breadth-first search over (cell, time)
+    inside the box around the next window cells, grown by margin, looks for
+    the earliest collision-free way back onto the path.
+
+    Args:
+        grid: Grid with moving obstacles
+        origin: Agent's current cell
+        cells: (n, 2) array of the cells the agent will enter
+        conflict: Index of the colliding step, from first_conflict()
+        max_wait: Longest wait to try
+        window: Steps past the collision the repair must keep clear and may
+            rejoin within
+        margin: Cells the detour may stray beyond the path's bounding box
+
+    Returns:
+        Repaired (m, 2) int32 array of cells to enter, or None if neither
+        waiting nor a detour inside the box avoids every obstacle
+    """
+    cells = np.asarray(cells, dtype=np.int32)
+    before = np.asarray(origin, dtype=np.int32) if conflict == 0 else cells[conflict - 1]
+    horizon = conflict + max_wait + 3 * window
+    predicted = predict_cells(grid, horizon + 1)
+
+    for wait in range(1, max_wait + 1):
+        candidate = np.concatenate([cells[:conflict], np.repeat(before[None], wait, axis=0), cells[conflict:]])
+        if first_conflict(grid, candidate, conflict + wait + window, predicted) is None:
+            return candidate
+
+    end = min(conflict + window, len(cells))
+    nearby = cells[max(conflict - 1, 0):end]
+    x_min, y_min = np.maximum(np.minimum(nearby.min(axis=0), before) - margin, 0).tolist()
+    x_max, y_max = np.minimum(np.maximum(nearby.max(axis=0), before) + margin,
+                              (grid.grid_width - 1, grid.grid_height - 1)).tolist()
+    # Path index of each cell in the rejoin stretch; later indices overwrite earlier ones
+    rejoin = {(int(x), int(y)): index for index, (x, y) in enumerate(cells[conflict:end].tolist(), conflict)}
+    occupied = [set(column.tolist()) for column in predicted.T]
+    labels = grid.components()  # -1 on static obstacles
+    width = grid.grid_width
+
+    start = (int(before[0]), int(before[1]), conflict)
+    parent = {start: None}
+    frontier = deque([start])
+    while frontier:
+        state = frontier.popleft()
+        x, y, time = state
+        if time >= horizon - window:
+            continue
+        for nx, ny in ((x, y), (x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if not (x_min <= nx <= x_max and y_min <= ny <= y_max):
+                continue
+            code = ny * width + nx
+            if labels[ny, nx] < 0 or code in occupied[time] or code in occupied[time + 1]:
+                continue
+            following = (nx, ny, time + 1)
+            if following in parent:
+                continue
+            parent[following] = state
+            index = rejoin.get((nx, ny))
+            if index is not None and (nx, ny) != (x, y):
+                detour = []
+                node = following
+                while node != start:
+                    detour.append(node[:2])
+                    node = parent[node]
+                candidate = np.concatenate([cells[:conflict], np.array(detour[::-1], dtype=np.int32),
+                                            cells[index + 1:]])
+                if first_conflict(grid, candidate, time + 1 + window, predicted) is None:
+                    return candidate
+            frontier.append(following)
+    return None
@@ -0,0 +1,236 @@
+"""
+Seeded generation of large maps and delivery scenarios.
+Layouts, terrain and order sets are built as whole NumPy arrays, so maps of a
+million cells and more take well under a second or two; the same seed always
+gives the same scenario.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .environment import Grid, GroundType, MovingObstacle
+from .bulk_paths import multi_source_dijkstra
+
+LAYOUTS = ("open", "city", "maze")
+
+# Default share of each terrain band, cheapest first
+TERRAIN_MIX = {
+    GroundType.ASPHALT: 0.55,
+    GroundType.FIELD: 0.25,
+    GroundType.SLUDGE: 0.12,
+    GroundType.RIVER: 0.08,
+}
+
+def generate_map(width: int, height: int, layout: str = "open", obstacle_density: float = 0.0,
+                 terrain_scale: Optional[int] = 32, terrain_mix: Optional[dict] = None,
+                 moving_obstacles: int = 0, block_size: int = 8, street_width: int = 2,
+                 corridor_width: int = 1, seed: Optional[int] = None) -> Grid:
+    """
+    Generate a map.
+
+    Args:
+        width: Width of the grid
+        height: Height of the grid
+        layout: "open", "city" (street grid around solid blocks) or "maze"
+            (perfect maze, every corridor cell reachable)
+        obstacle_density: Share of the remaining free cells blocked at random
+        terrain_scale: Feature size in cells of the noise terrain bands, or None
+            for asphalt everywhere
+        terrain_mix: GroundType -> share of cells, defaults to TERRAIN_MIX
+        moving_obstacles: Number of vehicles patrolling straight free segments
+        block_size: City block side in cells
+        street_width: City street width in cells
+        corridor_width: Maze corridor and wall width in cells
+        seed: Random seed
+
+    Returns:
+        Grid with the generated layers and moving obstacles
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    rng = np.random.default_rng(seed)
+
+    if layout == "city":
+        obstacles = city_blocks(width, height, block_size, street_width)
+    elif layout == "maze":
+        obstacles = maze(width, height, corridor_width, rng)
+    else:
+        obstacles = np.zeros((height, width), dtype=bool)
+    if obstacle_density > 0:
+        obstacles |= rng.random((height, width)) < obstacle_density
+
+    if terrain_scale:
+        terrain = terrain_bands(width, height, terrain_scale, terrain_mix or TERRAIN_MIX, rng)
+    else:
+        terrain = np.full((height, width), GroundType.ASPHALT.value)
+
+    grid = Grid(width, height)
+    grid.set_layers(obstacles, terrain)
+    for obstacle in patrols(~obstacles, moving_obstacles, rng):
+        grid.add_moving_obstacle(obstacle)
+    return grid
+
+def city_blocks(width: int, height: int, block_size: int, street_width: int) -> np.ndarray:
+    """
+    Solid blocks separated by a regular grid of streets.
+
+    Returns:
+        Boolean obstacle array of shape (height, width)
+    """
+    pitch = block_size + street_width
+    rows = np.arange(height) % pitch >= street_width
+    cols = np.arange(width) % pitch >= street_width
+    return rows[:, None] & cols[None, :]
+
+def maze(width: int, height: int, corridor_width: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Perfect maze carved with the sidewinder algorithm, one row of cells at a time.
+
+    Maze cells sit on odd coordinates of a lattice scaled up by corridor_width;
+    cells that do not fit a whole maze cell are left as wall.
+
+    Returns:
+        Boolean obstacle array of shape (height, width)
+    """
+    cells_x = (width // corridor_width - 1) // 2
+    cells_y = (height // corridor_width - 1) // 2
+    if cells_x < 1 or cells_y < 1:
+        return np.ones((height, width), dtype=bool)
+    lattice = np.ones((2 * cells_y + 1, 2 * cells_x + 1), dtype=bool)
+    lattice[1::2, 1::2] = False
+
+    # Each row is split into runs joined east-west; the last cell always ends a run
+    closes = rng.random((cells_y, cells_x)) < 0.5
+    closes[:, -1] = True
+    closes[0] = False  # the first row is a single corridor
+    closes[0, -1] = True
+    lattice[1::2, 2:-1:2] = closes[:, :-1]
+
+    # Every run below the first row opens north from one random cell
+    starts = np.ones_like(closes)
+    starts[:, 1:] = closes[:, :-1]
+    runs = np.cumsum(starts[1:].ravel()) - 1
+    order = np.lexsort((rng.random(len(runs)), runs))
+    chosen = order[np.r_[0, np.flatnonzero(np.diff(runs[order])) + 1]]
+    rows, cols = np.divmod(chosen, cells_x)
+    lattice[2 * rows + 2, 2 * cols + 1] = False
+
+    obstacles = np.ones((height, width), dtype=bool)
+    scaled = np.repeat(np.repeat(lattice, corridor_width, axis=0), corridor_width, axis=1)
+    obstacles[:scaled.shape[0], :scaled.shape[1]] = scaled
+    return obstacles
+
+def terrain_bands(width: int, height: int, scale: int, mix: dict,
+                  rng: np.random.Generator) -> np.ndarray:
+    """
+    Terrain in smooth bands from two octaves of value noise.
+
+    The noise is cut at its quantiles so each terrain covers its share of
+    the map, cheapest terrain on the lowest noise.
+
+    Returns:
+        Array of GroundType values of shape (height, width)
+    """
+    noise = _value_noise(width, height, scale, rng) + 0.5 * _value_noise(width, height, max(scale // 4, 1), rng)
+    grounds = sorted(mix, key=lambda ground: ground.value)
+    shares = np.array([mix[ground] for ground in grounds], dtype=np.float64)
+    cuts = np.quantile(noise, np.cumsum(shares / shares.sum())[:-1])
+    values = np.array([ground.value for ground in grounds])
+    return values[np.searchsorted(cuts, noise, side="right")]
+
+def patrols(free: np.ndarray, count: int, rng: np.random.Generator,
+            max_length: int = 12) -> List[MovingObstacle]:
+    """
+    Moving obstacles driving back and forth along straight free segments.
+
+    Args:
+        free: Boolean array of shape (height, width), True where passable
+        count: Number of moving obstacles
+        rng: Random generator
+        max_length: Longest segment in cells
+
+    Returns:
+        List of MovingObstacle
+    """
+    ys, xs = np.nonzero(free)
+    if not len(xs) or not count:
+        return []
+    height, width = free.shape
+    picks = rng.integers(0, len(xs), count)
+    horizontal = rng.random(count) < 0.5
+    lengths = rng.integers(2, max_length + 1, count)
+    paces = rng.integers(1, 4, count)
+
+    obstacles = []
+    for x, y, along_x, length, pace in zip(xs[picks].tolist(), ys[picks].tolist(),
+                                          horizontal.tolist(), lengths.tolist(), paces.tolist()):
+        line = free[y, x:min(x + length, width)] if along_x else free[y:min(y + length, height), x]
+        # Stop at the first blocked cell
+        run = int(np.argmin(line)) if not line.all() else len(line)
+        segment = [(x + i, y) if along_x else (x, y + i) for i in range(run)]
+        path = segment + segment[-2:0:-1]
+        obstacles.append(MovingObstacle(x, y, path, pace))
+    return obstacles
+
+def generate_orders(grid: Grid, count: int, depot: Optional[Tuple[int, int]] = None,
+                    seed: Optional[int] = None) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Draw package/destination pairs on free cells.
+
+    Args:
+        grid: Grid to place orders on
+        count: Number of orders
+        depot: If given, only cells reachable from here are used
+        seed: Random seed
+
+    Returns:
+        List of ((package x, package y), (destination x, destination y))
+    """
+    rng = np.random.default_rng(seed)
+    free = grid.passable_mask()
+    if depot is not None:
+        dist, _ = multi_source_dijkstra(grid, [depot])
+        free &= np.isfinite(dist)
+    ys, xs = np.nonzero(free)
+    if not len(xs):
+        raise ValueError("No free cells to place orders on")
+    picks = rng.integers(0, len(xs), (count, 2))
+    cells = np.stack([xs[picks], ys[picks]], axis=-1).tolist()
+    return [(tuple(package), tuple(destination)) for package, destination in cells]
+
+def save_orders(filename: str, orders: Sequence[Tuple[Tuple[int, int], Tuple[int, int]]]):
+    """
+    Write orders as text, one "package_x package_y destination_x destination_y" line each.
+
+    Args:
+        filename: Path of the orders file
+        orders: List of (package, destination) pairs
+    """
+    np.savetxt(filename, np.array(orders, dtype=np.int64).reshape(-1, 4), fmt="%d")
+
+def load_orders(filename: str) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Read an orders file written by save_orders.
+
+    Args:
+        filename: Path of the orders file
+
+    Returns:
+        List of (package, destination) pairs
+    """
+    rows = np.loadtxt(filename, dtype=np.int64, ndmin=2).reshape(-1, 4).tolist()
+    return [((px, py), (dx, dy)) for px, py, dx, dy in rows]
+
+def _value_noise(width: int, height: int, scale: int, rng: np.random.Generator) -> np.ndarray:
+    """Random values on a coarse lattice, smoothly interpolated up to (height, width)."""
+    coarse = rng.random((height // scale + 2, width // scale + 2))
+
+    def weights(size):
+        position = np.arange(size) / scale
+        index = position.astype(np.int64)
+        t = position - index
+        return index, t * t * (3 - 2 * t)  # smoothstep
+
+    ix, tx = weights(width)
+    iy, ty = weights(height)
+    rows = coarse[:, ix] * (1 - tx) + coarse[:, ix + 1] * tx
+    return rows[iy] * (1 - ty)[:, None] + rows[iy + 1] * ty[:, None]
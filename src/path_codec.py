@@ -0,0 +1,101 @@
+"""
+Compact path representations.
+A path of n cells is held as an (n, 2) int32 array, so slicing off the part
+already driven is a view rather than a copy. For storage and transfer it can
+be reduced further to its start cell plus one move code per step, or to runs
+of equal moves.
+"""
+
+import re
+from typing import Dict, Sequence, Tuple
+import numpy as np
+
+# Move codes in the order the planners try neighbours: right, left, down, up
+MOVES = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int32)
+MOVE_LETTERS = "RLDU"
+_RUN = re.compile(r"([RLDU])(\d*)")
+
+def to_array(path: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """
+    Convert a path to an (n, 2) int32 array of (x, y) rows.
+
+    Arrays already in that form are returned as they are.
+    """
+    return np.asarray(path, dtype=np.int32).reshape(-1, 2)
+
+def encode_moves(path: Sequence[Tuple[int, int]]) -> Tuple[Tuple[int, int], bytes]:
+    """
+    Encode a path as its start cell and one byte per step.
+
+    Args:
+        path: Cells of a 4-connected path, at least one
+
+    Returns:
+        ((x, y) start, move codes indexing MOVES)
+
+    Raises:
+        ValueError: If the path is empty or a step is not to a neighbour
+    """
+    cells = to_array(path)
+    if not len(cells):
+        raise ValueError("Cannot encode an empty path")
+    steps = np.diff(cells, axis=0)
+    codes = (steps[:, 0] == -1) * 1 + (steps[:, 1] == 1) * 2 + (steps[:, 1] == -1) * 3
+    if not np.array_equal(MOVES[codes], steps):
+        raise ValueError("Path has a step that is not to a neighbouring cell")
+    return (int(cells[0, 0]), int(cells[0, 1])), codes.astype(np.uint8).tobytes()
+
+def decode_moves(start: Tuple[int, int], codes: bytes) -> np.ndarray:
+    """
+    Rebuild a path from encode_moves() output.
+
+    Returns:
+        (n, 2) int32 array, start cell first
+    """
+    steps = MOVES[np.frombuffer(codes, dtype=np.uint8)]
+    cells = np.empty((len(steps) + 1, 2), dtype=np.int32)
+    cells[0] = start
+    np.cumsum(steps, axis=0, out=cells[1:])
+    cells[1:] += cells[0]
+    return cells
+
+def encode_rle(path: Sequence[Tuple[int, int]]) -> Dict:
+    """
+    Encode a path as its start cell and runs of equal moves.
+
+    A straight stretch of k steps right is "R" followed by k ("R" alone for
+    one step), so "R12D3" is twelve steps right then three down.
+
+    Args:
+        path: Cells of a 4-connected path, at least one
+
+    Returns:
+        Dictionary with "start" ([x, y]), "moves" (run string) and "length"
+        (number of cells)
+    """
+    start, codes = encode_moves(path)
+    codes = np.frombuffer(codes, dtype=np.uint8)
+    breaks = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.r_[0, breaks] if len(codes) else breaks
+    lengths = np.diff(np.r_[starts, len(codes)])
+    moves = "".join(MOVE_LETTERS[code] + (str(count) if count > 1 else "")
+                    for code, count in zip(codes[starts].tolist(), lengths.tolist()))
+    return {"start": list(start), "moves": moves, "length": len(codes) + 1}
+
+def decode_rle(encoded: Dict) -> np.ndarray:
+    """
+    Rebuild a path from encode_rle() output.
+
+    Returns:
+        (n, 2) int32 array, start cell first
+
+    Raises:
+        ValueError: If the run string is malformed
+    """
+    moves = encoded["moves"]
+    runs = _RUN.findall(moves)
+    if "".join(letter + count for letter, count in runs) != moves:
+        raise ValueError(f"Malformed move runs: {moves!r}")
+    codes = np.repeat([MOVE_LETTERS.index(letter) for letter, _ in runs],
+                      [int(count) if count else 1 for _, count in runs]).astype(np.uint8)
+    return decode_moves(tuple(encoded["start"]), codes.tobytes())
@@ -0,0 +1,231 @@
+"""
+Portfolio planning: race several optimal planners and keep the first answer.
+Which planner is fastest depends on the map, so wins and winning times are
+kept per map profile, and later queries on similar maps launch only the
+planners that have been winning there.
+"""
+
+import multiprocessing
+import os
+from multiprocessing.connection import wait
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .environment import CellType, TERRAIN_COSTS
+from .ALGO import BFS_path_finder, ucs, a_star
+
+# Optimal planners the portfolio can race; the BFS engines are only optimal on uniform terrain
+PLANNERS = ("a_star", "ucs", "bfs", "wavefront")
+UNIFORM_ONLY = ("bfs", "wavefront")
+
+def run_planner(grid, algorithm: str, origin: Tuple[int, int],
+                goal: Tuple[int, int]) -> Tuple[Optional[List[Tuple[int, int]]], float]:
+    """
+    Run one portfolio planner.
+
+    Args:
+        grid: Grid to plan on
+        algorithm: One of PLANNERS
+        origin: Start cell
+        goal: Goal cell
+
+    Returns:
+        (path, cost); path is None and cost inf when the goal is unreachable
+    """
+    if algorithm == "a_star":
+        path, cost, _ = a_star(grid, origin, goal)
+    elif algorithm == "ucs":
+        path, cost, _ = ucs(grid, origin, goal)
+    elif algorithm in UNIFORM_ONLY:
+        path, cost, _ = BFS_path_finder(grid, origin, goal, "wavefront" if algorithm == "wavefront" else "queue")
+        if path is not None:
+            # BFS counts steps; price them with the terrain
+            cells = np.array(path[1:], dtype=np.int64).reshape(-1, 2)
+            cost = int(TERRAIN_COSTS[grid.terrain[cells[:, 1], cells[:, 0]]].sum())
+    else:
+        raise ValueError(f"Unknown portfolio planner: {algorithm}")
+    return path, cost
+
+def map_profile(grid) -> Tuple:
+    """
+    Summarize what decides which planner wins on a map.
+
+    Returns:
+        (uniform terrain, obstacle density in tenths, log2 of the cell count,
+        has moving obstacles)
+    """
+    cells = grid.grid_width * grid.grid_height
+    density = np.count_nonzero(grid.grid == CellType.OBSTACLE.value) / cells
+    return (len(grid.terrain_counts) == 1, int(density * 10), cells.bit_length(),
+            bool(grid.moving_obstacles))
+
+class PlannerPortfolio:
+    """Races optimal planners in worker processes and learns which ones to launch."""
+
+    def __init__(self, width: int = 2, min_queries: int = 3, explore_every: int = 10,
+                 parallel_cells: int = 40000, start_method: Optional[str] = None):
+        """
+        Initialize an empty portfolio.
+
+        Args:
+            width: Planners launched per query once a profile has statistics
+            min_queries: Queries per profile that launch every planner first
+            explore_every: Every this many queries, launch every planner again
+                so the statistics follow changes in the workload
+            parallel_cells: Maps smaller than this are planned in this process,
+                where starting workers would cost more than the search; so are
+                all maps on a single core, where racing only splits the core
+            start_method: multiprocessing start method of the workers. None
+                forks where the platform can, which saves pickling the grid;
+                callers running on several threads should pass "forkserver"
+                or "spawn", as forking a process whose other threads may hold
+                locks is unsafe
+        """
+        self.width = width
+        self.min_queries = min_queries
+        self.explore_every = explore_every
+        self.parallel_cells = parallel_cells
+        self.cores = os.cpu_count() or 1
+        # profile -> algorithm -> {"runs", "wins", "win_seconds"}
+        self.stats = {}
+        self.queries = {}
+        self.profile_cache = (None, None, None)  # (grid id, version, profile)
+        methods = multiprocessing.get_all_start_methods()
+        if start_method is None:
+            # Forked workers see the grid without pickling it
+            start_method = "fork" if "fork" in methods else None
+        self.context = multiprocessing.get_context(start_method)
+
+    def profile(self, grid) -> Tuple:
+        """Get a grid's profile, cached until the grid changes."""
+        grid_id, version, profile = self.profile_cache
+        if grid_id != id(grid) or version != grid.version:
+            profile = map_profile(grid)
+            self.profile_cache = (id(grid), grid.version, profile)
+        return profile
+
+    def candidates(self, grid) -> List[str]:
+        """
+        Choose the planners to launch for the next query on a grid.
+
+        Args:
+            grid: Grid to plan on
+
+        Returns:
+            Planner names, best first
+        """
+        eligible = [algorithm for algorithm in PLANNERS
+                    if algorithm not in UNIFORM_ONLY or len(grid.terrain_counts) == 1]
+        profile = self.profile(grid)
+        if self._exploring(profile):
+            return eligible
+        stats = self.stats.get(profile, {})
+        return sorted(eligible, key=lambda algorithm: self._rank(stats.get(algorithm)))[:self.width]
+
+    def plan(self, grid, origin: Tuple[int, int], goal: Tuple[int, int]) -> Dict:
+        """
+        Plan with the portfolio and record which planner won.
+
+        Every planner raced is optimal, so the first answer is returned and
+        the other workers are terminated.
+
+        Args:
+            grid: Grid to plan on
+            origin: Start cell
+            goal: Goal cell
+
+        Returns:
+            Dictionary with path (None if unreachable), cost, winner,
+            candidates and elapsed_ms
+        """
+        profile = self.profile(grid)
+        candidates = self.candidates(grid)
+        start = time.perf_counter()
+        if grid.grid_width * grid.grid_height < self.parallel_cells or self.cores == 1:
+            # Planned in turn: only exploring queries try more than the favourite
+            if not self._exploring(profile):
+                candidates = candidates[:1]
+            winner, (path, cost), elapsed = self._run_inline(grid, candidates, origin, goal)
+        else:
+            winner, (path, cost) = self._race(grid, candidates, origin, goal)
+            elapsed = time.perf_counter() - start
+
+        self.queries[profile] = self.queries.get(profile, 0) + 1
+        stats = self.stats.setdefault(profile, {})
+        for algorithm in candidates:
+            entry = stats.setdefault(algorithm, {"runs": 0, "wins": 0, "win_seconds": 0.0})
+            entry["runs"] += 1
+        stats[winner]["wins"] += 1
+        stats[winner]["win_seconds"] += elapsed
+        return {
+            "path": path,
+            "cost": cost,
+            "winner": winner,
+            "candidates": candidates,
+            "elapsed_ms": elapsed * 1000,
+        }
+
+    def _exploring(self, profile: Tuple) -> bool:
+        """Whether the next query on a profile launches every planner."""
+        queries = self.queries.get(profile, 0)
+        return queries < self.min_queries or queries % self.explore_every == 0
+
+    def _run_inline(self, grid, candidates, origin, goal):
+        """Time each candidate in turn; the fastest is the winner."""
+        best = None
+        for algorithm in candidates:
+            start = time.perf_counter()
+            result = run_planner(grid, algorithm, origin, goal)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[2]:
+                best = (algorithm, result, elapsed)
+        return best
+
+    def _race(self, grid, candidates, origin, goal):
+        """Start one worker per candidate and take the first answer."""
+        workers = {}
+        for algorithm in candidates:
+            receiver, sender = self.context.Pipe(duplex=False)
+            process = self.context.Process(target=_race_worker, daemon=True,
+                                           args=(sender, grid, algorithm, origin, goal))
+            process.start()
+            sender.close()
+            workers[receiver] = (algorithm, process)
+
+        errors = []
+        try:
+            pending = list(workers)
+            while pending:
+                for receiver in wait(pending):
+                    pending.remove(receiver)
+                    try:
+                        status, payload = receiver.recv()
+                    except EOFError:
+                        errors.append(f"{workers[receiver][0]} worker exited")
+                        continue
+                    if status == "ok":
+                        return workers[receiver][0], payload
+                    errors.append(f"{workers[receiver][0]}: {payload}")
+            raise RuntimeError("Every portfolio planner failed: " + "; ".join(errors))
+        finally:
+            for receiver, (_, process) in workers.items():
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+                receiver.close()
+
+    @staticmethod
+    def _rank(entry: Optional[Dict]) -> Tuple[float, float]:
+        """Sort key: highest win rate first, then fastest mean winning time."""
+        if not entry or not entry["wins"]:
+            return (0.0, float("inf"))
+        return (-entry["wins"] / entry["runs"], entry["win_seconds"] / entry["wins"])
+
+def _race_worker(connection, grid, algorithm, origin, goal):
+    """Worker process body: send ("ok", (path, cost)) or ("error", message)."""
+    try:
+        connection.send(("ok", run_planner(grid, algorithm, origin, goal)))
+    except Exception as e:
+        connection.send(("error", str(e)))
+    finally:
+        connection.close()
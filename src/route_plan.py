@@ -0,0 +1,114 @@
+"""
+Planned multi-stop route with cached leg costs.
+New pickup/drop-off pairs are placed by cheapest insertion, scored for every
+gap of the route at once with NumPy, and only the legs touching the new
+stops need planning.
+"""
+
+from typing import List, Tuple, Optional
+import numpy as np
+
+class RoutePlan:
+    """Ordered stops, each with the planned path and cost of the leg that reaches it."""
+
+    def __init__(self):
+        """Initialize an empty route."""
+        self.stops: List[Tuple[int, int]] = []
+        self.paths: List[Optional[List[Tuple[int, int]]]] = []
+        self.xy = np.empty((0, 2), dtype=np.int64)
+        self.costs = np.empty(0, dtype=np.float64)  # cost of the leg ending at each stop
+
+    def __len__(self) -> int:
+        return len(self.stops)
+
+    def total_cost(self) -> float:
+        """Fuel needed for the whole remaining route."""
+        return float(self.costs.sum())
+
+    def best_insertion(self, origin: Tuple[int, int], package: Tuple[int, int],
+                       destination: Tuple[int, int], min_step: int) -> Tuple[int, int, float]:
+        """
+        Find the cheapest place for a pickup followed by its drop-off.
+
+        Existing legs are charged their cached cost and new legs the
+        Manhattan lower bound, so every gap is scored in one vectorized pass.
+
+        Args:
+            origin: Position the first leg starts from
+            package: (x, y) pickup
+            destination: (x, y) drop-off
+            min_step: Cheapest terrain cost on the grid
+
+        Returns:
+            (package_index, destination_index, added_cost), with indices into
+            the route after both stops are inserted
+        """
+        before = np.vstack([np.asarray(origin, dtype=np.int64)[None], self.xy])
+        count = len(self.stops)
+
+        def detour(point):
+            into = min_step * np.abs(before - point).sum(axis=1).astype(np.float64)
+            out = min_step * np.abs(self.xy - point).sum(axis=1) - self.costs
+            into[:count] += out
+            return into, out
+
+        package_detour, _ = detour(package)
+        destination_detour, destination_out = detour(destination)
+
+        # Both stops in the same gap: a -> package -> destination -> b
+        direct = min_step * (abs(package[0] - destination[0]) + abs(package[1] - destination[1]))
+        into_package = min_step * np.abs(before - package).sum(axis=1)
+        together = into_package + direct + np.append(destination_out, 0.0)
+
+        # Drop-off in a later gap: cheapest detour among the gaps after each pickup gap
+        later = np.minimum.accumulate(destination_detour[::-1])[::-1]
+        apart = package_detour + np.append(later[1:], np.inf)
+
+        gap = int(np.argmin(np.minimum(together, apart)))
+        if together[gap] <= apart[gap]:
+            return gap, gap + 1, float(together[gap])
+        destination_gap = gap + 1 + int(np.argmin(destination_detour[gap + 1:]))
+        return gap, destination_gap + 1, float(apart[gap])
+
+    def insert(self, index: int, stop: Tuple[int, int]) -> List[int]:
+        """
+        Insert a stop and invalidate the legs it touches.
+
+        Args:
+            index: Position of the new stop in the route
+            stop: (x, y) cell
+
+        Returns:
+            Indices of the legs that now need planning
+        """
+        self.stops.insert(index, stop)
+        self.paths.insert(index, None)
+        self.xy = np.insert(self.xy, index, stop, axis=0)
+        self.costs = np.insert(self.costs, index, np.nan)
+        stale = [index]
+        if index + 1 < len(self.stops):
+            self.paths[index + 1] = None
+            self.costs[index + 1] = np.nan
+            stale.append(index + 1)
+        return stale
+
+    def set_leg(self, index: int, path: List[Tuple[int, int]], cost: float):
+        """Store the planned path and cost of the leg ending at a stop."""
+        self.paths[index] = path
+        self.costs[index] = cost
+
+    def pop_front(self) -> Tuple[int, int]:
+        """Remove and return the first stop once it has been reached."""
+        self.paths.pop(0)
+        self.xy = self.xy[1:]
+        self.costs = self.costs[1:]
+        return self.stops.pop(0)
+
+    def snapshot(self):
+        """Capture the route so a failed insertion can be rolled back."""
+        return list(self.stops), list(self.paths), self.xy, self.costs.copy()
+
+    def restore(self, snapshot):
+        """Roll back to a snapshot."""
+        stops, paths, self.xy, self.costs = snapshot
+        self.stops, self.paths = list(stops), list(paths)
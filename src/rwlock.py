@@ -0,0 +1,76 @@
+"""
+Reader-writer lock.
+Path queries only read a grid, so any number of them can run at once; edits
+to the grid or the agent need it to themselves. Waiting writers block new
+readers, so a steady stream of queries cannot hold an edit off forever.
+"""
+
+import threading
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    """Lock shared by many readers or held by one writer, preferring writers."""
+
+    def __init__(self):
+        """Initialize an unheld lock."""
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0  # threads currently reading
+        self.writer = None  # ident of the thread writing, if any
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        """Block until no writer holds or waits for the lock, then read."""
+        with self.condition:
+            if self.writer == threading.get_ident():
+                raise RuntimeError("Cannot read while holding the write lock of the same thread")
+            while self.writer is not None or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        """Stop reading."""
+        with self.condition:
+            if not self.readers:
+                raise RuntimeError("Read lock released more times than acquired")
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        """Block until there are no readers and no writer, then write."""
+        with self.condition:
+            if self.writer == threading.get_ident():
+                raise RuntimeError("Write lock is not reentrant")
+            self.waiting_writers += 1
+            try:
+                while self.writer is not None or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = threading.get_ident()
+
+    def release_write(self):
+        """Stop writing."""
+        with self.condition:
+            if self.writer != threading.get_ident():
+                raise RuntimeError("Write lock released by a thread that does not hold it")
+            self.writer = None
+            self.condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Context manager holding the lock for reading."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Context manager holding the lock for writing."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
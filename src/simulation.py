@@ -0,0 +1,221 @@
+"""
+Discrete-event simulation of deliveries.
+Instead of ticking every moving obstacle and agent once per time step, a heap
+of timestamped events (order arrivals, agents reaching the end of a leg,
+obstacles reaching a waypoint) is processed in time order and the clock jumps
+straight from one event to the next. Obstacles are advanced arithmetically
+only when a planner is about to look at them, so a long, busy simulation
+costs in proportion to its events rather than to time steps times entities.
+"""
+
+import heapq
+import itertools
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+from .agent import Delivery_agent
+
+# Event kinds
+ORDER = "order"
+ARRIVAL = "arrival"
+WAYPOINT = "waypoint"
+
+class EventScheduler:
+    """Clock and priority queue of timestamped events."""
+
+    def __init__(self, start: int = 0):
+        """
+        Initialize an empty schedule.
+
+        Args:
+            start: Time the clock starts at
+        """
+        self.now = start
+        self.queue = []  # (time, sequence, kind, payload); sequence keeps ties in scheduling order
+        self.sequence = itertools.count()
+        self.handlers: Dict[str, Callable[[int, Any], None]] = {}
+        self.cancelled = set()
+        self.processed = 0
+
+    def __len__(self) -> int:
+        return len(self.queue) - len(self.cancelled)
+
+    def on(self, kind: str, handler: Callable[[int, Any], None]):
+        """
+        Register the handler of an event kind.
+
+        Args:
+            kind: Event kind
+            handler: Called as handler(time, payload) when an event of this kind is due
+        """
+        self.handlers[kind] = handler
+
+    def schedule(self, time: int, kind: str, payload: Any = None) -> int:
+        """
+        Add an event.
+
+        Args:
+            time: When the event happens; not before the current time
+            kind: Event kind, which must have a handler by the time it is due
+            payload: Passed to the handler
+
+        Returns:
+            Event id, for cancel()
+        """
+        if time < self.now:
+            raise ValueError(f"Cannot schedule an event at {time}, before the current time {self.now}")
+        event_id = next(self.sequence)
+        heapq.heappush(self.queue, (time, event_id, kind, payload))
+        return event_id
+
+    def cancel(self, event_id: int):
+        """Drop a scheduled event; it is discarded when it reaches the front."""
+        self.cancelled.add(event_id)
+
+    def next_time(self) -> Optional[int]:
+        """Time of the next pending event, or None if there is none."""
+        self._skip_cancelled()
+        return self.queue[0][0] if self.queue else None
+
+    def run(self, until: Optional[int] = None) -> int:
+        """
+        Process events in time order.
+
+        Args:
+            until: Stop before events later than this time (the clock is
+                moved to it); None runs until no events are left
+
+        Returns:
+            Number of events processed
+        """
+        processed = 0
+        while True:
+            self._skip_cancelled()
+            if not self.queue or (until is not None and self.queue[0][0] > until):
+                break
+            time, _, kind, payload = heapq.heappop(self.queue)
+            self.now = time
+            self.handlers[kind](time, payload)
+            processed += 1
+        if until is not None:
+            self.now = max(self.now, until)
+        self.processed += processed
+        return processed
+
+    def _skip_cancelled(self):
+        while self.queue and self.queue[0][1] in self.cancelled:
+            self.cancelled.discard(heapq.heappop(self.queue)[1])
+
+class DeliverySimulation:
+    """Agents serving timed orders on a shared grid, driven by an EventScheduler."""
+
+    def __init__(self, grid, agents: Sequence[Delivery_agent], algorithm: str = "a_star"):
+        """
+        Set up a simulation starting at the grid's current tick.
+
+        Each agent drives whole legs at once: it leaves a stop, and its
+        arrival at the next stop is the next event concerning it. Orders
+        arriving while an agent is on the road are taken in at its next stop.
+
+        Args:
+            grid: Grid the agents share
+            agents: Agents on that grid
+            algorithm: Planning algorithm for every leg
+        """
+        self.grid = grid
+        self.agents = list(agents)
+        self.algorithm = algorithm
+        self.scheduler = EventScheduler(grid.ticks)
+        self.scheduler.on(ORDER, self._on_order)
+        self.scheduler.on(ARRIVAL, self._on_arrival)
+        self.scheduler.on(WAYPOINT, self._on_waypoint)
+        self.busy = set()  # indices of agents on the road
+        self.failed = set()  # indices of agents that could not continue
+        self.watchers = {}  # obstacle index -> callback(time, index, position)
+
+    def add_order(self, time: int, agent: int, package: Tuple[int, int], destination: Tuple[int, int]):
+        """
+        Schedule an order arrival.
+
+        Args:
+            time: Arrival time
+            agent: Index of the agent that takes the order
+            package: (x, y) pickup
+            destination: (x, y) drop-off
+        """
+        self.scheduler.schedule(time, ORDER, (agent, package, destination))
+
+    def add_orders(self, orders: Iterable[Tuple[int, int, Tuple[int, int], Tuple[int, int]]]):
+        """Schedule many (time, agent, package, destination) order arrivals."""
+        for time, agent, package, destination in orders:
+            self.add_order(time, agent, package, destination)
+
+    def watch_obstacle(self, index: int, callback: Callable[[int, int, Tuple[int, int]], None]):
+        """
+        Get a callback each time a moving obstacle reaches its next waypoint.
+
+        Only watched obstacles generate events; the rest move silently.
+        Watched obstacles keep generating events forever, so run() then
+        needs a time to stop at.
+
+        Args:
+            index: Index into grid.moving_obstacles
+            callback: Called as callback(time, index, (x, y))
+        """
+        if index not in self.watchers:
+            obstacle = self.grid.moving_obstacles[index]
+            self.scheduler.schedule(self.grid.ticks + obstacle.next_move_in(), WAYPOINT, index)
+        self.watchers[index] = callback
+
+    def sync(self):
+        """Advance the grid's moving obstacles to the current time."""
+        behind = self.scheduler.now - self.grid.ticks
+        if behind > 0:
+            self.grid.advance_moving_obstacles(behind)
+
+    def run(self, until: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process events up to a time, or until none are left.
+
+        Args:
+            until: Time to stop at; None runs until no events are left
+
+        Returns:
+            Dictionary with time, events processed, packages delivered and
+            the indices of agents that failed
+        """
+        if until is None and self.watchers:
+            raise ValueError("Watched obstacles never run out of events; give a time to stop at")
+        self.scheduler.run(until)
+        self.sync()
+        return {
+            "time": self.scheduler.now,
+            "events": self.scheduler.processed,
+            "delivered": sum(agent.delivered_packages for agent in self.agents),
+            "failed": sorted(self.failed),
+        }
+
+    def _on_order(self, time: int, payload):
+        index, package, destination = payload
+        self.agents[index].submit_order(*package, *destination)
+        if index not in self.busy and index not in self.failed:
+            self._depart(time, index)
+
+    def _on_arrival(self, time: int, index: int):
+        self.busy.discard(index)
+        self._depart(time, index)
+
+    def _on_waypoint(self, time: int, index: int):
+        obstacle = self.grid.moving_obstacles[index]
+        elapsed = time - self.grid.ticks
+        self.watchers[index](time, index, obstacle.get_position_at_time(elapsed))
+        # Having just moved, it moves again a full pace later
+        self.scheduler.schedule(time + obstacle.pace, WAYPOINT, index)
+
+    def _depart(self, time: int, index: int):
+        """Start an agent on its next leg and schedule its arrival."""
+        self.sync()  # planners see the obstacles where they are now
+        steps = self.agents[index].drive_leg(self.algorithm)
+        if steps is None:
+            self.failed.add(index)
+        elif steps:
+            self.busy.add(index)
+            self.scheduler.schedule(time + steps, ARRIVAL, index)
@@ -0,0 +1,155 @@
+"""
+Spatial index over pending stops (package pickups and drop-offs).
+Stops are hashed into square buckets so membership and removal are O(1) and
+nearest-stop queries only look at the buckets around the query point.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+class StopIndex:
+    """Multiset of (x, y) stops with bucketed nearest-neighbour queries."""
+
+    def __init__(self, stops: Iterable[Tuple[int, int]] = (), bucket_size: int = 16):
+        """
+        Initialize the index.
+
+        Args:
+            stops: Initial (x, y) stops
+            bucket_size: Side length of the square buckets, in cells
+        """
+        self.bucket_size = bucket_size
+        self.counts: Dict[Tuple[int, int], int] = {}  # insertion ordered
+        self.buckets: Dict[Tuple[int, int], set] = {}
+        self.size = 0
+        self.key_cache: Optional[np.ndarray] = None
+        for x, y in stops:
+            self.add(x, y)
+
+    def add(self, x: int, y: int):
+        """Add a stop; the same cell may hold several stops."""
+        stop = (x, y)
+        if stop in self.counts:
+            self.counts[stop] += 1
+        else:
+            self.counts[stop] = 1
+            self.buckets.setdefault(self._bucket(x, y), set()).add(stop)
+            self.key_cache = None
+        self.size += 1
+
+    def append(self, stop: Tuple[int, int]):
+        """List-style alias for add()."""
+        self.add(stop[0], stop[1])
+
+    def remove(self, stop: Tuple[int, int]):
+        """
+        Remove one stop at a cell.
+
+        Args:
+            stop: (x, y) cell
+
+        Raises:
+            ValueError: If there is no stop at the cell
+        """
+        count = self.counts.get(stop)
+        if count is None:
+            raise ValueError(f"No stop at {stop}")
+        self.size -= 1
+        if count > 1:
+            self.counts[stop] = count - 1
+            return
+        del self.counts[stop]
+        bucket_key = self._bucket(stop[0], stop[1])
+        bucket = self.buckets[bucket_key]
+        bucket.discard(stop)
+        if not bucket:
+            del self.buckets[bucket_key]
+        self.key_cache = None
+
+    def __contains__(self, stop) -> bool:
+        return stop in self.counts
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for stop, count in self.counts.items():
+            for _ in range(count):
+                yield stop
+
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        # O(n); kept so code written against the old list still works
+        return list(self)[index]
+
+    def __repr__(self) -> str:
+        return f"StopIndex({list(self)})"
+
+    def nearest(self, x: int, y: int, k: int = 1) -> List[Tuple[int, int]]:
+        """
+        Find the k distinct stop cells closest to a point by Manhattan distance.
+
+        Buckets are scanned in growing square rings around the query and the
+        scan stops once no unscanned ring can hold anything closer.
+
+        Args:
+            x: Query x-coordinate
+            y: Query y-coordinate
+            k: Number of stops to return
+
+        Returns:
+            Up to k (x, y) cells, closest first
+        """
+        if not self.buckets:
+            return []
+        center_x, center_y = self._bucket(x, y)
+        bucket_xs = [bx for bx, _ in self.buckets]
+        bucket_ys = [by for _, by in self.buckets]
+        max_ring = max(abs(center_x - min(bucket_xs)), abs(center_x - max(bucket_xs)),
+                       abs(center_y - min(bucket_ys)), abs(center_y - max(bucket_ys)))
+
+        found = []
+        for ring in range(max_ring + 1):
+            # Cells in ring r are at least (r - 1) * bucket_size + 1 steps away
+            if len(found) >= k and found[k - 1][0] <= (ring - 1) * self.bucket_size:
+                break
+            for bucket_key in self._ring(center_x, center_y, ring):
+                for stop in self.buckets.get(bucket_key, ()):
+                    found.append((abs(stop[0] - x) + abs(stop[1] - y), stop))
+            found.sort()
+        return [stop for _, stop in found[:k]]
+
+    def mask(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Vectorized membership test for many cells at once.
+
+        Args:
+            xs: Array of x-coordinates
+            ys: Array of y-coordinates
+
+        Returns:
+            Boolean array, True where the cell holds a stop
+        """
+        if self.key_cache is None:
+            self.key_cache = np.array([self._key(sx, sy) for sx, sy in self.counts],
+                                      dtype=np.int64)
+        return np.isin(self._key(np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)),
+                       self.key_cache)
+
+    def _bucket(self, x: int, y: int) -> Tuple[int, int]:
+        return x // self.bucket_size, y // self.bucket_size
+
+    @staticmethod
+    def _key(x, y):
+        return (y << 32) + x
+
+    @staticmethod
+    def _ring(center_x: int, center_y: int, ring: int) -> Iterator[Tuple[int, int]]:
+        if ring == 0:
+            yield center_x, center_y
+            return
+        for bx in range(center_x - ring, center_x + ring + 1):
+            yield bx, center_y - ring
+            yield bx, center_y + ring
+        for by in range(center_y - ring + 1, center_y + ring):
+            yield center_x - ring, by
+            yield center_x + ring, by
@@ -0,0 +1,313 @@
+"""
+Compact binary traces of delivery runs.
+Each time step is one fixed-width record of int32 fields: agent position,
+fuel, event bits and the grid's tick. Records are written straight into a
+preallocated block of rows; each full block is written out in one go,
+optionally zlib-compressed, and indexed so a replay can jump to any step
+without re-simulating. Package counters and moving obstacle phases are not
+stored per step; they follow from the event bits, the ticks and the state
+captured in the file and block headers.
+"""
+
+import array
+import json
+import struct
+import zlib
+from typing import Dict
+import numpy as np
+
+MAGIC = b"DTRC\x01"
+FOOTER_MAGIC = b"DTRE"
+# Records in block, payload bytes, packages picked up and delivered before the block
+BLOCK_HEADER = struct.Struct("<IIII")
+FOOTER = struct.Struct("<QI4s")  # index offset, block count, magic
+
+# Event bits
+PICKUP = 1
+DELIVERY = 2
+
+# Stored record layout
+X, Y, FUEL, EVENT, TICK = range(5)
+RECORD_FIELDS = 5
+
+class TraceRecorder:
+    """Buffered writer of per-step trace records."""
+
+    def __init__(self, filename: str, grid, picked: int = 0, delivered: int = 0,
+                 compress: bool = False, block_records: int = 4096):
+        """
+        Open a trace file and write its header.
+
+        Args:
+            filename: Path of the trace file
+            grid: Grid being simulated; its moving obstacles' current phases are
+                saved so their positions can be derived for every step
+            picked: Packages picked up before the first record
+            delivered: Packages delivered before the first record
+            compress: Compress each block with zlib
+            block_records: Records per block, the unit of buffering and seeking
+        """
+        self.block_records = block_records
+        self.compress = compress
+        self.picked, self.delivered = picked, delivered
+        self.rows = np.empty((block_records, RECORD_FIELDS), dtype=np.int32)
+        self.count = 0  # rows of the current block filled so far
+        self.block_offsets = array.array("Q")
+        self.file = open(filename, "wb")
+
+        header = json.dumps({
+            "width": grid.grid_width,
+            "height": grid.grid_height,
+            "start_tick": grid.ticks,
+            "obstacle_paths": [obstacle.path for obstacle in grid.moving_obstacles],
+            "obstacle_paces": [obstacle.pace for obstacle in grid.moving_obstacles],
+            "obstacle_phases": [(obstacle.current_step, obstacle.pace_counter)
+                                for obstacle in grid.moving_obstacles],
+            "block_records": block_records,
+            "compression": "zlib" if compress else None,
+        }).encode()
+        self.file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, x: int, y: int, fuel: int, event: int, tick: int):
+        """
+        Append the state after one step.
+
+        Args:
+            x: Agent x-coordinate
+            y: Agent y-coordinate
+            fuel: Fuel left
+            event: PICKUP and/or DELIVERY bits for this step
+            tick: The grid's tick counter after the step
+        """
+        count = self.count
+        self.rows[count] = (x, y, fuel, event, tick)
+        self.count = count = count + 1
+        if count == self.block_records:
+            self._write_block(self.rows)
+            self.count = 0
+
+    def record_many(self, cells: np.ndarray, fuel: np.ndarray, events: np.ndarray,
+                    ticks: np.ndarray):
+        """
+        Append a run of consecutive steps at once.
+
+        Args:
+            cells: (steps, 2) agent positions after each step
+            fuel: Fuel left after each step
+            events: Event bits of each step
+            ticks: The grid's tick counter after each step
+        """
+        done, steps = 0, len(cells)
+        while done < steps:
+            take = min(steps - done, self.block_records - self.count)
+            rows = self.rows[self.count:self.count + take]
+            rows[:, X:Y + 1] = cells[done:done + take]
+            rows[:, FUEL] = fuel[done:done + take]
+            rows[:, EVENT] = events[done:done + take]
+            rows[:, TICK] = ticks[done:done + take]
+            self.count += take
+            done += take
+            if self.count == self.block_records:
+                self._write_block(self.rows)
+                self.count = 0
+
+    def close(self):
+        """Flush the last block and write the block index."""
+        if self.file.closed:
+            return
+        if self.count:
+            self._write_block(self.rows[:self.count])
+            self.count = 0
+        index_offset = self.file.tell()
+        self.file.write(self.block_offsets.tobytes())
+        self.file.write(FOOTER.pack(index_offset, len(self.block_offsets), FOOTER_MAGIC))
+        self.file.close()
+
+    def _write_block(self, records: np.ndarray):
+        payload = memoryview(records).cast("B")  # rows are contiguous, so no copy
+        if self.compress:
+            payload = zlib.compress(payload, 1)
+        self.block_offsets.append(self.file.tell())
+        self.file.write(BLOCK_HEADER.pack(len(records), len(payload), self.picked, self.delivered))
+        self.file.write(payload)
+        events = records[:, EVENT]
+        self.picked += int(np.count_nonzero(events & PICKUP))
+        self.delivered += int(np.count_nonzero(events & DELIVERY))
+
+class TraceReader:
+    """Random-access reader for trace files."""
+
+    def __init__(self, filename: str):
+        """
+        Open a trace and load its block index.
+
+        Traces cut short by a crash have no index; their blocks are found by
+        skipping from header to header instead.
+
+        Args:
+            filename: Path of the trace file
+        """
+        self.file = open(filename, "rb")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filename} is not a trace file")
+        header_size, = struct.unpack("<I", self.file.read(4))
+        self.header = json.loads(self.file.read(header_size))
+        self.obstacle_paths = [[tuple(cell) for cell in path] for path in self.header["obstacle_paths"]]
+        self.block_records = self.header["block_records"]
+        self.compressed = self.header["compression"] == "zlib"
+        self.block_offsets, self.total = self._load_index(self.file.tell())
+        self.cached_block = (None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def close(self):
+        """Close the trace file."""
+        self.file.close()
+
+    def records(self, start: int, stop: int) -> np.ndarray:
+        """
+        Read a range of stored records.
+
+        Args:
+            start: First step
+            stop: Step after the last one
+
+        Returns:
+            int32 array of shape (steps, 5) with columns X, Y, FUEL, EVENT, TICK
+        """
+        start, stop = max(start, 0), min(stop, self.total)
+        chunks = []
+        while start < stop:
+            block, offset = divmod(start, self.block_records)
+            records = self._block(block)[0]
+            take = min(stop - start, len(records) - offset)
+            chunks.append(records[offset:offset + take])
+            start += take
+        if not chunks:
+            return np.empty((0, RECORD_FIELDS), dtype=np.int32)
+        return np.concatenate(chunks)
+
+    def state(self, step: int) -> Dict:
+        """
+        Decode the state after a step.
+
+        Args:
+            step: Step number; negative values count from the end
+
+        Returns:
+            Dictionary with the agent's position, fuel, package counters,
+            events, the grid tick and moving obstacle positions
+        """
+        if step < 0:
+            step += self.total
+        if not 0 <= step < self.total:
+            raise IndexError(f"Step {step} outside trace of {self.total} steps")
+        block, offset = divmod(step, self.block_records)
+        records, picked, delivered = self._block(block)
+        events = records[:offset + 1, EVENT]
+        x, y, fuel, event, tick = records[offset].tolist()
+        return {
+            "step": step,
+            "position": (x, y),
+            "fuel": fuel,
+            "picked_up": picked + int(np.count_nonzero(events & PICKUP)),
+            "delivered": delivered + int(np.count_nonzero(events & DELIVERY)),
+            "pickup": bool(event & PICKUP),
+            "delivery": bool(event & DELIVERY),
+            "tick": tick,
+            "obstacles": [path[phase] for path, (phase, _) in
+                          zip(self.obstacle_paths, self.obstacle_phases(tick))],
+        }
+
+    def obstacle_phases(self, tick: int):
+        """
+        Get every moving obstacle's (path index, pace counter) at a grid tick.
+
+        Args:
+            tick: Grid tick counter
+
+        Returns:
+            List of (path index, pace counter), in the grid's obstacle order
+        """
+        elapsed = tick - self.header["start_tick"]
+        phases = []
+        for path, pace, (step, counter) in zip(self.obstacle_paths, self.header["obstacle_paces"],
+                                               self.header["obstacle_phases"]):
+            # Same arithmetic as MovingObstacle.advance()
+            moves, counter = divmod(counter + elapsed, pace)
+            phases.append(((step + moves) % len(path), counter))
+        return phases
+
+    def restore(self, step: int, agent):
+        """
+        Put an agent and its grid's moving obstacles into a recorded state.
+
+        Args:
+            step: Step number
+            agent: Delivery_agent on the traced grid
+        """
+        state = self.state(step)
+        agent.x, agent.y = state["position"]
+        agent.fuel = state["fuel"]
+        agent.picked_up_packages, agent.delivered_packages = state["picked_up"], state["delivered"]
+        agent.grid.ticks = state["tick"]
+        for obstacle, (phase, counter) in zip(agent.grid.moving_obstacles,
+                                              self.obstacle_phases(state["tick"])):
+            obstacle.current_step, obstacle.pace_counter = phase, counter
+            obstacle.current_x, obstacle.current_y = obstacle.path[phase]
+
+    def _load_index(self, first_block: int):
+        self.file.seek(0, 2)
+        end = self.file.tell()
+        if end - first_block >= FOOTER.size:
+            self.file.seek(end - FOOTER.size)
+            index_offset, count, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if magic == FOOTER_MAGIC:
+                self.file.seek(index_offset)
+                offsets = array.array("Q")
+                offsets.frombytes(self.file.read(8 * count))
+                return self._with_total(offsets)
+
+        offsets = array.array("Q")
+        position = first_block
+        while position + BLOCK_HEADER.size <= end:
+            self.file.seek(position)
+            _, size, _, _ = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))
+            if position + BLOCK_HEADER.size + size > end:
+                break  # torn final block
+            offsets.append(position)
+            position += BLOCK_HEADER.size + size
+        return self._with_total(offsets)
+
+    def _with_total(self, offsets):
+        if not offsets:
+            return offsets, 0
+        self.file.seek(offsets[-1])
+        last_count = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))[0]
+        return offsets, (len(offsets) - 1) * self.block_records + last_count
+
+    def _block(self, block: int):
+        """Load a block: (records, picked before it, delivered before it)."""
+        if self.cached_block[0] == block:
+            return self.cached_block[1]
+        self.file.seek(self.block_offsets[block])
+        count, size, picked, delivered = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))
+        payload = self.file.read(size)
+        if self.compressed:
+            payload = zlib.decompress(payload)
+        records = np.frombuffer(payload, dtype=np.int32).reshape(count, RECORD_FIELDS)
+        self.cached_block = (block, (records, picked, delivered))
+        return records, picked, delivered